@@ -0,0 +1,89 @@
+"""
+Compares a sweep over many MLFQ configurations run with the vectorized
+batch simulator against running MultiLevelFeedbackQueue once per
+configuration, and checks that both give the same results.
+
+Run from the root directory:
+    python -m benchmarks.bench_batch [num_configurations]
+"""
+
+import itertools
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from src.batch import BatchMultiLevelFeedbackQueue
+from src.mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    NullTraceSink,
+    Process,
+    ProcessTable,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+)
+
+NUM_PROCESSES: int = 20
+
+
+def generate_rows(num_processes: int) -> list[tuple[str, int, list[int]]]:
+    rng = random.Random(0)
+    return [
+        (
+            f'P{i:03}',
+            rng.randrange(100),
+            [rng.randint(1, 30) for _ in range(rng.choice([1, 3, 5]))],
+        )
+        for i in range(num_processes)
+    ]
+
+
+def build_processes(rows: list[tuple[str, int, list[int]]]) -> list[Process]:
+    table = ProcessTable()
+    return [table.add(name, arrival, bursts) for name, arrival, bursts in rows]
+
+
+def main() -> None:
+    num_configurations: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    rows = generate_rows(NUM_PROCESSES)
+    configurations = list(
+        itertools.islice(
+            itertools.product(range(1, 21), range(1, 21), range(5)),
+            num_configurations,
+        )
+    )
+
+    start = perf_counter()
+    sequential_turnaround_times = []
+    for time_allotment_q1, time_allotment_q2, context_switch_time in configurations:
+        processes = build_processes(rows)
+        MultiLevelFeedbackQueue(
+            processes,
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ],
+            context_switch_time,
+            trace=NullTraceSink(),
+        ).run()
+        sequential_turnaround_times.append([p.turnaround_time for p in processes])
+    sequential_time = perf_counter() - start
+
+    start = perf_counter()
+    batch = BatchMultiLevelFeedbackQueue(build_processes(rows), configurations)
+    batch.run()
+    batch_time = perf_counter() - start
+
+    assert np.array_equal(batch.turnaround_times, sequential_turnaround_times)
+
+    print(f'{len(configurations)} configurations, {NUM_PROCESSES} processes')
+    print(f'{"sequential":>12}: {sequential_time:8.3f} s')
+    print(f'{"batch":>12}: {batch_time:8.3f} s')
+    print(f'{"speedup":>12}: {sequential_time / batch_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
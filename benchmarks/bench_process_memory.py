@@ -0,0 +1,99 @@
+"""
+Compares the memory used by a ProcessTable with the memory used by the
+original per-object Process class, for the same synthetic workload.
+
+Run from the root directory:
+    python -m benchmarks.bench_process_memory [num_processes]
+"""
+
+import random
+import sys
+import tracemalloc
+from collections.abc import Callable
+
+from src.mlfq import ProcessTable
+
+BURSTS_PER_PROCESS: int = 5
+
+
+class LegacyProcess:
+    """
+    Storage layout of Process before it became a view of a ProcessTable
+    """
+
+    def __init__(
+        self, process_name: str, arrival_time: int, burst_times: list[int]
+    ) -> None:
+        self._process_name = process_name
+        self._arrival_time = arrival_time
+        self._burst_times = burst_times
+        self._total_burst_time = sum(self._burst_times)
+
+        self._burst_index = 0
+        self._queue_level = 0
+        self._time_in_queue = 0
+        self._completion_time = None
+        self._cpu_time = sum(burst_times[0::2])
+        self._is_from_IO = True
+
+
+def generate_rows(num_processes: int) -> list[tuple[str, int, list[int]]]:
+    rng = random.Random(0)
+    return [
+        (
+            f'P{i}',
+            rng.randrange(num_processes),
+            [rng.randint(1, 5_000) for _ in range(BURSTS_PER_PROCESS)],
+        )
+        for i in range(num_processes)
+    ]
+
+
+def measure(build: Callable[[], object]) -> int:
+    """
+    Bytes still allocated by build() once it returns
+    """
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def main() -> None:
+    num_processes: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = generate_rows(num_processes)
+
+    def build_legacy() -> list[LegacyProcess]:
+        # Copies the burst list, like parsing the input would
+        return [
+            LegacyProcess(name, arrival, list(bursts)) for name, arrival, bursts in rows
+        ]
+
+    def build_table() -> ProcessTable:
+        table = ProcessTable()
+        for name, arrival, bursts in rows:
+            table.append(name, arrival, bursts)
+        return table
+
+    def build_table_with_views() -> tuple[ProcessTable, list]:
+        table = build_table()
+        return table, table.processes
+
+    results: list[tuple[str, int]] = [
+        ('legacy Process objects', measure(build_legacy)),
+        ('ProcessTable', measure(build_table)),
+        ('ProcessTable + Process views', measure(build_table_with_views)),
+    ]
+
+    print(f'{num_processes} processes, {BURSTS_PER_PROCESS} bursts each')
+    for label, allocated in results:
+        print(
+            f'{label:>30}: {allocated / 2**20:>9.1f} MiB'
+            f' ({allocated / num_processes:>6.1f} B/process)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the per-operation cost of the RR and FCFS priority queues as the
+number of waiting processes grows. Both operations should stay flat.
+
+Run from the root directory:
+    python -m benchmarks.bench_queues
+"""
+
+from time import perf_counter
+
+from src.mlfq import FCFSPriorityQueue, ProcessTable, RRPriorityQueue
+
+DEPTHS: list[int] = [10, 100, 1_000, 10_000, 100_000]
+OPERATIONS: int = 100_000
+
+
+def bench_rr_rotation(depth: int) -> float:
+    """
+    Nanoseconds per quantum rotation of a RR queue holding `depth` processes
+    """
+    queue = RRPriorityQueue(None, time_quantum=1)
+    table = ProcessTable()
+    for i in range(depth):
+        queue.push_process(table.add(f'P{i}', 0, [10]))
+
+    start = perf_counter()
+    for _ in range(OPERATIONS):
+        queue.on_tick()
+        queue.select_new_process()
+    return (perf_counter() - start) / OPERATIONS * 1e9
+
+
+def bench_fcfs_release(depth: int) -> float:
+    """
+    Nanoseconds per release (and re-push) of the head of a FCFS queue
+    holding `depth` processes
+    """
+    queue = FCFSPriorityQueue(None)
+    table = ProcessTable()
+    for i in range(depth):
+        # Bursts are already complete, so the head is always released
+        queue.push_process(table.add(f'P{i}', 0, [0]))
+
+    start = perf_counter()
+    for _ in range(OPERATIONS):
+        process = queue.release_current_on_expiry()
+        assert process is not None
+        queue.push_process(process)
+    return (perf_counter() - start) / OPERATIONS * 1e9
+
+
+def main() -> None:
+    print(f'{"depth":>8} {"RR rotation (ns)":>18} {"FCFS release (ns)":>18}')
+    for depth in DEPTHS:
+        print(
+            f'{depth:>8} {bench_rr_rotation(depth):>18.1f} {bench_fcfs_release(depth):>18.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
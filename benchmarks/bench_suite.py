@@ -0,0 +1,287 @@
+"""
+Benchmark suite for the scheduler hot paths, run on the synthetic workloads
+of benchmarks.workloads
+
+For every workload shape and size, it measures ticks per second, wall time and
+peak memory of each queue class driven on its own, and of the full simulator
+(event-driven, plus tick by tick for the smaller workloads). Peak memory is
+taken from a second run under tracemalloc, so it does not slow down the timed run.
+
+Results can be saved as a baseline, which later runs are compared against:
+a result regresses if its throughput drops, or its peak memory grows, by more
+than the tolerance. The exit status is 1 if anything regressed.
+
+Run from the root directory:
+    python -m benchmarks.bench_suite --save-baseline
+    python -m benchmarks.bench_suite [--sizes 10,100000,1000000] [--tolerance 0.2]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from time import perf_counter
+
+from src.mlfq import (
+    IO,
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    NullTraceSink,
+    PriorityQueue,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+)
+
+from .workloads import (
+    CONTEXT_SWITCH_TIME,
+    SHAPES,
+    TIME_ALLOTMENT_Q1,
+    TIME_ALLOTMENT_Q2,
+    Row,
+    build_processes,
+    generate_rows,
+)
+
+DEFAULT_SIZES: list[int] = [10, 100, 1_000, 10_000]
+DEFAULT_BASELINE: Path = Path(__file__).parent / 'baseline.json'
+# Ticks a queue is driven for, whatever the number of processes it holds
+QUEUE_TICKS: int = 100_000
+# Stepping through every tick is only benchmarked on workloads up to this size
+TICK_MODE_MAX_PROCESSES: int = 1_000
+
+# Builds the state of a benchmark and returns a callable that runs it,
+# returning the number of ticks simulated
+Benchmark = Callable[[list[Row]], Callable[[], int]]
+
+
+def _queue_benchmark(make_queue: Callable[[], PriorityQueue]) -> Benchmark:
+    """
+    Drives a single queue holding every process of the workload, one tick at
+    a time, with the bursts of each process run back to back
+    """
+
+    def setup(rows: list[Row]) -> Callable[[], int]:
+        queue = make_queue()
+        for process in build_processes(rows):
+            queue.push_process(process)
+
+        def run() -> int:
+            for tick in range(QUEUE_TICKS):
+                if queue.select_new_process() is None:
+                    return tick
+
+                queue.on_tick()
+                process = queue.release_current_on_expiry()
+                if process is not None:
+                    process.next_burst()
+                    if not process.is_process_complete:
+                        queue.push_process(process)
+            return QUEUE_TICKS
+
+        return run
+
+    return setup
+
+
+def _io_benchmark(rows: list[Row]) -> Callable[[], int]:
+    io = IO()
+    for process in build_processes(rows):
+        io.push_process(process)
+
+    def run() -> int:
+        for tick in range(QUEUE_TICKS):
+            if io.is_empty:
+                return tick
+
+            io.on_tick()
+            for process in io.release_expired_processes():
+                process.next_burst()
+                if not process.is_process_complete:
+                    io.push_process(process)
+        return QUEUE_TICKS
+
+    return run
+
+
+def _mlfq_benchmark(event_driven: bool) -> Benchmark:
+    def setup(rows: list[Row]) -> Callable[[], int]:
+        processes = build_processes(rows)
+        mlfq = MultiLevelFeedbackQueue(
+            processes,
+            [
+                RRPriorityQueue(TIME_ALLOTMENT_Q1),
+                FCFSPriorityQueue(TIME_ALLOTMENT_Q2),
+                SJFPriorityQueue(None),
+            ],
+            CONTEXT_SWITCH_TIME,
+            trace=NullTraceSink(),
+        )
+
+        def run() -> int:
+            mlfq.run(event_driven)
+            return max(p.completion_time for p in processes)
+
+        return run
+
+    return setup
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    'rr': _queue_benchmark(lambda: RRPriorityQueue(None)),
+    'fcfs': _queue_benchmark(lambda: FCFSPriorityQueue(None)),
+    'sjf': _queue_benchmark(lambda: SJFPriorityQueue(None)),
+    'io': _io_benchmark,
+    'mlfq': _mlfq_benchmark(event_driven=True),
+    'mlfq_ticks': _mlfq_benchmark(event_driven=False),
+}
+
+
+def measure(benchmark: Benchmark, rows: list[Row], repeat: int = 3) -> dict[str, float]:
+    """
+    Ticks, best wall time out of repeat runs, and peak memory of a benchmark
+    """
+    ticks = 0
+    wall_time = float('inf')
+    for _ in range(repeat):
+        run = benchmark(rows)
+        # Like timeit, garbage from earlier runs is not collected while timing
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            ticks = run()
+            wall_time = min(wall_time, perf_counter() - start)
+        finally:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        benchmark(rows)()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ticks': ticks,
+        'wall_time': wall_time,
+        'ticks_per_second': ticks / wall_time if wall_time > 0 else 0.0,
+        'peak_memory': peak_memory,
+    }
+
+
+def compare(
+    result: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """
+    Ways in which result regressed compared to baseline
+    """
+    regressions: list[str] = []
+    if result['ticks'] != baseline['ticks']:
+        regressions.append(f'ticks changed from {baseline["ticks"]}')
+    if result['ticks_per_second'] < baseline['ticks_per_second'] / (1 + tolerance):
+        regressions.append(
+            f'{result["ticks_per_second"] / baseline["ticks_per_second"]:.2f}x throughput'
+        )
+    if result['peak_memory'] > baseline['peak_memory'] * (1 + tolerance):
+        regressions.append(
+            f'{result["peak_memory"] / baseline["peak_memory"]:.2f}x peak memory'
+        )
+    return regressions
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the queues and the simulator on synthetic workloads.'
+    )
+    parser.add_argument(
+        '--sizes',
+        type=lambda sizes: [int(size) for size in sizes.split(',')],
+        default=DEFAULT_SIZES,
+        help='comma separated numbers of processes',
+    )
+    parser.add_argument(
+        '--shapes',
+        type=lambda shapes: shapes.split(','),
+        default=list(SHAPES),
+        help=f'comma separated workload shapes, out of {", ".join(SHAPES)}',
+    )
+    parser.add_argument(
+        '--benchmarks',
+        type=lambda benchmarks: benchmarks.split(','),
+        default=list(BENCHMARKS),
+        help=f'comma separated benchmarks, out of {", ".join(BENCHMARKS)}',
+    )
+    parser.add_argument('--seed', type=int, default=0, help='workload seed')
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='timed runs, the fastest is kept'
+    )
+    parser.add_argument(
+        '--baseline', type=Path, default=DEFAULT_BASELINE, help='baseline file'
+    )
+    parser.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help='add the results to the baseline instead of comparing against it',
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.2,
+        help='relative slowdown or memory growth allowed before a regression',
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+
+    baseline: dict[str, dict[str, float]] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+
+    print(
+        f'{"benchmark":<11} {"shape":<10} {"processes":>9} {"ticks":>10}'
+        f' {"wall (s)":>9} {"ticks/s":>11} {"peak (MiB)":>10}  baseline'
+    )
+
+    results: dict[str, dict[str, float]] = {}
+    num_regressions = 0
+    for shape in args.shapes:
+        for size in args.sizes:
+            rows = generate_rows(shape, size, args.seed)
+            for name in args.benchmarks:
+                if name == 'mlfq_ticks' and size > TICK_MODE_MAX_PROCESSES:
+                    continue
+
+                key = f'{name}/{shape}/{size}/{args.seed}'
+                result = results[key] = measure(BENCHMARKS[name], rows, args.repeat)
+
+                if args.save_baseline or key not in baseline:
+                    status = '-'
+                else:
+                    regressions = compare(result, baseline[key], args.tolerance)
+                    num_regressions += bool(regressions)
+                    status = ', '.join(regressions) or 'ok'
+
+                print(
+                    f'{name:<11} {shape:<10} {size:>9} {result["ticks"]:>10}'
+                    f' {result["wall_time"]:>9.3f} {result["ticks_per_second"]:>11.0f}'
+                    f' {result["peak_memory"] / (1 << 20):>10.2f}  {status}',
+                    flush=True,
+                )
+
+    if args.save_baseline:
+        # Results of other sizes, shapes or benchmarks are kept
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + '\n')
+        print(f'Saved baseline to {args.baseline}')
+    elif num_regressions:
+        print(f'{num_regressions} regression(s) beyond {args.tolerance:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,131 @@
+"""
+Seeded synthetic workloads for the benchmarks
+
+Each shape stresses a different part of the scheduler:
+    cpu_bound   long CPU bursts with short IO, mostly served by Q1 and Q2
+    io_bound    many short CPU bursts separated by long IO bursts
+    bursty      waves of processes arriving on the same tick
+    deep_q3     CPU bursts far longer than the allotments, so that most of
+                the work is done in the SJF queue
+
+Arrivals are spread so that the CPU stays roughly 90% busy whatever the
+number of processes, which keeps the queue depths comparable across sizes.
+
+Run from the root directory to print a workload in the input format:
+    python -m benchmarks.workloads SHAPE NUM_PROCESSES [SEED]
+"""
+
+import random
+import sys
+from collections.abc import Callable
+
+from src.mlfq import Process, ProcessTable
+
+# (process name, arrival time, burst times)
+Row = tuple[str, int, list[int]]
+
+TIME_ALLOTMENT_Q1: int = 8
+TIME_ALLOTMENT_Q2: int = 8
+CONTEXT_SWITCH_TIME: int = 1
+LOAD: float = 0.9
+
+
+def _bursts(
+    rng: random.Random,
+    num_cpu_bursts: list[int],
+    cpu_range: tuple[int, int],
+    io_range: tuple[int, int],
+) -> list[int]:
+    bursts: list[int] = []
+    for i in range(rng.choice(num_cpu_bursts) * 2 - 1):
+        bursts.append(rng.randint(*(io_range if i % 2 else cpu_range)))
+    return bursts
+
+
+def _spread_arrivals(
+    rng: random.Random, burst_times: list[list[int]], wave_size: int = 1
+) -> list[int]:
+    """
+    Arrival times for processes with the given bursts, in waves of wave_size
+    processes arriving on the same tick
+    """
+    total_cpu_time = sum(sum(bursts[::2]) for bursts in burst_times)
+    num_waves = -(-len(burst_times) // wave_size)
+    span = max(int(total_cpu_time / LOAD), 1)
+
+    wave_arrivals = sorted(rng.randrange(span) for _ in range(num_waves))
+    return [wave_arrivals[i // wave_size] for i in range(len(burst_times))]
+
+
+def cpu_bound(rng: random.Random, num_processes: int) -> list[list[int]]:
+    return [_bursts(rng, [1, 2], (10, 60), (1, 5)) for _ in range(num_processes)]
+
+
+def io_bound(rng: random.Random, num_processes: int) -> list[list[int]]:
+    return [_bursts(rng, [4, 5], (1, 4), (20, 80)) for _ in range(num_processes)]
+
+
+def bursty(rng: random.Random, num_processes: int) -> list[list[int]]:
+    return [_bursts(rng, [2], (2, 20), (5, 20)) for _ in range(num_processes)]
+
+
+def deep_q3(rng: random.Random, num_processes: int) -> list[list[int]]:
+    return [_bursts(rng, [1, 2], (50, 500), (5, 20)) for _ in range(num_processes)]
+
+
+SHAPES: dict[str, Callable[[random.Random, int], list[list[int]]]] = {
+    'cpu_bound': cpu_bound,
+    'io_bound': io_bound,
+    'bursty': bursty,
+    'deep_q3': deep_q3,
+}
+
+
+def generate_rows(shape: str, num_processes: int, seed: int = 0) -> list[Row]:
+    """
+    Processes of a workload, in random arrival order
+    The same (shape, num_processes, seed) always gives the same workload
+    """
+    rng = random.Random(f'{shape}/{num_processes}/{seed}')
+    burst_times = SHAPES[shape](rng, num_processes)
+
+    wave_size = max(10, num_processes // 100) if shape == 'bursty' else 1
+    arrival_times = _spread_arrivals(rng, burst_times, wave_size)
+
+    rows: list[Row] = [
+        (f'P{i:07}', arrival_time, bursts)
+        for i, (arrival_time, bursts) in enumerate(zip(arrival_times, burst_times))
+    ]
+    rng.shuffle(rows)
+    return rows
+
+
+def build_processes(rows: list[Row]) -> list[Process]:
+    table = ProcessTable()
+    return [table.add(name, arrival, bursts) for name, arrival, bursts in rows]
+
+
+def format_workload(rows: list[Row]) -> str:
+    """
+    Workload in the input format of the simulator
+    """
+    lines: list[str] = [
+        str(len(rows)),
+        str(TIME_ALLOTMENT_Q1),
+        str(TIME_ALLOTMENT_Q2),
+        str(CONTEXT_SWITCH_TIME),
+    ]
+    for name, arrival, bursts in rows:
+        lines.append(';'.join([name, str(arrival), *map(str, bursts)]))
+    return '\n'.join(lines) + '\n'
+
+
+def main() -> None:
+    shape: str = sys.argv[1]
+    num_processes: int = int(sys.argv[2])
+    seed: int = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sys.stdout.write(format_workload(generate_rows(shape, num_processes, seed)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+"""
+Vectorized simulation of many MLFQ configurations over the same workload
+
+Every configuration uses the queues set up by mlfq.main(), i.e. a RR queue,
+a FCFS queue and a SJF queue, and may differ in the Q1/Q2 time allotments,
+the RR time quantum and the context switch time. All configurations are
+advanced together, one tick at a time, with their state kept in NumPy arrays
+of shape (configurations, processes).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        'The batch simulator requires NumPy, install it with `poetry install --extras batch`'
+    ) from e
+
+from .mlfq import Process
+
+RR_LEVEL: int = 0
+FCFS_LEVEL: int = 1
+SJF_LEVEL: int = 2
+
+_NO_PROCESS: int = -1
+_NOT_QUEUED: int = np.iinfo(np.int64).max
+
+
+class BatchMultiLevelFeedbackQueue:
+    _process_names: list[str]
+    _arrival_times: np.ndarray
+    _total_burst_times: np.ndarray
+    # Bursts of each process, padded with zeros to the longest burst list
+    _bursts: np.ndarray
+    # Rank of each process name, used to break ties like the sequential simulator
+    _name_ranks: np.ndarray
+
+    _time_allotments_q1: np.ndarray
+    _time_allotments_q2: np.ndarray
+    _context_switch_times: np.ndarray
+    _time_quanta: np.ndarray
+
+    # State of a run, flattened to (configurations * processes) so that
+    # the processes of every configuration can be indexed with one array
+    _rr_sequence: np.ndarray
+    _fcfs_sequence: np.ndarray
+    _sjf_order: np.ndarray
+    _sjf_current: np.ndarray
+    _sjf_sizes: np.ndarray
+    _io_completions: dict[int, list[np.ndarray]]
+    _io_start_ticks: np.ndarray
+    _levels: np.ndarray
+    _burst_indices: np.ndarray
+    _current_bursts: np.ndarray
+    _remaining_bursts: np.ndarray
+    _times_in_queue: np.ndarray
+    _flat_completion_times: np.ndarray
+
+    _completion_times: np.ndarray | None = None
+
+    def __init__(
+        self,
+        processes: Sequence[Process],
+        configurations: Sequence[tuple[int, int, int]],
+        time_quanta: int | Sequence[int] = 4,
+    ) -> None:
+        """
+        Each configuration is a (time_allotment_q1, time_allotment_q2,
+        context_switch_time) tuple. time_quanta is the RR time quantum, either
+        shared by all configurations or given per configuration.
+        """
+        num_bursts = max(len(p.burst_times) for p in processes)
+
+        self._process_names = [p.process_name for p in processes]
+        self._arrival_times = np.array([p.arrival_time for p in processes], np.int64)
+        self._bursts = np.zeros((len(processes), num_bursts), np.int64)
+        for i, process in enumerate(processes):
+            self._bursts[i, : len(process.burst_times)] = process.burst_times
+        self._total_burst_times = self._bursts.sum(axis=1)
+        self._name_ranks = np.argsort(np.argsort(self._process_names, kind='stable'))
+
+        configuration_array = np.array(configurations, np.int64).reshape(-1, 3)
+        self._time_allotments_q1 = configuration_array[:, 0]
+        self._time_allotments_q2 = configuration_array[:, 1]
+        self._context_switch_times = configuration_array[:, 2]
+        self._time_quanta = np.broadcast_to(
+            np.array(time_quanta, np.int64), (len(configuration_array),)
+        ).copy()
+
+    @property
+    def num_configurations(self) -> int:
+        return len(self._context_switch_times)
+
+    @property
+    def process_names(self) -> list[str]:
+        return self._process_names
+
+    @property
+    def completion_times(self) -> np.ndarray:
+        """
+        Completion time of each process, shaped (configurations, processes)
+        """
+        if self._completion_times is None:
+            raise Exception(
+                "Error: Attempted to access property 'completion_times' before running the simulation."
+            )
+
+        return self._completion_times
+
+    @property
+    def turnaround_times(self) -> np.ndarray:
+        return self.completion_times - self._arrival_times
+
+    @property
+    def waiting_times(self) -> np.ndarray:
+        return self.completion_times - self._arrival_times - self._total_burst_times
+
+    @property
+    def average_turnaround_times(self) -> np.ndarray:
+        return self.turnaround_times.mean(axis=1)
+
+    @property
+    def average_waiting_times(self) -> np.ndarray:
+        return self.waiting_times.mean(axis=1)
+
+    def run(self) -> None:
+        """
+        Run the simulation of every configuration to completion
+
+        Mirrors MultiLevelFeedbackQueue.run() step by step, so that every
+        configuration yields exactly the same schedule as a sequential run.
+        Only the queue heads are found with reductions over all processes,
+        everything else is updated sparsely for the processes involved.
+        """
+        num_configs = self.num_configurations
+        num_processes = len(self._process_names)
+        shape = (num_configs, num_processes)
+        configs = np.arange(num_configs)
+        # Offset of the first process of each configuration in the flattened state
+        config_offsets = configs * num_processes
+
+        # Order of the RR and FCFS queues, the smallest sequence number is at the head
+        # Processes that are not in the queue are _NOT_QUEUED
+        rr_sequence = np.full(shape, _NOT_QUEUED, np.int64)
+        fcfs_sequence = np.full(shape, _NOT_QUEUED, np.int64)
+        self._rr_sequence = rr_sequence.reshape(-1)
+        self._fcfs_sequence = fcfs_sequence.reshape(-1)
+        # Order of the SJF queue, by (burst time upon queue entry, name)
+        sjf_order = np.full(shape, _NOT_QUEUED, np.int64)
+        self._sjf_order = sjf_order.reshape(-1)
+        # Processes in IO, keyed by the tick at which their IO burst completes
+        self._io_completions = {}
+        self._io_start_ticks = np.zeros(num_configs * num_processes, np.int64)
+
+        # Per process state, flattened so that it can be indexed with one array
+        self._levels = np.zeros(num_configs * num_processes, np.int64)
+        self._burst_indices = np.zeros(num_configs * num_processes, np.int64)
+        self._current_bursts = np.tile(self._bursts[:, 0], num_configs)
+        self._remaining_bursts = np.tile((self._bursts > 0).sum(axis=1), num_configs)
+        self._times_in_queue = np.zeros(num_configs * num_processes, np.int64)
+        self._flat_completion_times = np.full(num_configs * num_processes, -1, np.int64)
+
+        # Per configuration state
+        context_switch_counters = np.zeros(num_configs, np.int64)
+        last_running = np.full(num_configs, _NO_PROCESS, np.int64)
+        time_quantum_counters = self._time_quanta.copy()
+        self._sjf_current = np.full(num_configs, _NO_PROCESS, np.int64)
+        self._sjf_sizes = np.zeros(num_configs, np.int64)
+        sjf_current = self._sjf_current
+        current_bursts = self._current_bursts
+        times_in_queue = self._times_in_queue
+
+        def queue_heads(sequence: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            heads = sequence.argmin(axis=1)
+            return sequence.reshape(-1)[config_offsets + heads] != _NOT_QUEUED, heads
+
+        # Heads are only recomputed when the membership of a queue changes
+        has_rr, rr_heads = queue_heads(rr_sequence)
+        has_fcfs, fcfs_heads = queue_heads(fcfs_sequence)
+
+        num_unfinished = num_configs * num_processes
+        tick = 0
+        while num_unfinished > 0:
+            # Sequence numbers of everything pushed during this tick
+            # Pushes happen in phases, and in order of name within a phase
+            base = tick * 4 * num_processes
+
+            # Push arriving processes
+            arriving = self._arrival_times == tick
+            if arriving.any():
+                rr_sequence[:, arriving] = base + self._name_ranks[arriving]
+                has_rr, rr_heads = queue_heads(rr_sequence)
+
+            # Release the current process of each queue on expiry
+            released: list[np.ndarray] = []
+            for sequence, has_processes, heads, time_allotments in (
+                (self._rr_sequence, has_rr, rr_heads, self._time_allotments_q1),
+                (self._fcfs_sequence, has_fcfs, fcfs_heads, self._time_allotments_q2),
+            ):
+                heads = config_offsets + heads
+                expired = has_processes & (
+                    (current_bursts[heads] <= 0)
+                    | (
+                        (time_allotments > 0)
+                        & (times_in_queue[heads] >= time_allotments)
+                    )
+                )
+                if expired.any():
+                    sequence[heads[expired]] = _NOT_QUEUED
+                    released.append(heads[expired])
+                    if sequence is self._rr_sequence:
+                        time_quantum_counters[expired] = self._time_quanta[expired]
+
+            sjf_heads = config_offsets + sjf_current
+            sjf_expired = (sjf_current >= 0) & (current_bursts[sjf_heads] <= 0)
+            if sjf_expired.any():
+                self._sjf_order[sjf_heads[sjf_expired]] = _NOT_QUEUED
+                self._sjf_sizes[sjf_expired] -= 1
+                sjf_current[sjf_expired] = _NO_PROCESS
+                released.append(sjf_heads[sjf_expired])
+
+            # Release processes from IO, bringing their bursts up to date
+            io_released = self._io_completions.pop(tick, None)
+            if io_released is not None:
+                io_released = np.concatenate(io_released)
+                io_ticks = tick - self._io_start_ticks[io_released]
+                io_bursts = current_bursts[io_released]
+                current_bursts[io_released] = io_bursts - io_ticks
+                times_in_queue[io_released] += io_ticks
+                self._remaining_bursts[io_released] -= io_bursts > 0
+                released.append(io_released)
+
+            if released:
+                num_unfinished -= self._reschedule(tick, base, np.concatenate(released))
+                has_rr, rr_heads = queue_heads(rr_sequence)
+                has_fcfs, fcfs_heads = queue_heads(fcfs_sequence)
+
+            # Context switch
+            selecting = context_switch_counters <= 0
+
+            runs_rr = has_rr
+            runs_fcfs = ~has_rr & has_fcfs
+            runs_sjf = ~has_rr & ~has_fcfs & (self._sjf_sizes > 0)
+
+            rotated = selecting & runs_rr & (time_quantum_counters <= 0)
+            if rotated.any():
+                # Moves the old process to the back of the queue
+                self._rr_sequence[config_offsets[rotated] + rr_heads[rotated]] = (
+                    base + 3 * num_processes
+                )
+                time_quantum_counters[rotated] = self._time_quanta[rotated]
+                rr_heads[rotated] = rr_sequence[rotated].argmin(axis=1)
+
+            picking = selecting & runs_sjf & (sjf_current < 0)
+            if picking.any():
+                sjf_current[picking] = sjf_order[picking].argmin(axis=1)
+
+            next_process = np.where(
+                runs_rr,
+                rr_heads,
+                np.where(
+                    runs_fcfs, fcfs_heads, np.where(runs_sjf, sjf_current, _NO_PROCESS)
+                ),
+            )
+            switching = selecting & (next_process >= 0) & (next_process != last_running)
+            last_running[switching] = next_process[switching]
+            context_switch_counters[switching] = self._context_switch_times[switching]
+
+            # CPU tick (if not currently context switching)
+            context_switching = context_switch_counters > 0
+            context_switch_counters[context_switching] -= 1
+
+            running = ~context_switching & (next_process >= 0)
+            running_processes = config_offsets[running] + next_process[running]
+            current_bursts[running_processes] -= 1
+            times_in_queue[running_processes] += 1
+            self._remaining_bursts[running_processes] -= (
+                current_bursts[running_processes] == 0
+            )
+            time_quantum_counters[running & runs_rr] -= 1
+
+            tick += 1
+
+        self._completion_times = self._flat_completion_times.reshape(shape)
+
+    def _reschedule(self, tick: int, base: int, released: np.ndarray) -> int:
+        """
+        Reassign the processes released during a tick, in the same order as
+        MultiLevelFeedbackQueue.reschedule_expired_processes()
+
+        Processes are given as indices into the flattened state, and the
+        number of completed processes is returned
+        """
+        num_processes = len(self._process_names)
+        ranks = self._name_ranks[released % num_processes]
+
+        completed = self._remaining_bursts[released] == 0
+        self._flat_completion_times[released[completed]] = tick
+
+        burst_completed = ~completed & (self._current_bursts[released] <= 0)
+        demoted = ~completed & ~burst_completed
+
+        # Reassign demoted processes
+        demoted_processes = released[demoted]
+        self._levels[demoted_processes] += 1
+        self._times_in_queue[demoted_processes] = 0
+        demoted_levels = self._levels[demoted_processes]
+
+        to_fcfs = demoted_levels == FCFS_LEVEL
+        self._fcfs_sequence[demoted_processes[to_fcfs]] = (
+            base + num_processes + ranks[demoted][to_fcfs]
+        )
+
+        # Reassign based on IO or CPU burst completion
+        completed_processes = released[burst_completed]
+        self._burst_indices[completed_processes] += 1
+        next_burst_indices = self._burst_indices[completed_processes]
+        next_bursts = self._bursts[
+            completed_processes % num_processes,
+            np.minimum(next_burst_indices, self._bursts.shape[1] - 1),
+        ]
+        self._current_bursts[completed_processes] = next_bursts
+
+        to_cpu = next_burst_indices % 2 == 0
+        io_processes = completed_processes[~to_cpu]
+        if len(io_processes):
+            self._io_start_ticks[io_processes] = tick
+            io_completions = tick + np.maximum(next_bursts[~to_cpu], 1)
+            for completion_tick in np.unique(io_completions):
+                self._io_completions.setdefault(int(completion_tick), []).append(
+                    io_processes[io_completions == completion_tick]
+                )
+
+        cpu_processes = completed_processes[to_cpu]
+        cpu_ranks = ranks[burst_completed][to_cpu]
+        cpu_levels = self._levels[cpu_processes]
+        # Reset time allotment when going to CPU from IO (SJF has no allotment)
+        self._times_in_queue[cpu_processes[cpu_levels != SJF_LEVEL]] = 0
+        for sequence, queue_level in (
+            (self._rr_sequence, RR_LEVEL),
+            (self._fcfs_sequence, FCFS_LEVEL),
+        ):
+            pushed = cpu_levels == queue_level
+            sequence[cpu_processes[pushed]] = (
+                base + 2 * num_processes + cpu_ranks[pushed]
+            )
+
+        # Pushing to the SJF queue refreshes the snapshot of the selected process,
+        # and demotions into the SJF queue pre-empt it
+        demoted_to_sjf = demoted_processes[demoted_levels == SJF_LEVEL]
+        sjf_processes = np.concatenate(
+            [demoted_to_sjf, cpu_processes[cpu_levels == SJF_LEVEL]]
+        )
+        if len(sjf_processes):
+            sjf_configs = sjf_processes // num_processes
+            refreshed = np.unique(sjf_configs)
+            refreshed = refreshed[self._sjf_current[refreshed] >= 0]
+            self._push_sjf(refreshed * num_processes + self._sjf_current[refreshed])
+            self._sjf_current[demoted_to_sjf // num_processes] = _NO_PROCESS
+
+            self._push_sjf(sjf_processes)
+            np.add.at(self._sjf_sizes, sjf_configs, 1)
+
+        return int(completed.sum())
+
+    def _push_sjf(self, processes: np.ndarray) -> None:
+        """
+        Capture snapshot of burst times upon entry to the SJF queue
+        """
+        num_processes = len(self._process_names)
+        self._sjf_order[processes] = (
+            self._current_bursts[processes] * num_processes
+            + self._name_ranks[processes % num_processes]
+        )
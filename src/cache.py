@@ -0,0 +1,326 @@
+"""
+On-disk cache of the results of runs, used by the simulator with --cache
+
+Run from the root directory:
+    python -m src.mlfq --cache .mlfq-cache --verbosity summary < tests/input/set1.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import hashlib
+import itertools
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from collections.abc import Iterable, Sequence
+from time import time
+from typing import TextIO
+
+from .mlfq import PriorityQueue, Process, TraceSink
+
+# Part of every key, so entries cached by an older simulator are never read.
+# Bump it whenever a change to the simulator changes the results or the output
+# of a run, or the layout of an entry.
+CACHE_FORMAT_VERSION: int = 1
+
+
+def result_key(
+    priority_queues: Sequence[PriorityQueue],
+    context_switch_time: int,
+    processes: Iterable[Process],
+    options: dict,
+) -> str:
+    """
+    Hash of everything the results of a run depend on, to key ResultCache with:
+    CACHE_FORMAT_VERSION, the class and settings of each queue, the context
+    switch time, the other options of the run, and the workload, whose
+    processes must be in order of (arrival time, process name) so that the
+    same workload always hashes the same
+    """
+    key = hashlib.blake2b(digest_size=20)
+    key.update(f'{CACHE_FORMAT_VERSION}\n'.encode())
+
+    queues = [
+        [
+            type(queue).__name__,
+            queue.time_allotment,
+            getattr(queue, '_time_quantum', None),
+        ]
+        for queue in priority_queues
+    ]
+    config = {'queues': queues, 'context_switch_time': context_switch_time, **options}
+    key.update(json.dumps(config, sort_keys=True).encode())
+
+    # Lines are hashed in batches, as they are far cheaper to hash in bulk
+    processes = iter(processes)
+    while batch := list(itertools.islice(processes, 1 << 12)):
+        lines = [
+            f'{p.process_name};{p.arrival_time};{";".join(map(str, p.burst_times))}\n'
+            for p in batch
+        ]
+        key.update(''.join(lines).encode())
+    return key.hexdigest()
+
+
+class ResultRecorder(TraceSink):
+    """
+    Sink passing the output of a run on to another sink, while keeping its
+    final stats and, if record_trace is set, a zlib-compressed copy of the
+    whole output for ResultCache
+
+    The compressed output is dropped once it grows past max_trace_size.
+    """
+
+    traces_ticks: bool
+    # Lines from the 'SIMULATION DONE' line on, or None until then
+    stats: list[str] | None = None
+    _sink: TraceSink
+    _compressor: zlib._Compress | None = None
+    _compressed: list[bytes]
+    _compressed_size: int = 0
+    _max_trace_size: int
+    _pending_lines: list[str]
+
+    BATCH_SIZE: int = 1 << 10
+
+    def __init__(
+        self, sink: TraceSink, record_trace: bool, max_trace_size: int = 1 << 30
+    ) -> None:
+        self.traces_ticks = sink.traces_ticks
+        self._sink = sink
+        if record_trace:
+            self._compressor = zlib.compressobj()
+        self._compressed = []
+        self._max_trace_size = max_trace_size
+        self._pending_lines = []
+
+    def write(self, line: str) -> None:
+        self._sink.write(line)
+        if line.startswith('SIMULATION DONE'):
+            self.stats = []
+        if self.stats is not None:
+            self.stats.append(line)
+
+        if self._compressor is not None:
+            self._pending_lines.append(line)
+            if len(self._pending_lines) >= self.BATCH_SIZE:
+                self._compress_pending_lines()
+
+    def _compress_pending_lines(self) -> None:
+        if self._compressor is None or not self._pending_lines:
+            return
+
+        self._pending_lines.append('')
+        chunk = self._compressor.compress('\n'.join(self._pending_lines).encode())
+        self._pending_lines.clear()
+        self._compressed.append(chunk)
+        self._compressed_size += len(chunk)
+        if self._compressed_size > self._max_trace_size:
+            self._compressor = None
+            self._compressed = []
+
+    def flush(self) -> None:
+        self._sink.flush()
+
+    def checkpoint(self) -> int | None:
+        return self._sink.checkpoint()
+
+    @property
+    def trace(self) -> bytes | None:
+        """
+        Compressed output, or None if it was not recorded
+        Nothing can be written after it is read.
+        """
+        self._compress_pending_lines()
+        if self._compressor is None:
+            return None
+        return b''.join([*self._compressed, self._compressor.flush()])
+
+
+class CachedResult:
+    """
+    Results of a run, read from a ResultCache
+    """
+
+    stats: list[str]
+    metrics: dict
+    # Options the output was traced with, or None if only the stats were kept
+    trace_options: dict | None
+    _trace: bytes
+
+    def __init__(
+        self, stats: list[str], metrics: dict, trace_options: dict | None, trace: bytes
+    ) -> None:
+        self.stats = stats
+        self.metrics = metrics
+        self.trace_options = trace_options
+        self._trace = trace
+
+    def write_trace(self, stream: TextIO, chunk_size: int = 1 << 20) -> None:
+        """
+        Writes the whole output of the run, decompressed a chunk at a time
+        """
+        decompressor = zlib.decompressobj()
+        # Characters may be split between chunks
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for offset in range(0, len(self._trace), chunk_size):
+            chunk = decompressor.decompress(self._trace[offset : offset + chunk_size])
+            stream.write(decoder.decode(chunk))
+        stream.write(decoder.decode(decompressor.flush(), final=True))
+
+
+class ResultCache:
+    """
+    On-disk cache of the results of runs, keyed by result_key()
+
+    Each entry is a single file holding the final stats, the metrics and
+    optionally the compressed output of a run. Entries are written to a
+    temporary file and renamed into place, so concurrent runs sharing the
+    directory only ever read whole entries, and the last writer of a key wins.
+    The modification time of an entry is bumped whenever it is read, and the
+    least recently used entries are evicted once the directory holds more
+    than max_size bytes of them.
+    """
+
+    MAGIC: bytes = b'MLFQRESULT1\n'
+    SUFFIX: str = '.result'
+    # Temporary files left behind by crashed writers are removed after this long
+    STALE_SECONDS: int = 3600
+
+    directory: str
+    max_size: int
+
+    def __init__(self, directory: str, max_size: int = 1 << 30) -> None:
+        if max_size < 1:
+            raise Exception('Error: The result cache must hold at least one byte')
+
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str, trace_options: dict | None = None) -> CachedResult | None:
+        """
+        Results cached under key, or None if there are none
+        If trace_options is given, the output must have been traced with them.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as entry_file:
+                data = entry_file.read()
+            os.utime(path)
+        except OSError:
+            return None
+
+        if not data.startswith(self.MAGIC):
+            return None
+        try:
+            offset = len(self.MAGIC)
+            (header_size,) = struct.unpack_from('<q', data, offset)
+            offset += 8
+            header = json.loads(data[offset : offset + header_size])
+        except (struct.error, ValueError):
+            return None
+
+        if trace_options is not None and header['trace_options'] != trace_options:
+            return None
+        return CachedResult(
+            header['stats'],
+            header['metrics'],
+            header['trace_options'],
+            data[offset + header_size :],
+        )
+
+    def put(
+        self,
+        key: str,
+        stats: list[str],
+        metrics: dict,
+        trace_options: dict | None = None,
+        trace: bytes | None = None,
+    ) -> None:
+        """
+        Caches the results of a run under key, with its compressed output if
+        trace is given, which was traced with trace_options
+        """
+        header = json.dumps(
+            {
+                'stats': stats,
+                'metrics': metrics,
+                'trace_options': trace_options if trace is not None else None,
+            }
+        ).encode()
+        chunks = [self.MAGIC, struct.pack('<q', len(header)), header, trace or b'']
+        if sum(map(len, chunks)) > self.max_size:
+            return
+
+        descriptor, temporary_path = tempfile.mkstemp(
+            suffix='.tmp', prefix='.', dir=self.directory
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as entry_file:
+                entry_file.writelines(chunks)
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until they fit in max_size
+        """
+        now = time()
+        entries: list[tuple[float, int, str]] = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(self.SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif (
+                    entry.name.endswith('.tmp')
+                    and now - stat.st_mtime > self.STALE_SECONDS
+                ):
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                # Removed by a concurrent run
+                pass
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        entries.sort()
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+
+def write_cached_result(result: CachedResult, args: argparse.Namespace) -> None:
+    """
+    Writes the output and metrics of a cached run, as main() would have
+    """
+    output: TextIO = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.verbosity == 'full':
+            result.write_trace(output)
+        elif args.verbosity == 'summary':
+            output.write('\n'.join(result.stats) + '\n')
+        output.flush()
+    finally:
+        if args.output:
+            output.close()
+
+    if args.metrics:
+        with open(args.metrics, 'w') as metrics_file:
+            json.dump(result.metrics, metrics_file, indent=2)
+            metrics_file.write('\n')
@@ -0,0 +1,810 @@
+"""
+Checkpoints of a running simulation, to resume it after it is interrupted
+
+The simulation hands its state over as a SimulationState (see
+MultiLevelFeedbackQueue.get_state), which a CheckpointCodec encodes as a
+Checkpoint of named sections, and restores it from one. A Checkpointer takes
+checkpoints as the simulation runs and appends them to a CheckpointLog.
+
+Run from the root directory:
+    python -m src.mlfq --checkpoint run.ckpt --checkpoint-every 100 --output run.txt < tests/input/set1.txt
+    python -m src.mlfq --checkpoint run.ckpt --resume --output run.txt < tests/input/set1.txt
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import signal
+import struct
+import threading
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from .mlfq import MultiLevelFeedbackQueue, Process, ProcessTable, SimulationState
+
+
+@dataclass
+class CheckpointHeader:
+    """
+    Scalar state of a simulation, saved as the 'header' section of a checkpoint
+    """
+
+    tick: int
+    context_switch_counter: int
+    # Refs of the processes last run and on the CPU, or -1 if there are none
+    last_running_ref: int
+    current_ref: int
+    # Index of the first process of the future processes that has not arrived
+    next_arrival_index: int
+    # Position in the trace output at which the checkpoint was taken
+    trace_position: int | None
+    # Processes loaded from the stream so far, or None if not streamed
+    num_streamed: int | None
+    boost_epoch: int
+
+    def encode(self) -> array[int]:
+        return array(
+            'q',
+            [
+                self.tick,
+                self.context_switch_counter,
+                self.last_running_ref,
+                self.current_ref,
+                self.next_arrival_index,
+                -1 if self.trace_position is None else self.trace_position,
+                -1 if self.num_streamed is None else self.num_streamed,
+                self.boost_epoch,
+            ],
+        )
+
+    @classmethod
+    def decode(cls, payload: Sequence[int]) -> CheckpointHeader:
+        (
+            tick,
+            context_switch_counter,
+            last_running_ref,
+            current_ref,
+            next_arrival_index,
+            trace_position,
+            num_streamed,
+            boost_epoch,
+        ) = payload
+        return cls(
+            tick,
+            context_switch_counter,
+            last_running_ref,
+            current_ref,
+            next_arrival_index,
+            trace_position if trace_position >= 0 else None,
+            num_streamed if num_streamed >= 0 else None,
+            boost_epoch,
+        )
+
+
+class Checkpoint:
+    """
+    Snapshot of a simulation, as named sections of integers (array('q')) or bytes
+
+    The file format is a magic string, followed by each section as its name
+    and payload, both prefixed by their length. Integers are stored in native
+    byte order, so checkpoints are meant to be resumed on the same machine.
+    """
+
+    MAGIC: bytes = b'MLFQCKPT2\n'
+    _LENGTH: struct.Struct = struct.Struct('<Q')
+
+    sections: dict[str, array[int] | bytes]
+
+    def __init__(self, sections: dict[str, array[int] | bytes]) -> None:
+        self.sections = sections
+
+    @property
+    def header(self) -> CheckpointHeader:
+        return CheckpointHeader.decode(self.sections['header'])
+
+    @property
+    def trace_position(self) -> int | None:
+        """
+        Position in the trace output at which the checkpoint was taken
+        """
+        return self.header.trace_position
+
+    def encode(self) -> bytes:
+        chunks: list[bytes] = [self.MAGIC]
+        for name, payload in self.sections.items():
+            encoded_name = name.encode()
+            # Integer sections are marked by a trailing ':' in their name
+            if isinstance(payload, array):
+                encoded_name += b':'
+                payload = payload.tobytes()
+            chunks += [
+                self._LENGTH.pack(len(encoded_name)),
+                encoded_name,
+                self._LENGTH.pack(len(payload)),
+                payload,
+            ]
+        return b''.join(chunks)
+
+    @classmethod
+    def decode(cls, data: bytes) -> Checkpoint:
+        if not data.startswith(cls.MAGIC):
+            raise Exception('Error: Not a checkpoint file.')
+
+        sections: dict[str, array[int] | bytes] = {}
+        offset = len(cls.MAGIC)
+        while offset < len(data):
+            (name_length,) = cls._LENGTH.unpack_from(data, offset)
+            offset += cls._LENGTH.size
+            name = data[offset : offset + name_length].decode()
+            offset += name_length
+            (payload_length,) = cls._LENGTH.unpack_from(data, offset)
+            offset += cls._LENGTH.size
+            payload = data[offset : offset + payload_length]
+            offset += payload_length
+
+            if name.endswith(':'):
+                sections[name[:-1]] = array('q', payload)
+            else:
+                sections[name] = payload
+        return cls(sections)
+
+    def chunks(self, name: str) -> Iterator[array[int] | bytes]:
+        """
+        Sections name_0, name_1, ... of a section split into chunks, in order
+        """
+        for i in itertools.count():
+            chunk = self.sections.get(f'{name}_{i}')
+            if chunk is None:
+                return
+            yield chunk
+
+    @classmethod
+    def read(cls, path: str) -> Checkpoint:
+        """
+        Last checkpoint written by a Checkpointer
+        """
+        with open(path, 'rb') as checkpoint_file:
+            if checkpoint_file.read(len(CheckpointLog.MAGIC)) != CheckpointLog.MAGIC:
+                raise Exception('Error: Not a checkpoint file.')
+            return CheckpointLog.read_last(checkpoint_file)
+
+
+class CheckpointLog:
+    """
+    Appends checkpoints of a simulation to a file, writing each section only if
+    it changed since the previous checkpoint
+
+    A section is taken to be unchanged if its payload is the very object that
+    was written for the previous checkpoint, as the simulation keeps the chunks
+    of its tables that did not change between checkpoints (see
+    CheckpointCodec). Each checkpoint is then written as the
+    payloads of its changed sections, followed by a directory of the offset
+    and size of the payload of every section in the file.
+
+    Entries are written from the current position of the file, each as its
+    kind and size followed by its data. A directory ends with its own offset,
+    so that the last checkpoint is found from the end of the file.
+    """
+
+    MAGIC: bytes = b'MLFQCKPTLOG1\n'
+    ENTRY: struct.Struct = struct.Struct('<2q')
+    # Kinds of entries
+    PAYLOAD: int = 0
+    DIRECTORY: int = 1
+    # Offset and size of the payload of a section and size of its name, which
+    # follows, in a directory
+    _SECTION: struct.Struct = struct.Struct('<3q')
+    # Offset of the directory entry and mark at the end of a directory
+    _DIRECTORY_END: struct.Struct = struct.Struct('<q8s')
+    _DIRECTORY_MARK: bytes = b'MLFQDIR\n'
+
+    _file: BinaryIO
+    # Payload of every section of the last checkpoint, with its offset and size
+    _written: dict[str, tuple[array[int] | bytes, int, int]]
+    # Size the last checkpoint would take on its own, directory included
+    checkpoint_size: int = 0
+
+    def __init__(self, file: BinaryIO) -> None:
+        self._file = file
+        self._written = {}
+
+    def append_entry(self, kind: int, data: bytes | array[int]) -> int:
+        """
+        Appends an entry, returning its offset
+        """
+        offset = self._file.tell()
+        self._file.write(self.ENTRY.pack(kind, memoryview(data).nbytes))
+        self._file.write(data)
+        return offset
+
+    def append(self, checkpoint: Checkpoint) -> int:
+        """
+        Appends a checkpoint, returning the offset of its directory
+        """
+        written: dict[str, tuple[array[int] | bytes, int, int]] = {}
+        directory: list[bytes] = []
+        for name, payload in checkpoint.sections.items():
+            entry = self._written.get(name)
+            if entry is None or entry[0] is not payload:
+                offset = self.append_entry(self.PAYLOAD, payload) + self.ENTRY.size
+                entry = (payload, offset, memoryview(payload).nbytes)
+            written[name] = entry
+
+            # Integer sections are marked by a trailing ':' in their name
+            encoded_name = (name + ':' if isinstance(payload, array) else name).encode()
+            directory += [
+                self._SECTION.pack(entry[1], entry[2], len(encoded_name)),
+                encoded_name,
+            ]
+        self._written = written
+
+        offset = self._file.tell()
+        directory.append(self._DIRECTORY_END.pack(offset, self._DIRECTORY_MARK))
+        directory_data = b''.join(directory)
+        self.checkpoint_size = (
+            sum(size for _, _, size in written.values())
+            + len(directory_data)
+            + self.ENTRY.size * (len(written) + 1)
+        )
+        return self.append_entry(self.DIRECTORY, directory_data)
+
+    @classmethod
+    def entries(cls, file: BinaryIO, offset: int) -> Iterator[tuple[int, int, int]]:
+        """
+        Kind, offset and data size of the entries from offset on, up to the last
+        one that was written completely
+        """
+        size = file.seek(0, os.SEEK_END)
+        while offset + cls.ENTRY.size <= size:
+            file.seek(offset)
+            kind, data_size = cls.ENTRY.unpack(file.read(cls.ENTRY.size))
+            end = offset + cls.ENTRY.size + data_size
+            if end > size:
+                return
+            yield kind, offset, data_size
+            offset = end
+
+    @classmethod
+    def read_checkpoint(cls, file: BinaryIO, offset: int) -> Checkpoint:
+        """
+        Checkpoint of the directory at offset
+        """
+        file.seek(offset)
+        kind, size = cls.ENTRY.unpack(file.read(cls.ENTRY.size))
+        if kind != cls.DIRECTORY:
+            raise Exception('Error: Not a checkpoint directory.')
+
+        directory = file.read(size)
+        sections: dict[str, array[int] | bytes] = {}
+        position = 0
+        while position < size - cls._DIRECTORY_END.size:
+            payload_offset, payload_size, name_size = cls._SECTION.unpack_from(
+                directory, position
+            )
+            position += cls._SECTION.size
+            name = directory[position : position + name_size].decode()
+            position += name_size
+
+            file.seek(payload_offset)
+            payload = file.read(payload_size)
+            if name.endswith(':'):
+                sections[name[:-1]] = array('q', payload)
+            else:
+                sections[name] = payload
+        return Checkpoint(sections)
+
+    @classmethod
+    def read_last(cls, file: BinaryIO) -> Checkpoint:
+        """
+        Last checkpoint in a file whose entries start at its current position
+        """
+        start = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        last_directory: int | None = None
+        if size - start >= cls.ENTRY.size + cls._DIRECTORY_END.size:
+            file.seek(size - cls._DIRECTORY_END.size)
+            offset, mark = cls._DIRECTORY_END.unpack(file.read(cls._DIRECTORY_END.size))
+            file.seek(offset)
+            if mark == cls._DIRECTORY_MARK and start <= offset < size:
+                kind, data_size = cls.ENTRY.unpack(file.read(cls.ENTRY.size))
+                if (
+                    kind == cls.DIRECTORY
+                    and offset + cls.ENTRY.size + data_size == size
+                ):
+                    last_directory = offset
+
+        if last_directory is None:
+            # The last checkpoint was not written completely
+            for kind, offset, _ in cls.entries(file, start):
+                if kind == cls.DIRECTORY:
+                    last_directory = offset
+        if last_directory is None:
+            raise Exception('Error: The checkpoint file holds no complete checkpoint.')
+        return cls.read_checkpoint(file, last_directory)
+
+
+class CheckpointCodec:
+    """
+    Encodes the state of a simulation as checkpoints, and restores a
+    simulation from them
+
+    Processes are referred to by refs, made of the number of their table (in
+    order of discovery) and their row in that table. Tables and lists of refs
+    are saved in chunks, which are kept between checkpoints of the same
+    simulation. The workload of a process never changes, and its state only
+    changes while it is live, so a chunk is only encoded again if it grew or
+    holds a process that was live at the last checkpoint or has arrived since.
+    The cost of a checkpoint thus grows with the live processes rather than
+    with the whole run, and the chunks that did not change are the very
+    objects of the last checkpoint (see CheckpointLog).
+    """
+
+    # Rows in each chunk of the tables and lists of refs
+    CHUNK_ROWS: int = 1024
+
+    _tables: dict[int, tuple[int, ProcessTable]]
+    _all_refs: array[int]
+    _future_refs: array[int]
+    # Chunks of the lists of refs and of the tables in the last checkpoint,
+    # with the number of rows of each table they cover, which are reused while
+    # they cannot have changed
+    _ref_chunks: dict[str, list[array[int]]]
+    _table_rows: array[int]
+    _table_chunks: list[tuple[list[bytes], list[bytes]]]
+    # Processes that were live at the last checkpoint, or None before the first
+    _touched: list[Process] | None = None
+    # Where the processes that arrived since the last checkpoint start, in the
+    # lists of every process and of future processes of the simulation, and
+    # the generation of its future processes then
+    _num_processes: int = 0
+    _next_arrival_index: int = 0
+    _future_generation: int = 0
+
+    def __init__(self) -> None:
+        self._tables = {}
+        self._all_refs = array('q')
+        self._future_refs = array('q')
+        self._ref_chunks = {}
+        self._table_rows = array('q')
+        self._table_chunks = []
+
+    def _process_ref(self, process: Process) -> int:
+        table = process._table
+        entry = self._tables.get(id(table))
+        if entry is None:
+            entry = (len(self._tables), table)
+            self._tables[id(table)] = entry
+        return entry[0] << 32 | process._index
+
+    def _add_ref_chunks(
+        self,
+        sections: dict[str, array[int] | bytes],
+        name: str,
+        refs: array[int],
+        chunks: list[array[int]],
+    ) -> None:
+        """
+        Adds refs to sections in chunks, reusing the full chunks of an earlier
+        copy of refs, which refs may only have been appended to since
+        """
+        size = self.CHUNK_ROWS
+        if chunks and len(chunks[-1]) < size:
+            chunks.pop()
+        for start in range(len(chunks) * size, len(refs), size):
+            chunks.append(refs[start : start + size])
+        for i, chunk in enumerate(chunks):
+            sections[f'{name}_{i}'] = chunk
+
+    def _add_table_chunks(
+        self,
+        sections: dict[str, array[int] | bytes],
+        tables: Sequence[ProcessTable],
+        table_rows: array[int],
+        table_chunks: list[tuple[list[bytes], list[bytes]]],
+        dirty_chunks: dict[int, Iterable[int]],
+    ) -> None:
+        """
+        Adds the chunks of tables to sections, reusing the chunks encoded for
+        earlier checkpoints (table_chunks, along with the number of rows they
+        cover) unless the table grew since or they are dirty
+        """
+        size = self.CHUNK_ROWS
+        for number, table in enumerate(tables):
+            if number == len(table_chunks):
+                table_rows.append(0)
+                table_chunks.append(([], []))
+            workload_chunks, state_chunks = table_chunks[number]
+
+            # Tables only grow, from their last chunk on
+            num_rows = len(table)
+            first_new = len(state_chunks)
+            if num_rows > table_rows[number]:
+                first_new = table_rows[number] // size
+                del workload_chunks[first_new:]
+                del state_chunks[first_new:]
+                for start in range(first_new * size, num_rows, size):
+                    end = min(start + size, num_rows)
+                    workload_chunks.append(table.encode_workload(start, end))
+                    state_chunks.append(table.encode_state(start, end))
+                table_rows[number] = num_rows
+
+            for i in dirty_chunks.get(number, ()):
+                if i < first_new:
+                    state_chunks[i] = table.encode_state(
+                        i * size, min((i + 1) * size, num_rows)
+                    )
+
+            for i, (workload, state) in enumerate(zip(workload_chunks, state_chunks)):
+                sections[f'workload_{number}_{i}'] = workload
+                sections[f'state_{number}_{i}'] = state
+        sections['tables'] = array('q', table_rows)
+
+    def _dirty_chunks(self, state: SimulationState) -> dict[int, Iterable[int]]:
+        """
+        Chunks of each table holding processes that may have changed since the
+        last checkpoint, as they were live at it or have arrived since
+        """
+        if state.num_streamed is not None:
+            # Streamed processes are appended to the list of every process as
+            # they arrive
+            arrived = state.all_processes[self._num_processes :]
+        elif state.future_generation == self._future_generation:
+            arrived = state.future_processes[
+                self._next_arrival_index : state.next_arrival_index
+            ]
+        else:
+            # Processes were added, which reorders the future processes, so
+            # the ones that arrived since cannot be told apart
+            return {
+                number: range(len(chunks))
+                for number, (_, chunks) in enumerate(self._table_chunks)
+            }
+
+        dirty_chunks: dict[int, set[int]] = {}
+        for process in itertools.chain(self._touched or (), arrived):
+            number = self._tables[id(process._table)][0]
+            dirty_chunks.setdefault(number, set()).add(
+                process._index // self.CHUNK_ROWS
+            )
+        return dirty_chunks
+
+    def checkpoint(
+        self, mlfq: MultiLevelFeedbackQueue, live_only: bool = False
+    ) -> Checkpoint:
+        """
+        Captures the state of a simulation, which must be between two
+        iterations of run()
+
+        If live_only is set, only the processes that have not completed are
+        copied, so the checkpoint grows with the live processes rather than
+        with the whole run. Resuming from it replays the rest of the run, but
+        the final stats then miss the processes that had already completed.
+        """
+        # Rows of each table in the compact tables of a live_only checkpoint,
+        # which are taken as the processes are first referenced
+        live_rows: dict[int, tuple[int, ProcessTable, list[int]]] = {}
+        live_refs: dict[Process, int] = {}
+        process_ref: Callable[[Process], int] = self._process_ref
+        if live_only:
+
+            def process_ref(process: Process) -> int:
+                ref = live_refs.get(process)
+                if ref is None:
+                    table = process._table
+                    entry = live_rows.get(id(table))
+                    if entry is None:
+                        entry = (len(live_rows), table, [])
+                        live_rows[id(table)] = entry
+                    ref = entry[0] << 32 | len(entry[2])
+                    entry[2].append(process._index)
+                    live_refs[process] = ref
+                return ref
+
+        # Processes referenced by the state of the queues, the IO and the CPU
+        live_processes: list[Process] = []
+
+        def live_ref(process: Process) -> int:
+            live_processes.append(process)
+            return process_ref(process)
+
+        state = mlfq.get_state(live_ref)
+        is_streamed = state.num_streamed is not None
+        next_arrival_index = state.next_arrival_index
+        if live_only:
+            future_refs = array(
+                'q', map(process_ref, state.future_processes[next_arrival_index:])
+            )
+            next_arrival_index = 0
+        else:
+            # Processes are only ever appended to the list of every process
+            all_refs = self._all_refs
+            all_refs.extend(map(process_ref, state.all_processes[len(all_refs) :]))
+            # Future processes only change while streaming, where few are loaded,
+            # or when processes are added (which reorders them)
+            future_refs = self._future_refs
+            if (
+                is_streamed
+                or len(future_refs) != len(state.future_processes)
+                or state.future_generation != self._future_generation
+            ):
+                future_refs = array('q', map(process_ref, state.future_processes))
+                self._future_refs = future_refs
+                self._ref_chunks['future_processes'] = []
+
+        sections: dict[str, array[int] | bytes] = {
+            'queue_types': state.queue_types.encode(),
+        }
+        for level, queue_state in enumerate(state.queue_states):
+            sections[f'queue_{level}'] = queue_state
+        sections['io'] = state.io_state
+        for i, metrics_state in enumerate(state.metrics_state):
+            sections[f'metrics_{i}'] = metrics_state
+        # Where to resume the stream from, if it is known
+        sections['stream_position'] = array('q', state.stream_position or ())
+        sections['header'] = CheckpointHeader(
+            state.tick,
+            state.context_switch_counter,
+            state.last_running_ref,
+            state.current_ref,
+            next_arrival_index,
+            state.trace_position,
+            state.num_streamed,
+            state.boost_epoch,
+        ).encode()
+
+        if live_only:
+            # The processes that have arrived and not completed are all in the
+            # queues, the IO or on the CPU, so they are found without going
+            # through the completed ones
+            all_refs = array(
+                'q',
+                (
+                    live_refs[p]
+                    for p in dict.fromkeys(live_processes)
+                    if not p.is_process_complete
+                ),
+            )
+            if not is_streamed:
+                all_refs.extend(future_refs)
+            live_tables = [table.take(rows) for _, table, rows in live_rows.values()]
+            self._add_ref_chunks(sections, 'all_processes', all_refs, [])
+            self._add_ref_chunks(sections, 'future_processes', future_refs, [])
+            self._add_table_chunks(sections, live_tables, array('q'), [], {})
+            return Checkpoint(sections)
+
+        ref_chunks = self._ref_chunks
+        self._add_ref_chunks(
+            sections,
+            'all_processes',
+            all_refs,
+            ref_chunks.setdefault('all_processes', []),
+        )
+        self._add_ref_chunks(
+            sections,
+            'future_processes',
+            future_refs,
+            ref_chunks.setdefault('future_processes', []),
+        )
+
+        dirty_chunks = self._dirty_chunks(state)
+        self._touched = live_processes
+        self._num_processes = len(state.all_processes)
+        self._next_arrival_index = state.next_arrival_index
+        self._future_generation = state.future_generation
+        self._add_table_chunks(
+            sections,
+            [table for _, table in self._tables.values()],
+            self._table_rows,
+            self._table_chunks,
+            dirty_chunks,
+        )
+        return Checkpoint(sections)
+
+    def restore(self, mlfq: MultiLevelFeedbackQueue, checkpoint: Checkpoint) -> None:
+        """
+        Continues a simulation from a checkpoint (see
+        MultiLevelFeedbackQueue.set_state), after which the chunks of the
+        checkpoint are reused by the next checkpoint of the simulation
+        """
+        sections = checkpoint.sections
+        header = checkpoint.header
+        table_chunks = [
+            (
+                list(checkpoint.chunks(f'workload_{number}')),
+                list(checkpoint.chunks(f'state_{number}')),
+            )
+            for number in range(len(sections['tables']))
+        ]
+        tables = [
+            ProcessTable.from_chunks(workload_chunks, state_chunks)
+            for workload_chunks, state_chunks in table_chunks
+        ]
+        ref_chunks = {
+            name: list(checkpoint.chunks(name))  # type: ignore[arg-type]
+            for name in ('all_processes', 'future_processes')
+        }
+
+        def process_of(ref: int) -> Process:
+            return Process._from_table(tables[ref >> 32], ref & 0xFFFFFFFF)
+
+        live_processes: list[Process] = []
+
+        def live_process_of(ref: int) -> Process:
+            process = process_of(ref)
+            live_processes.append(process)
+            return process
+
+        queue_types = bytes(sections['queue_types']).decode()
+        state = SimulationState(
+            queue_types=queue_types,
+            tick=header.tick,
+            context_switch_counter=header.context_switch_counter,
+            boost_epoch=header.boost_epoch,
+            last_running_ref=header.last_running_ref,
+            current_ref=header.current_ref,
+            queue_states=[
+                sections[f'queue_{level}']  # type: ignore[misc]
+                for level in range(len(queue_types.split()))
+            ],
+            io_state=sections['io'],  # type: ignore[arg-type]
+            metrics_state=[
+                payload  # type: ignore[misc]
+                for name, payload in sections.items()
+                if name.startswith('metrics_')
+            ],
+            all_processes=list(
+                map(
+                    process_of,
+                    itertools.chain.from_iterable(ref_chunks['all_processes']),
+                )
+            ),
+            future_processes=list(
+                map(
+                    process_of,
+                    itertools.chain.from_iterable(ref_chunks['future_processes']),
+                )
+            ),
+            next_arrival_index=header.next_arrival_index,
+            future_generation=0,
+            num_streamed=header.num_streamed,
+            stream_position=sections.get('stream_position'),  # type: ignore[arg-type]
+            trace_position=header.trace_position,
+        )
+        mlfq.set_state(state, live_process_of)
+
+        # Refs and chunks stay valid, as the tables are numbered in the same order
+        self._tables = {
+            id(table): (number, table) for number, table in enumerate(tables)
+        }
+        self._all_refs = array(
+            'q', itertools.chain.from_iterable(ref_chunks['all_processes'])
+        )
+        self._future_refs = array(
+            'q', itertools.chain.from_iterable(ref_chunks['future_processes'])
+        )
+        self._ref_chunks = ref_chunks
+        self._table_rows = array('q', sections['tables'])
+        self._table_chunks = table_chunks
+        self._touched = live_processes
+        self._num_processes = len(state.all_processes)
+        self._next_arrival_index = state.next_arrival_index
+        self._future_generation = state.future_generation
+
+
+class Checkpointer:
+    """
+    Checkpoints a running simulation every `every` ticks, and whenever
+    signal_number is received
+
+    Checkpoints are taken between two iterations of the simulation loop, where
+    only the parts of the state that changed since the previous checkpoint are
+    copied (see CheckpointCodec). Writing them out is left to a background
+    thread. If the previous checkpoint is still being written, the next one
+    is deferred to a later iteration instead of waiting for it.
+
+    Checkpoints are appended to a CheckpointLog, so each only writes what
+    changed. Once the log has grown to twice the size of its last checkpoint,
+    that checkpoint is written to a new log, which atomically replaces it.
+    """
+
+    _path: str
+    codec: CheckpointCodec
+    _every: int | None
+    _next_tick: int | None
+    _requested: bool
+    _writer: threading.Thread | None
+    _file: BinaryIO | None
+    _log: CheckpointLog | None
+    _signal_number: int | None
+    _previous_handler: Callable | int | None
+
+    def __init__(
+        self,
+        path: str,
+        every: int | None = None,
+        signal_number: int | None = None,
+        codec: CheckpointCodec | None = None,
+    ) -> None:
+        """
+        If a codec is given, e.g. the one the simulation was restored with, its
+        chunks are reused by the first checkpoint
+        """
+        self._path = path
+        self.codec = codec if codec is not None else CheckpointCodec()
+        self._every = every
+        self._next_tick = None
+        self._requested = False
+        self._writer = None
+        self._file = None
+        self._log = None
+        self._signal_number = signal_number
+        self._previous_handler = None
+        if signal_number is not None:
+            self._previous_handler = signal.signal(signal_number, self._request)
+
+    def _request(self, signal_number: int, frame) -> None:
+        # Only sets a flag, as the state is inconsistent in the middle of a tick
+        self._requested = True
+
+    def on_iteration(self, mlfq: MultiLevelFeedbackQueue) -> None:
+        if self._every:
+            if self._next_tick is None:
+                self._next_tick = (mlfq.tick // self._every + 1) * self._every
+            elif mlfq.tick >= self._next_tick:
+                self._requested = True
+
+        if not self._requested or (
+            self._writer is not None and self._writer.is_alive()
+        ):
+            return
+
+        self._requested = False
+        if self._every:
+            self._next_tick = (mlfq.tick // self._every + 1) * self._every
+
+        self._writer = threading.Thread(
+            target=self._write, args=(self.codec.checkpoint(mlfq),)
+        )
+        self._writer.start()
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        if (
+            self._file is not None
+            and self._log is not None
+            and self._file.tell() <= 2 * self._log.checkpoint_size
+        ):
+            self._log.append(checkpoint)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return
+
+        # Start a new log, which only replaces the previous one once complete
+        temporary_path = f'{self._path}.tmp'
+        checkpoint_file = open(temporary_path, 'wb')
+        checkpoint_file.write(CheckpointLog.MAGIC)
+        log = CheckpointLog(checkpoint_file)
+        log.append(checkpoint)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self._path)
+
+        if self._file is not None:
+            self._file.close()
+        self._file = checkpoint_file
+        self._log = log
+
+    def close(self) -> None:
+        """
+        Wait for the last checkpoint to be written
+        """
+        if self._writer is not None:
+            self._writer.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._signal_number is not None:
+            signal.signal(self._signal_number, self._previous_handler)
+            self._signal_number = None
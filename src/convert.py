@@ -0,0 +1,44 @@
+"""
+Converts workloads from the text format to the binary columnar format
+
+Columnar workloads (see mlfq.write_columnar_workload) are memory-mapped when
+they are read, instead of parsed, so a run starts just as fast whatever the
+size of its workload. Text workloads are streamed, and sorted externally if
+they are not in order of arrival, so conversion runs in bounded memory.
+
+Run from the root directory:
+    python -m src.convert workload.txt workload.mlfq
+    python -m src.mlfq --input workload.mlfq
+"""
+
+import argparse
+import sys
+from collections.abc import Sequence
+
+from .mlfq import read_process_stream, write_columnar_workload
+
+
+def convert(text_path: str, columnar_path: str) -> int:
+    """
+    Converts a text workload to a columnar one, returning its number of processes
+    """
+    return write_columnar_workload(columnar_path, *read_process_stream(text_path))
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Converts a text workload to the binary columnar format.'
+    )
+    parser.add_argument('workload', help='workload file, in the same format as stdin')
+    parser.add_argument('output', help='columnar workload file to write')
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+    num_processes = convert(args.workload, args.output)
+    print(f'Converted {num_processes} processes to {args.output}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,396 @@
+"""
+Rolling trace digests, to compare long runs in constant memory
+
+A digest holds a rolling hash of the full trace of a run, checkpointed every K
+ticks (see TraceDigest). It is written by the simulator with --digest, or
+computed from an existing output file. Two digests are compared checkpoint by
+checkpoint, which narrows the first divergence down to a window of ticks
+between two checkpoints. Only that window is then read from the outputs, at
+the byte offsets of the checkpoints, to find the first tick that differs. An
+output that was not kept can be re-rendered for just that window with
+--trace-window.
+
+Run from the root directory:
+    python -m src.digest make tests/output/set1.txt -o set1.digest
+    python -m src.mlfq --digest new.digest < tests/input/set1.txt
+    python -m src.mlfq --trace-window 40:60 --output new.txt < tests/input/set1.txt
+    python -m src.digest compare set1.digest new.digest --outputs tests/output/set1.txt new.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import sys
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import TextIO
+
+from .mlfq import TraceSink
+
+# (tick, offset, hash) of a checkpoint, with a tick of None for the end of a run
+DigestEntry = tuple[int | None, int, str]
+
+
+def trace_tick(line: str) -> int | None:
+    """
+    Tick of an 'At Time' line, which starts the block of lines of that tick
+    """
+    if line.startswith('At Time = '):
+        return int(line[10:])
+
+
+class TraceDigest:
+    """
+    Rolling hash of a trace, checkpointed every `every` ticks
+
+    A checkpoint is taken before the block of the first tick at or after each
+    multiple of every, and is made of that tick, the number of bytes of trace
+    before the block, and the hash of those bytes. Lines are hashed as UTF-8
+    with a trailing newline, so digesting the lines of an output file gives the
+    same checkpoints as digesting the trace as it is written.
+    """
+
+    _every: int
+    _next_checkpoint: int
+    _hash: hashlib._Hash
+    _offset: int = 0
+    _on_checkpoint: Callable[[int, int, str], None]
+    # Lines not hashed yet, hashed together as they are far cheaper to hash in bulk
+    _pending_lines: list[str]
+
+    BATCH_SIZE: int = 1 << 10
+
+    def __init__(
+        self, every: int, on_checkpoint: Callable[[int, int, str], None]
+    ) -> None:
+        """
+        on_checkpoint is called with (tick, offset, hash) of each checkpoint
+        """
+        if every < 1:
+            raise Exception('Error: Digest checkpoints must be at least a tick apart')
+
+        self._every = every
+        self._next_checkpoint = every
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._on_checkpoint = on_checkpoint
+        self._pending_lines = []
+
+    @property
+    def offset(self) -> int:
+        self._hash_pending_lines()
+        return self._offset
+
+    @property
+    def hash(self) -> str:
+        self._hash_pending_lines()
+        return self._hash.hexdigest()
+
+    def _hash_pending_lines(self) -> None:
+        if self._pending_lines:
+            self._pending_lines.append('')
+            data = '\n'.join(self._pending_lines).encode()
+            self._hash.update(data)
+            self._offset += len(data)
+            self._pending_lines.clear()
+
+    def add_line(self, line: str) -> None:
+        if line.startswith('At Time = '):
+            tick = int(line[10:])
+            if tick >= self._next_checkpoint:
+                self._on_checkpoint(tick, self.offset, self.hash)
+                self._next_checkpoint = (tick // self._every + 1) * self._every
+
+        self._pending_lines.append(line)
+        if len(self._pending_lines) >= self.BATCH_SIZE:
+            self._hash_pending_lines()
+
+
+class DigestTraceSink(TraceSink):
+    """
+    Sink writing a digest of the trace (see TraceDigest) instead of the trace
+
+    The digest starts with a header line, followed by a `tick offset hash` line
+    for every checkpoint, and ends with an `end offset hash` line once finish()
+    is called, which covers the whole trace
+    """
+
+    HEADER: str = 'MLFQ-DIGEST 1'
+
+    traces_ticks: bool = True
+
+    _stream: TextIO
+    _digest: TraceDigest
+
+    def __init__(self, stream: TextIO, every: int = 1000) -> None:
+        self._stream = stream
+        self._digest = TraceDigest(every, self._write_checkpoint)
+        stream.write(f'{self.HEADER} {every}\n')
+
+    def _write_checkpoint(self, tick: int, offset: int, hash: str) -> None:
+        self._stream.write(f'{tick} {offset} {hash}\n')
+
+    def write(self, line: str) -> None:
+        self._digest.add_line(line)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+    def checkpoint(self) -> int | None:
+        # The hash cannot be resumed
+        pass
+
+    def finish(self) -> None:
+        self._stream.write(f'end {self._digest.offset} {self._digest.hash}\n')
+        self._stream.flush()
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class WindowTraceSink(TraceSink):
+    """
+    Sink passing on only the blocks of the ticks in [start, end) to another
+    sink, along with the final stats if end is None
+    """
+
+    traces_ticks: bool = True
+
+    _sink: TraceSink
+    _start: int
+    _end: int | None
+    _in_window: bool = False
+
+    def __init__(self, sink: TraceSink, start: int, end: int | None = None) -> None:
+        self._sink = sink
+        self._start = start
+        self._end = end
+
+    def write(self, line: str) -> None:
+        tick = trace_tick(line)
+        if tick is not None:
+            self._in_window = self._start <= tick and (
+                self._end is None or tick < self._end
+            )
+        elif line.startswith('SIMULATION DONE'):
+            self._in_window = self._end is None
+
+        if self._in_window:
+            self._sink.write(line)
+
+    def flush(self) -> None:
+        self._sink.flush()
+
+    def checkpoint(self) -> int | None:
+        # Positions in a window do not match positions in the full trace
+        pass
+
+
+class Divergence:
+    """
+    Window of ticks in which two runs first diverge
+
+    The traces are identical up to the start checkpoint, and differ by the end
+    checkpoint, or by the end of a run if it is None
+    """
+
+    start: tuple[DigestEntry, DigestEntry]
+    end: tuple[DigestEntry | None, DigestEntry | None]
+
+    def __init__(
+        self,
+        start: tuple[DigestEntry, DigestEntry],
+        end: tuple[DigestEntry | None, DigestEntry | None],
+    ) -> None:
+        self.start = start
+        self.end = end
+
+    @property
+    def start_tick(self) -> int:
+        tick = self.start[0][0]
+        return 0 if tick is None else tick
+
+    @property
+    def end_tick(self) -> int | None:
+        """
+        First tick after the window, or None if the window runs to the end of
+        either run
+        """
+        ticks = [entry[0] for entry in self.end if entry is not None]
+        if len(ticks) < 2 or None in ticks:
+            return None
+        return min(ticks)
+
+    def offsets(self, run: int) -> tuple[int, int | None]:
+        """
+        Byte range of the window in the output of a run (0 or 1)
+        """
+        end = self.end[run]
+        return self.start[run][1], None if end is None or end[0] is None else end[1]
+
+
+def read_digest(stream: TextIO) -> tuple[int, Iterator[DigestEntry]]:
+    """
+    Ticks between checkpoints of a digest, and its entries as they are read
+    """
+    magic, version, every = stream.readline().rsplit(' ', 2)
+    if f'{magic} {version}' != DigestTraceSink.HEADER:
+        raise Exception('Error: Not a trace digest')
+
+    def entries() -> Iterator[DigestEntry]:
+        for line in stream:
+            tick, offset, hash = line.split()
+            yield None if tick == 'end' else int(tick), int(offset), hash
+
+    return int(every), entries()
+
+
+def digest_output(lines: Iterable[str], stream: TextIO, every: int = 1000) -> None:
+    """
+    Writes the digest of the lines of an output file, which is the same as the
+    digest written by --digest for the run that printed it
+    """
+    sink = DigestTraceSink(stream, every)
+    for line in lines:
+        sink.write(line.removesuffix('\n'))
+    sink.finish()
+
+
+def first_divergence(
+    entries_a: Iterable[DigestEntry], entries_b: Iterable[DigestEntry]
+) -> Divergence | None:
+    """
+    Window in which two runs first diverge, or None if they are identical
+    Only the entries up to the divergence are read.
+    """
+    start: tuple[DigestEntry, DigestEntry] = ((0, 0, ''), (0, 0, ''))
+    for entry_a, entry_b in itertools.zip_longest(entries_a, entries_b):
+        if entry_a != entry_b:
+            return Divergence(start, (entry_a, entry_b))
+        start = (entry_a, entry_b)
+
+
+def _tick_blocks(lines: Iterable[str]) -> Iterator[tuple[int | None, list[str]]]:
+    """
+    Lines of each tick of a trace, with a tick of None for the final stats
+    """
+    tick: int | None = None
+    block: list[str] = []
+    for line in lines:
+        line_tick = trace_tick(line)
+        if line_tick is not None or line.startswith('SIMULATION DONE'):
+            if block:
+                yield tick, block
+            tick, block = line_tick, []
+        block.append(line)
+    if block:
+        yield tick, block
+
+
+def first_divergent_tick(
+    lines_a: Iterable[str], lines_b: Iterable[str]
+) -> tuple[int | None, list[str], list[str]] | None:
+    """
+    First tick whose lines differ between two windows of traces, with the
+    lines of each, or None if the windows are identical
+    The tick is None if only the final stats differ.
+    """
+    for block_a, block_b in itertools.zip_longest(
+        _tick_blocks(lines_a), _tick_blocks(lines_b), fillvalue=(None, [])
+    ):
+        if block_a != block_b:
+            tick = block_a[0] if block_a[1] else block_b[0]
+            return tick, block_a[1], block_b[1]
+
+
+def read_window(path: str, divergence: Divergence, run: int) -> Iterator[str]:
+    """
+    Lines of the window of a divergence in the output of a run, which is either
+    the full output or a render of the window with --trace-window
+    """
+    start, end = divergence.offsets(run)
+    with open(path, 'rb') as output:
+        first_tick = trace_tick(output.readline().decode())
+        # Full outputs start at tick 0, and windows at their start tick
+        if not (divergence.start_tick > 0 and first_tick == divergence.start_tick):
+            output.seek(start)
+        else:
+            output.seek(0)
+            end = None
+
+        size = -1 if end is None else end - output.tell()
+        yield from output.read(size).decode().splitlines()
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Writes and compares rolling digests of simulator outputs.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    make = subparsers.add_parser('make', help='digest an output file')
+    make.add_argument('output', help='output file of the simulator')
+    make.add_argument('-o', '--digest', help='digest file, instead of stdout')
+    make.add_argument(
+        '--every', type=int, default=1000, help='ticks between checkpoints'
+    )
+
+    compare = subparsers.add_parser(
+        'compare', help='find the first tick where two runs diverge'
+    )
+    compare.add_argument('digests', nargs=2, help='digest files of both runs')
+    compare.add_argument(
+        '--outputs',
+        nargs=2,
+        help='outputs of both runs, or renders of the window with --trace-window, '
+        'to find the first divergent tick in',
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+
+    if args.command == 'make':
+        with open(args.output) as lines:
+            if args.digest:
+                with open(args.digest, 'w') as stream:
+                    digest_output(lines, stream, args.every)
+            else:
+                digest_output(lines, sys.stdout, args.every)
+        return
+
+    with open(args.digests[0]) as stream_a, open(args.digests[1]) as stream_b:
+        every_a, entries_a = read_digest(stream_a)
+        every_b, entries_b = read_digest(stream_b)
+        if every_a != every_b:
+            raise Exception('Error: Digests are checkpointed at different intervals')
+        divergence = first_divergence(entries_a, entries_b)
+
+    if divergence is None:
+        print('Runs are identical')
+        return
+
+    end = 'the end' if divergence.end_tick is None else f'tick {divergence.end_tick}'
+    print(f'Runs diverge between tick {divergence.start_tick} and {end}')
+
+    if args.outputs:
+        result = first_divergent_tick(
+            read_window(args.outputs[0], divergence, 0),
+            read_window(args.outputs[1], divergence, 1),
+        )
+        if result is None:
+            print('The outputs do not differ in this window')
+        else:
+            tick, lines_a, lines_b = result
+            print(
+                'First divergence in the final stats'
+                if tick is None
+                else f'First divergence at tick {tick}'
+            )
+            print('\n'.join(['--- first', *lines_a, '+++ second', *lines_b]))
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
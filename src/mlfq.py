@@ -1,134 +1,225 @@
 from __future__ import annotations
-from collections.abc import Sequence
-from typing import Protocol
+import argparse
+import bisect
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+from collections import deque
+from dataclasses import dataclass
+from array import array
+from collections.abc import Callable, Iterable, Iterator, MutableSequence, Sequence
+from operator import add
+from time import perf_counter_ns
+from typing import Protocol, TextIO
 
 
 class Process:
-    _process_name: str
-    _arrival_time: int
-    _total_burst_time: int
-    _burst_times: list[int]
-    _burst_index: int
-    _queue_level: int
-    _time_in_queue: int
-    _completion_time: int | None
-    _cpu_time: int
-    _is_from_IO: bool
+    """
+    View of a single row of a ProcessTable
+
+    Processes created directly are added to a table shared by all of them,
+    which is replaced by a new one once it holds SHARED_TABLE_ROWS processes,
+    so that it does not keep the rows of long gone processes alive
+    """
+
+    __slots__ = ('_table', '_index')
+
+    _table: ProcessTable
+    _index: int
+
+    SHARED_TABLE_ROWS: int = 1024
+    # Table processes created directly are added to, or None until the first
+    _shared_table: ProcessTable | None = None
 
     def __init__(
-        self, process_name: str, arrival_time: int, burst_times: list[int]
+        self,
+        process_name: str,
+        arrival_time: int,
+        burst_times: list[int],
+        table: ProcessTable | None = None,
     ) -> None:
-        self._process_name = process_name
-        self._arrival_time = arrival_time
-        self._burst_times = burst_times
-        self._total_burst_time = sum(self._burst_times)
-
-        self._burst_index = 0
-        self._queue_level = 0
-        self._time_in_queue = 0
-        self._completion_time = None
-        self._cpu_time = sum(burst_times[0::2])
+        if table is None:
+            table = Process._shared_table
+            if table is None or len(table) >= Process.SHARED_TABLE_ROWS:
+                table = Process._shared_table = ProcessTable()
+        self._table = table
+        self._index = table.append(process_name, arrival_time, burst_times)
+
+    @classmethod
+    def _from_table(cls, table: ProcessTable, index: int) -> Process:
+        process = cls.__new__(cls)
+        process._table = table
+        process._index = index
+        return process
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Process)
+            and self._table is other._table
+            and self._index == other._index
+        )
 
-        # Flag needed to deal with pre-emption
-        # Handling is left up to higher level interfaces
-        # Initially set to True so that newly arriving processes do not trigger pre-emption
-        self._is_from_IO = True
+    def __hash__(self) -> int:
+        return hash((id(self._table), self._index))
 
     def __repr__(self) -> str:
-        return self._process_name
+        return self._table._process_names[self._index]
 
     def __str__(self) -> str:
-        return self._process_name
+        return self._table._process_names[self._index]
 
     @property
     def process_name(self) -> str:
-        return self._process_name
+        return self._table._process_names[self._index]
 
     @property
     def arrival_time(self) -> int:
-        return self._arrival_time
+        return self._table._arrival_times[self._index]
 
     @property
     def completion_time(self) -> int:
-        if self._completion_time is None:
+        completion_time = self._table._completion_times[self._index]
+        if completion_time < 0:
             raise Exception(
                 "Error: Attempted to access property 'completion_time' of unfinished process."
             )
 
-        return self._completion_time
+        return completion_time
 
     @property
     def turnaround_time(self) -> int:
-        if self._completion_time is None:
+        completion_time = self._table._completion_times[self._index]
+        if completion_time < 0:
             raise Exception(
                 "Error: Attempted to access property 'turnaround_time' of unfinished process."
             )
 
-        return self._completion_time - self._arrival_time
+        return completion_time - self.arrival_time
 
     @property
     def waiting_time(self) -> int:
-        if self._completion_time is None:
+        completion_time = self._table._completion_times[self._index]
+        if completion_time < 0:
             raise Exception(
                 "Error: Attempted to access property 'waiting_time' of unfinished process."
             )
 
-        # todo: fix formula for waiting time
-        return self._completion_time - self._arrival_time - self._total_burst_time
+        # IO bursts all run in parallel, so any time not spent on a burst
+        # was spent waiting in the ready queues (including context switches)
+        return completion_time - self.arrival_time - self.total_burst_time
+
+    @property
+    def response_time(self) -> int:
+        first_run_time = self._table._first_run_times[self._index]
+        if first_run_time < 0:
+            raise Exception(
+                "Error: Attempted to access property 'response_time' of process that has not run."
+            )
+
+        return first_run_time - self.arrival_time
+
+    @property
+    def has_started(self) -> bool:
+        return self._table._first_run_times[self._index] >= 0
+
+    @property
+    def burst_times(self) -> Sequence[int]:
+        """
+        Initial burst times of the process
+        """
+        return self._table.burst_times(self._index)
+
+    @property
+    def total_burst_time(self) -> int:
+        return sum(self.burst_times)
 
     @property
     def queue_level(self) -> int:
-        return self._queue_level
+        return self._table._queue_levels[self._index]
 
     @property
     def time_in_queue(self) -> int:
-        return self._time_in_queue
+        return self._table._times_in_queue[self._index]
 
     @property
     def remaining_current_burst(self):
-        return self._burst_times[self._burst_index]
+        return self._table._current_bursts[self._index]
 
     @property
     def is_CPU_burst(self) -> bool:
-        return bool(self._burst_index % 2 == 0)
+        return bool(self._table._burst_indices[self._index] % 2 == 0)
 
-    def on_tick(self) -> None:
+    def on_tick(self, ticks: int = 1) -> None:
         """
         Updates the process burst time and time in queue
         """
-        self._time_in_queue += 1
-        self._burst_times[self._burst_index] -= 1
+        table = self._table
+        index = self._index
+        table._times_in_queue[index] += ticks
+
+        remaining = table._current_bursts[index]
+        table._current_bursts[index] = remaining - ticks
+        if remaining > 0 and remaining <= ticks:
+            table._remaining_bursts[index] -= 1
 
     def next_burst(self) -> None:
         """
         Updates the pointer to what burst (IO or CPU) should be running
         """
-        self._burst_index += 1
+        table = self._table
+        index = self._index
+        burst_index = table._burst_indices[index] + 1
+        table._burst_indices[index] = burst_index
+
+        offset = table._burst_offsets[index] + burst_index
+        if offset < table._burst_offsets[index + 1]:
+            table._current_bursts[index] = table._bursts[offset]
 
     @property
     def is_from_IO(self) -> bool:
-        return self._is_from_IO
+        return bool(self._table._from_IO[self._index])
 
     def set_from_IO(self, b: bool) -> None:
-        self._is_from_IO = b
+        self._table._from_IO[self._index] = b
 
     @property
     def is_burst_complete(self) -> bool:
-        return self._burst_times[self._burst_index] <= 0
+        return self._table._current_bursts[self._index] <= 0
 
     @property
     def is_process_complete(self) -> bool:
-        return all(burst <= 0 for burst in self._burst_times)
+        return self._table._remaining_bursts[self._index] == 0
 
     def is_within_allotment(self, time_allotment: int) -> bool:
-        return self._time_in_queue < time_allotment
+        return self.time_in_queue < time_allotment
 
     def demote(self):
         """
         Demotes the process to a lower queue
         """
-        self._queue_level += 1
-        self._time_in_queue = 0
+        self._table._queue_levels[self._index] += 1
+        self._table._times_in_queue[self._index] = 0
+
+    def reconcile_boost(self, boost_epoch: int) -> None:
+        """
+        Returns the process to the top queue with a fresh time allotment, if a
+        priority boost happened since it last caught up with the boost epoch
+        (see MultiLevelFeedbackQueue.boost)
+        """
+        table = self._table
+        index = self._index
+        if table._boost_epochs[index] != boost_epoch:
+            table._boost_epochs[index] = boost_epoch
+            table._queue_levels[index] = 0
+            table._times_in_queue[index] = 0
 
     def update_time_in_queue(self, time: int | None):
         if time is None:
@@ -136,15 +227,296 @@ class Process:
             return
         else:
             # Reset time_in_queue
-            self._time_in_queue = 0
+            self._table._times_in_queue[self._index] = 0
+
+    def start_process(self, time: int):
+        """
+        Records the first time the process is on the CPU
+        """
+        self._table._first_run_times[self._index] = time
 
     def end_process(self, time: int):
-        self._completion_time = time
+        self._table._completion_times[self._index] = time
+
+
+class ProcessTable:
+    """
+    Struct-of-arrays storage for processes
+
+    Names are interned, per-process state is kept in typed arrays, and all
+    bursts are kept in one flat array indexed through per-process offsets.
+    Only the remaining time of the current burst of each process is mutable.
+    """
+
+    # Columns describing the workload, which are never modified once added
+    # These may also be read-only buffers (see from_columns)
+    _process_names: Sequence[str]
+    _arrival_times: Sequence[int]
+    # Bursts of process i are _bursts[_burst_offsets[i] : _burst_offsets[i + 1]]
+    _bursts: Sequence[int]
+    _burst_offsets: Sequence[int]
+
+    # Mutable state of each process
+    _burst_indices: array[int]
+    _current_bursts: array[int]
+    # Number of bursts that are not yet complete, so completion checks are O(1)
+    _remaining_bursts: array[int]
+    _queue_levels: array[int]
+    _times_in_queue: array[int]
+    # -1 while the process has not been on the CPU yet
+    _first_run_times: array[int]
+    # -1 while the process is unfinished
+    _completion_times: array[int]
+    # Number of priority boosts the process has caught up with
+    _boost_epochs: array[int]
+    _from_IO: bytearray
+
+    # Per-process integer columns of the mutable state
+    STATE_COLUMNS: tuple[str, ...] = (
+        '_burst_indices',
+        '_current_bursts',
+        '_remaining_bursts',
+        '_queue_levels',
+        '_times_in_queue',
+        '_first_run_times',
+        '_completion_times',
+        '_boost_epochs',
+    )
+    # Per-process integer columns, beyond the bursts
+    INTEGER_COLUMNS: tuple[str, ...] = ('_arrival_times', *STATE_COLUMNS)
+    # Number of rows and of bursts at the start of an encoded workload chunk
+    _CHUNK_HEADER: struct.Struct = struct.Struct('<2q')
+
+    def __init__(self) -> None:
+        self._process_names = []
+        self._arrival_times = array('q')
+        self._bursts = array('q')
+        self._burst_offsets = array('q', [0])
+        self._burst_indices = array('q')
+        self._current_bursts = array('q')
+        self._remaining_bursts = array('q')
+        self._queue_levels = array('q')
+        self._times_in_queue = array('q')
+        self._first_run_times = array('q')
+        self._completion_times = array('q')
+        self._boost_epochs = array('q')
+        self._from_IO = bytearray()
+
+    @classmethod
+    def from_columns(
+        cls,
+        process_names: Sequence[str],
+        arrival_times: Sequence[int],
+        burst_offsets: Sequence[int],
+        bursts: Sequence[int],
+    ) -> ProcessTable:
+        """
+        Creates a table on top of existing workload columns without copying
+        them, e.g. memoryviews of shared memory or of a memory-mapped file
+
+        Processes cannot be appended to such a table
+        """
+        num_processes = len(process_names)
+        table = cls()
+        table._process_names = process_names
+        table._arrival_times = arrival_times
+        table._burst_offsets = burst_offsets
+        table._bursts = bursts
+
+        table._burst_indices = array('q', bytes(8 * num_processes))
+        table._current_bursts = array(
+            'q',
+            (
+                bursts[burst_offsets[i]]
+                if burst_offsets[i] < burst_offsets[i + 1]
+                else 0
+                for i in range(num_processes)
+            ),
+        )
+        table._remaining_bursts = array(
+            'q',
+            (
+                sum(1 for burst in table.burst_times(i) if burst > 0)
+                for i in range(num_processes)
+            ),
+        )
+        table._queue_levels = array('q', bytes(8 * num_processes))
+        table._times_in_queue = array('q', bytes(8 * num_processes))
+        table._first_run_times = array('q', [-1]) * num_processes
+        table._completion_times = array('q', [-1]) * num_processes
+        table._boost_epochs = array('q', bytes(8 * num_processes))
+        table._from_IO = bytearray(b'\x01' * num_processes)
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self._process_names)
+
+    def __getitem__(self, index: int) -> Process:
+        if not 0 <= index < len(self):
+            raise IndexError('process index out of range')
+
+        return Process._from_table(self, index)
+
+    def __iter__(self) -> Iterator[Process]:
+        return (Process._from_table(self, index) for index in range(len(self)))
+
+    @property
+    def processes(self) -> list[Process]:
+        return list(self)
+
+    def add(
+        self, process_name: str, arrival_time: int, burst_times: Sequence[int]
+    ) -> Process:
+        """
+        Adds a process to the table and returns a view of it
+        """
+        return Process._from_table(
+            self, self.append(process_name, arrival_time, burst_times)
+        )
+
+    def append(
+        self, process_name: str, arrival_time: int, burst_times: Sequence[int]
+    ) -> int:
+        """
+        Adds a process to the table and returns its index
+        """
+        # Only tables created by the constructor own appendable columns
+        assert isinstance(self._process_names, list)
+        assert isinstance(self._arrival_times, array)
+        assert isinstance(self._bursts, array)
+        assert isinstance(self._burst_offsets, array)
+
+        self._process_names.append(sys.intern(process_name))
+        self._arrival_times.append(arrival_time)
+        self._bursts.extend(burst_times)
+        self._burst_offsets.append(len(self._bursts))
+        self._burst_indices.append(0)
+        self._current_bursts.append(burst_times[0] if burst_times else 0)
+        self._remaining_bursts.append(sum(1 for burst in burst_times if burst > 0))
+        self._queue_levels.append(0)
+        self._times_in_queue.append(0)
+        self._first_run_times.append(-1)
+        self._completion_times.append(-1)
+        self._boost_epochs.append(0)
+
+        # Flag needed to deal with pre-emption
+        # Handling is left up to higher level interfaces
+        # Initially set to True so that newly arriving processes do not trigger pre-emption
+        self._from_IO.append(True)
+
+        return len(self._process_names) - 1
+
+    def burst_times(self, index: int) -> Sequence[int]:
+        """
+        Initial burst times of a process
+        """
+        return self._bursts[self._burst_offsets[index] : self._burst_offsets[index + 1]]
+
+    def take(self, indices: Sequence[int]) -> ProcessTable:
+        """
+        New table holding copies of the processes at indices, in that order
+        """
+        table = ProcessTable()
+        table._process_names = [self._process_names[i] for i in indices]
+        bursts, burst_offsets = table._bursts, table._burst_offsets
+        assert isinstance(bursts, array) and isinstance(burst_offsets, array)
+        for i in indices:
+            bursts.extend(self.burst_times(i))
+            burst_offsets.append(len(bursts))
+        for column in self.INTEGER_COLUMNS:
+            values = getattr(self, column)
+            setattr(table, column, array('q', [values[i] for i in indices]))
+        table._from_IO = bytearray([self._from_IO[i] for i in indices])
+        return table
+
+    def encode_workload(self, start: int, end: int) -> bytes:
+        """
+        Encodes the workload columns of the rows in [start, end), which never
+        change once added
+
+        Burst offsets are kept as they are in the table, so the chunks of a
+        table decode back to the same offsets when concatenated in order
+        """
+        burst_offsets = self._burst_offsets
+        first_burst, end_burst = burst_offsets[start], burst_offsets[end]
+        return b''.join(
+            [
+                self._CHUNK_HEADER.pack(end - start, end_burst - first_burst),
+                memoryview(self._arrival_times)[start:end],
+                memoryview(burst_offsets)[start + 1 : end + 1],
+                memoryview(self._bursts)[first_burst:end_burst],
+                '\n'.join(self._process_names[start:end]).encode(),
+            ]
+        )
+
+    def encode_state(self, start: int, end: int) -> bytes:
+        """
+        Encodes the mutable state of the rows in [start, end)
+        """
+        return b''.join(
+            [
+                *(
+                    memoryview(getattr(self, column))[start:end]
+                    for column in self.STATE_COLUMNS
+                ),
+                self._from_IO[start:end],
+            ]
+        )
+
+    @classmethod
+    def from_chunks(
+        cls, workload_chunks: Iterable[bytes], state_chunks: Iterable[bytes]
+    ) -> ProcessTable:
+        """
+        Decodes a table from its chunks, in order (see encode_workload and
+        encode_state)
+        """
+        table = cls()
+        names = table._process_names
+        bursts, burst_offsets = table._bursts, table._burst_offsets
+        assert isinstance(names, list)
+        assert isinstance(bursts, array) and isinstance(burst_offsets, array)
+        for workload, state in zip(workload_chunks, state_chunks, strict=True):
+            num_rows, num_bursts = cls._CHUNK_HEADER.unpack_from(workload)
+            workload = memoryview(workload)[cls._CHUNK_HEADER.size :]
+            arrival_times_end = 8 * num_rows
+            bursts_start = 2 * arrival_times_end
+            bursts_end = bursts_start + 8 * num_bursts
+            table._arrival_times.frombytes(workload[:arrival_times_end])
+            burst_offsets.frombytes(workload[arrival_times_end:bursts_start])
+            bursts.frombytes(workload[bursts_start:bursts_end])
+            names.extend(
+                map(sys.intern, str(workload[bursts_end:], 'utf-8').split('\n'))
+            )
+
+            state = memoryview(state)
+            for i, column in enumerate(cls.STATE_COLUMNS):
+                getattr(table, column).frombytes(
+                    state[8 * num_rows * i : 8 * num_rows * (i + 1)]
+                )
+            table._from_IO += state[8 * num_rows * len(cls.STATE_COLUMNS) :]
+        return table
+
+
+class DetachedProcesses(Protocol):
+    """
+    Processes detached from a queue at once, in queue order, which are taken
+    from either end (a deque is one)
+    """
+
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterator[Process]: ...
+
+    def popleft(self) -> Process: ...
+
+    def pop(self) -> Process: ...
 
 
 class PriorityQueue(Protocol):
     _time_allotment: int | None
-    _processes: list[Process]
+    _processes: MutableSequence[Process]
 
     @property
     def num_processes(self) -> int: ...
@@ -152,18 +524,32 @@ class PriorityQueue(Protocol):
     @property
     def processes(self) -> list[Process]: ...
 
+    @property
+    def version(self) -> int:
+        """
+        Counter that changes whenever the processes in the queue, or their order, change
+        """
+        ...
+
     @property
     def time_allotment(self) -> int | None: ...
 
     @property
     def is_empty(self) -> bool: ...
 
-    def on_tick(self):
+    def on_tick(self, ticks: int = 1):
         """
         Reduce quantum count and run process
         """
         ...
 
+    def ticks_until_expiry(self) -> int | None:
+        """
+        Number of ticks the selected process can run before the queue has to
+        release or rotate it, or None if the queue is empty
+        """
+        ...
+
     def push_process(self, process: Process): ...
 
     # Only one process can be released (current)
@@ -181,34 +567,220 @@ class PriorityQueue(Protocol):
         """
         ...
 
+    def steal_process(self, keep_front: bool) -> Process | None:
+        """
+        Remove a waiting process for another core to run, or None if there is none
+        If keep_front is set, the process that runs next (or is running) is never taken
+        """
+        ...
+
+    @property
+    def is_quantum_used_up(self) -> bool:
+        """
+        Whether the selected process used up its time quantum, so that the next
+        process is selected in its place
+        """
+        ...
+
+    def take_front(self) -> Process | None:
+        """
+        Remove the process that runs next (or is running), or None if the queue is empty
+        """
+        ...
+
+    def push_front(self, process: Process) -> None:
+        """
+        Push a process back to the front of the queue, to run next, e.g. as it
+        was preempted on a core running from shared queues
+        """
+        ...
+
+    def preempts_selected(self, process: Process) -> bool:
+        """
+        Whether pushing process makes the selected process compete with the
+        waiting processes again, as a demotion does in SJF
+        """
+        ...
+
+    def swap_front(self, process: Process) -> Process | None:
+        """
+        Push back a process selected from the queue, which runs on a core from
+        shared queues, and take the front in its place if it runs first, or
+        return None without pushing it if the process keeps running
+        """
+        ...
+
+    def detach_processes(self) -> DetachedProcesses:
+        """
+        Remove every process from the queue at once, and return them in queue order
+        """
+        ...
+
+    def push_detached(self, processes: DetachedProcesses) -> None:
+        """
+        Push processes detached from another queue, as if each was pushed in
+        turn, in order
+        FIFO queues only pull each process in once it reaches their front.
+        """
+        ...
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> array[int]:
+        """
+        State of the queue as integers, with each process replaced by its ref
+        (see MultiLevelFeedbackQueue.get_state)
+        """
+        ...
+
+    def set_state(
+        self, state: Sequence[int], process_of: Callable[[int], Process]
+    ) -> None:
+        """
+        Restore a state from get_state(), looking up processes by their ref
+        """
+        ...
+
+
+def _ticks_until_expiry(
+    process: Process, time_allotment: int | None, time_quantum: int | None = None
+) -> int:
+    """
+    Number of ticks until a running process either completes its burst,
+    uses up its time allotment, or (for RR) uses up its time quantum
+    """
+    ticks = process.remaining_current_burst
+    if time_allotment:
+        ticks = min(ticks, time_allotment - process.time_in_queue)
+    if time_quantum is not None:
+        ticks = min(ticks, time_quantum)
+
+    # A queue is always allowed to make progress
+    return max(ticks, 1)
+
+
+def _pull_detached(processes: deque) -> bool:
+    """
+    Pulls the first process of the run of detached processes at the front of
+    a FIFO queue out in front of it, and returns whether there was such a run
+
+    Runs are pushed with at least two processes, and are replaced by their
+    last process once it is the only one left, so that pulling a process or
+    popping one from a run always takes one process out of the pending ones
+    """
+    run = processes[0]
+    if isinstance(run, Process):
+        return False
+
+    process = run.popleft()
+    if len(run) == 1:
+        processes[0] = run.pop()
+    processes.appendleft(process)
+    return True
+
+
+def _pop_detached(processes: deque) -> tuple[Process, bool]:
+    """
+    Pops the back of a FIFO queue, which is either a process or the last
+    process of a run of detached processes (see _pull_detached), along with
+    whether it came from a run
+    """
+    run = processes[-1]
+    if isinstance(run, Process):
+        return processes.pop(), False
+
+    process = run.pop()
+    if len(run) == 1:
+        processes[-1] = run.pop()
+    return process, True
+
+
+def _flatten_detached(processes: Iterable) -> list[Process]:
+    """
+    Processes of a FIFO queue in order, with its runs of detached processes expanded
+    """
+    flattened: list[Process] = []
+    for item in processes:
+        if isinstance(item, Process):
+            flattened.append(item)
+        else:
+            flattened.extend(item)
+    return flattened
+
+
+class _DetachedHeap(DetachedProcesses):
+    """
+    Processes detached from an SJF queue, taken from its heap in queue order
+    """
+
+    # Heap of SJF entries (see SJFPriorityQueue)
+    _entries: list[list]
+    # Processes in queue order instead, once one is taken from the back
+    _ordered: deque[Process] | None = None
+
+    def __init__(self, entries: list[list]) -> None:
+        self._entries = entries
+
+    def __len__(self) -> int:
+        if self._ordered is not None:
+            return len(self._ordered)
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Process]:
+        if self._ordered is not None:
+            return iter(self._ordered)
+        return (entry[3] for entry in sorted(self._entries))
+
+    def popleft(self) -> Process:
+        if self._ordered is not None:
+            return self._ordered.popleft()
+        return heapq.heappop(self._entries)[3]
+
+    def pop(self) -> Process:
+        if self._ordered is None:
+            self._ordered = deque(self)
+            self._entries = []
+        return self._ordered.pop()
+
 
 class RRPriorityQueue(PriorityQueue):
     _time_allotment: int | None
-    _processes: list[Process] = []
+    # Deque, so that rotating and releasing the head of the queue are O(1)
+    # Processes detached from other queues are held in runs (see push_detached)
+    _processes: deque[Process]
 
     _time_quantum: int
     _time_quantum_counter: int = 0
+    _version: int = 0
+    # Processes in runs of detached processes beyond the first of each run
+    # (see push_detached), so there are runs in _processes if this is not 0
+    _num_pending: int = 0
 
     def __init__(
         self, time_allotment: int | None = None, time_quantum: int = 4
     ) -> None:
         self._time_allotment = time_allotment
+        self._processes = deque()
         self._time_quantum = time_quantum
         self._time_quantum_counter = self._time_quantum
 
     def __repr__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     def __str__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     @property
     def num_processes(self) -> int:
-        return len(self._processes)
+        return len(self._processes) + self._num_pending
 
     @property
     def processes(self) -> list[Process]:
-        return self._processes
+        if self._num_pending:
+            return _flatten_detached(self._processes)
+        return list(self._processes)
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     @property
     def time_allotment(self) -> int | None:
@@ -218,60 +790,165 @@ class RRPriorityQueue(PriorityQueue):
     def is_empty(self) -> bool:
         return len(self._processes) == 0
 
-    def on_tick(self):
+    def on_tick(self, ticks: int = 1):
+        if self.is_empty:
+            return
+
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        self._time_quantum_counter -= ticks
+        self._processes[0].on_tick(ticks)
+
+    def ticks_until_expiry(self) -> int | None:
         if self.is_empty:
             return
 
-        self._time_quantum_counter -= 1
-        self._processes[0].on_tick()
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        return _ticks_until_expiry(
+            self._processes[0], self._time_allotment, self._time_quantum_counter
+        )
 
     def push_process(self, process: Process):
         self._processes.append(process)
+        self._version += 1
 
     def release_current_on_expiry(self) -> Process | None:
         if self.is_empty:
             return
 
         current_process = self._processes[0]
+        # Detached processes have not run since they were pushed
+        if self._num_pending and not isinstance(current_process, Process):
+            return
+
         if current_process.is_burst_complete or (
             self._time_allotment
             and not current_process.is_within_allotment(self._time_allotment)
         ):
             self._time_quantum_counter = self._time_quantum
-            return self._processes.pop(0)
+            self._version += 1
+            return self._processes.popleft()
 
     def select_new_process(self) -> Process | None:
         if self.is_empty:
             return
 
         if self._time_quantum_counter <= 0:
-            old_process = self._processes.pop(0)
-            self.push_process(old_process)
+            # Moves the old process to the back of the queue
+            self._processes.rotate(-1)
             self._time_quantum_counter = self._time_quantum
+            self._version += 1
 
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
         return self._processes[0]
 
+    def steal_process(self, keep_front: bool) -> Process | None:
+        if self.num_processes <= keep_front:
+            return
+
+        if self.num_processes == 1:
+            # The head leaves, so the next process starts with a full quantum
+            self._time_quantum_counter = self._time_quantum
+        self._version += 1
+        if self._num_pending:
+            process, is_detached = _pop_detached(self._processes)
+            self._num_pending -= is_detached
+            return process
+        return self._processes.pop()
+
+    @property
+    def is_quantum_used_up(self) -> bool:
+        return self._time_quantum_counter <= 0
+
+    def take_front(self) -> Process | None:
+        if self.is_empty:
+            return
+
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        # The next process starts with a full quantum
+        self._time_quantum_counter = self._time_quantum
+        self._version += 1
+        return self._processes.popleft()
+
+    def push_front(self, process: Process) -> None:
+        self._processes.appendleft(process)
+        self._version += 1
+
+    def preempts_selected(self, process: Process) -> bool:
+        return False
+
+    def swap_front(self, process: Process) -> Process | None:
+        # Processes only ever join the queue behind the selected process
+        return None
+
+    def detach_processes(self) -> DetachedProcesses:
+        processes: deque[Process] = self._processes
+        if self._num_pending:
+            processes = deque(self.processes)
+        self._processes = deque()
+        self._num_pending = 0
+        self._time_quantum_counter = self._time_quantum
+        self._version += 1
+        return processes
+
+    def push_detached(self, processes: DetachedProcesses) -> None:
+        if len(processes) > 1:
+            self._processes.append(processes)  # type: ignore[arg-type]
+            self._num_pending += len(processes) - 1
+        elif len(processes) == 1:
+            self._processes.append(processes.popleft())
+        self._version += 1
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> array[int]:
+        return array(
+            'q', [self._time_quantum_counter, *map(process_ref, self.processes)]
+        )
+
+    def set_state(
+        self, state: Sequence[int], process_of: Callable[[int], Process]
+    ) -> None:
+        self._time_quantum_counter = state[0]
+        self._processes = deque(map(process_of, state[1:]))
+        self._num_pending = 0
+        self._version += 1
+
 
 class FCFSPriorityQueue(PriorityQueue):
     _time_allotment: int | None
-    _processes: list[Process] = []
+    # Deque, so that releasing the head of the queue is O(1)
+    # Processes detached from other queues are held in runs (see push_detached)
+    _processes: deque[Process]
+    _version: int = 0
+    # Processes in runs of detached processes beyond the first of each run
+    # (see RRPriorityQueue)
+    _num_pending: int = 0
 
     def __init__(self, time_allotment: int | None = None) -> None:
         self._time_allotment = time_allotment
+        self._processes = deque()
 
     def __repr__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     def __str__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     @property
     def num_processes(self) -> int:
-        return len(self._processes)
+        return len(self._processes) + self._num_pending
 
     @property
     def processes(self) -> list[Process]:
-        return self._processes
+        if self._num_pending:
+            return _flatten_detached(self._processes)
+        return list(self._processes)
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     @property
     def time_allotment(self) -> int | None:
@@ -281,80 +958,159 @@ class FCFSPriorityQueue(PriorityQueue):
     def is_empty(self) -> bool:
         return len(self._processes) == 0
 
-    def on_tick(self):
+    def on_tick(self, ticks: int = 1):
+        if self.is_empty:
+            return
+
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        self._processes[0].on_tick(ticks)
+
+    def ticks_until_expiry(self) -> int | None:
         if self.is_empty:
             return
 
-        self._processes[0].on_tick()
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        return _ticks_until_expiry(self._processes[0], self._time_allotment)
 
     def push_process(self, process: Process):
         self._processes.append(process)
+        self._version += 1
 
     def release_current_on_expiry(self) -> Process | None:
         if self.is_empty:
             return
 
         current_process = self._processes[0]
+        # Detached processes have not run since they were pushed
+        if self._num_pending and not isinstance(current_process, Process):
+            return
+
         if current_process.is_burst_complete or (
             self._time_allotment
             and not current_process.is_within_allotment(self._time_allotment)
         ):
-            return self._processes.pop(0)
+            self._version += 1
+            return self._processes.popleft()
 
     def select_new_process(self) -> Process | None:
         if self.is_empty:
             return
 
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
         return self._processes[0]
 
+    def steal_process(self, keep_front: bool) -> Process | None:
+        if self.num_processes <= keep_front:
+            return
+
+        self._version += 1
+        if self._num_pending:
+            process, is_detached = _pop_detached(self._processes)
+            self._num_pending -= is_detached
+            return process
+        return self._processes.pop()
+
+    @property
+    def is_quantum_used_up(self) -> bool:
+        return False
+
+    def take_front(self) -> Process | None:
+        if self.is_empty:
+            return
+
+        if self._num_pending:
+            self._num_pending -= _pull_detached(self._processes)
+        self._version += 1
+        return self._processes.popleft()
+
+    def push_front(self, process: Process) -> None:
+        self._processes.appendleft(process)
+        self._version += 1
+
+    def preempts_selected(self, process: Process) -> bool:
+        return False
+
+    def swap_front(self, process: Process) -> Process | None:
+        # Processes only ever join the queue behind the selected process
+        return None
+
+    def detach_processes(self) -> DetachedProcesses:
+        processes: deque[Process] = self._processes
+        if self._num_pending:
+            processes = deque(self.processes)
+        self._processes = deque()
+        self._num_pending = 0
+        self._version += 1
+        return processes
+
+    def push_detached(self, processes: DetachedProcesses) -> None:
+        if len(processes) > 1:
+            self._processes.append(processes)  # type: ignore[arg-type]
+            self._num_pending += len(processes) - 1
+        elif len(processes) == 1:
+            self._processes.append(processes.popleft())
+        self._version += 1
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> array[int]:
+        return array('q', map(process_ref, self.processes))
+
+    def set_state(
+        self, state: Sequence[int], process_of: Callable[[int], Process]
+    ) -> None:
+        self._processes = deque(map(process_of, state))
+        self._num_pending = 0
+        self._version += 1
+
 
 class SJFPriorityQueue(PriorityQueue):
     _time_allotment: int | None
-    _processes: list[Process] = []
-    _initial_burst_times: list[int] = []
-    _current_process_index: int = -1
+    # Heap of waiting processes, ordered by (burst time upon queue entry, name)
+    # Each entry is [initial burst time, process name, push order, process]
+    _processes: list[list]
+    # Entry of the selected process, which is kept outside of the heap
+    _current_entry: list | None
+    _push_counter: int
+    # Processes in queue order, only recomputed when the queue changes
+    _ordered_processes: list[Process] | None
+    _version: int = 0
+    # Entries pushed back to the front of the heap (see push_front), which
+    # keep their place until a demotion, like the selected process
+    _num_front_entries: int = 0
 
     def __init__(self, time_allotment: int | None = None) -> None:
         self._time_allotment = time_allotment
+        self._processes = []
+        self._current_entry = None
+        self._push_counter = 0
+        self._ordered_processes = None
 
     def __repr__(self) -> str:
-        # Processes are ordered in the queue based on the shortest initial burst time
-        return str(
-            sorted(
-                self._processes,
-                key=lambda p: (
-                    self._initial_burst_times[self._processes.index(p)],
-                    p.process_name,
-                ),
-            )
-        )
+        return str(self.processes)
 
     def __str__(self) -> str:
-        # Processes are ordered in the queue based on the shortest initial burst time
-        return str(
-            sorted(
-                self._processes,
-                key=lambda p: (
-                    self._initial_burst_times[self._processes.index(p)],
-                    p.process_name,
-                ),
-            )
-        )
+        return str(self.processes)
 
     @property
     def num_processes(self) -> int:
-        return len(self._processes)
+        return len(self._processes) + (self._current_entry is not None)
 
     @property
     def processes(self) -> list[Process]:
         # Processes are ordered in the queue based on the shortest initial burst time
-        return sorted(
-            self._processes,
-            key=lambda p: (
-                self._initial_burst_times[self._processes.index(p)],
-                p.process_name,
-            ),
-        )
+        if self._ordered_processes is None:
+            entries = list(self._processes)
+            if self._current_entry is not None:
+                entries.append(self._current_entry)
+            self._ordered_processes = [entry[3] for entry in sorted(entries)]
+
+        return self._ordered_processes
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     @property
     def time_allotment(self) -> int | None:
@@ -362,129 +1118,1310 @@ class SJFPriorityQueue(PriorityQueue):
 
     @property
     def is_empty(self) -> bool:
-        return len(self._processes) == 0
+        return not self._processes and self._current_entry is None
 
-    def on_tick(self):
-        if self.is_empty:
+    def on_tick(self, ticks: int = 1):
+        if self._current_entry is None:
             return
 
-        self._processes[self._current_process_index].on_tick()
+        self._current_entry[3].on_tick(ticks)
 
-    def push_process(self, process: Process):
-        self._processes.append(process)
+    def ticks_until_expiry(self) -> int | None:
+        if self._current_entry is None:
+            return
 
-        # If process does not come from IO (i.e. from demotion), do pre-emption
-        if not process.is_from_IO:
-            self._current_process_index = -1
+        return _ticks_until_expiry(self._current_entry[3], self._time_allotment)
+
+    def push_process(self, process: Process):
         # Capture snapshot of burst times upon entry to queue
-        self._initial_burst_times = [
-            proc.remaining_current_burst for proc in self._processes
-        ]
+        # Only the selected process can have run since the last snapshot
+        if self._current_entry is not None:
+            self._current_entry[0] = self._current_entry[3].remaining_current_burst
+
+            # If process does not come from IO (i.e. from demotion), do pre-emption
+            if self.preempts_selected(process):
+                heapq.heappush(self._processes, self._current_entry)
+                self._current_entry = None
+
+        # So do the processes pushed back to the front, as they were selected too
+        if self._num_front_entries and self.preempts_selected(process):
+            for entry in self._processes:
+                if entry[0] < 0:
+                    entry[0] = entry[3].remaining_current_burst
+            heapq.heapify(self._processes)
+            self._num_front_entries = 0
+
+        heapq.heappush(
+            self._processes,
+            [
+                process.remaining_current_burst,
+                process.process_name,
+                self._push_counter,
+                process,
+            ],
+        )
+        self._push_counter += 1
+        self._ordered_processes = None
+        self._version += 1
 
     def release_current_on_expiry(self) -> Process | None:
-        if self.is_empty:
+        if self._current_entry is None:
             return
 
-        current_process = self._processes[self._current_process_index]
+        current_process: Process = self._current_entry[3]
         if current_process.is_burst_complete or (
             self._time_allotment
             and not current_process.is_within_allotment(self._time_allotment)
         ):
-            exiting_process = self._processes.pop(self._current_process_index)
-            self._initial_burst_times.pop(self._current_process_index)
-            self._current_process_index = -1
-            return exiting_process
+            self._current_entry = None
+            self._ordered_processes = None
+            self._version += 1
+            return current_process
 
     def select_new_process(self) -> Process | None:
-        if self.is_empty:
-            return
-
         # ASSUMPTION: Chosen SJF process in a queue cannot be changed until burst completion
         # This means that new processes may only be selected no active process exists
         # In other words, no pre-emption unless its due to higher queue priority
         # Although state of SJF will remain the same upon return
-        if self._current_process_index >= 0:
-            return self._processes[self._current_process_index]
+        if self._current_entry is not None:
+            return self._current_entry[3]
+
+        if not self._processes:
+            return
 
         # ASSUMPTION: SJF is based on the remaining amount of (current) burst time upon priority queue entry
         # This was assumed since it is also assumed that each queue is independent from one another
         # Thus, processes that enter a queue should be considered as if they had never entered a queue before
-        self._current_process_index = min(
-            range(len(self._processes)),
-            key=lambda i: (
-                self._initial_burst_times[i],
-                self._processes[i].process_name,
-            ),
+        self._current_entry = heapq.heappop(self._processes)
+        self._num_front_entries -= self._current_entry[0] < 0
+        return self._current_entry[3]
+
+    def steal_process(self, keep_front: bool) -> Process | None:
+        # Without a current entry, the top of the heap runs next
+        if len(self._processes) > (keep_front and self._current_entry is None):
+            # Popping a leaf keeps the heap valid
+            entry = self._processes.pop()
+            self._num_front_entries -= entry[0] < 0
+            process: Process = entry[3]
+        elif self._current_entry is not None and not keep_front:
+            process = self._current_entry[3]
+            self._current_entry = None
+        else:
+            return
+
+        self._ordered_processes = None
+        self._version += 1
+        return process
+
+    @property
+    def is_quantum_used_up(self) -> bool:
+        return False
+
+    def take_front(self) -> Process | None:
+        if self._current_entry is not None:
+            process: Process = self._current_entry[3]
+            self._current_entry = None
+        elif self._processes:
+            entry = heapq.heappop(self._processes)
+            self._num_front_entries -= entry[0] < 0
+            process = entry[3]
+        else:
+            return
+
+        self._ordered_processes = None
+        self._version += 1
+        return process
+
+    def push_front(self, process: Process) -> None:
+        # Ahead of every process that waits for its burst, as it was already
+        # chosen for its burst (see select_new_process)
+        heapq.heappush(
+            self._processes,
+            [-1, process.process_name, self._push_counter, process],
         )
-        return self._processes[self._current_process_index]
+        self._push_counter += 1
+        self._num_front_entries += 1
+        self._ordered_processes = None
+        self._version += 1
+
+    def preempts_selected(self, process: Process) -> bool:
+        return not process.is_from_IO
+
+    def swap_front(self, process: Process) -> Process | None:
+        entry = [
+            process.remaining_current_burst,
+            process.process_name,
+            self._push_counter,
+            process,
+        ]
+        if not self._processes or entry < self._processes[0]:
+            return
+
+        front = heapq.heapreplace(self._processes, entry)
+        self._push_counter += 1
+        self._num_front_entries -= front[0] < 0
+        self._ordered_processes = None
+        self._version += 1
+        return front[3]
+
+    def detach_processes(self) -> DetachedProcesses:
+        entries = self._processes
+        if self._current_entry is not None:
+            heapq.heappush(entries, self._current_entry)
+        self._processes = []
+        self._current_entry = None
+        self._num_front_entries = 0
+        self._ordered_processes = None
+        self._version += 1
+        return _DetachedHeap(entries)
+
+    def push_detached(self, processes: DetachedProcesses) -> None:
+        # Each process needs its burst time to find its place in the heap
+        while processes:
+            self.push_process(processes.popleft())
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> array[int]:
+        # Push counter, whether there is a current entry, then each entry as
+        # (burst time, push order, ref), current entry first and the heap in order
+        state = array('q', [self._push_counter, self._current_entry is not None])
+        entries = self._processes
+        if self._current_entry is not None:
+            entries = [self._current_entry, *entries]
+
+        for burst_time, _, push_order, process in entries:
+            state.extend((burst_time, push_order, process_ref(process)))
+        return state
+
+    def set_state(
+        self, state: Sequence[int], process_of: Callable[[int], Process]
+    ) -> None:
+        self._push_counter = state[0]
+        entries: list[list] = []
+        for i in range(2, len(state), 3):
+            process = process_of(state[i + 2])
+            entries.append([state[i], process.process_name, state[i + 1], process])
+        self._current_entry = entries.pop(0) if state[1] else None
+        # Entries were saved in heap order
+        self._processes = entries
+        self._num_front_entries = sum(entry[0] < 0 for entry in entries)
+        self._ordered_processes = None
+        self._version += 1
 
 
 class IO:
-    _processes: list[Process]
+    # Processes mapped to the tick they entered IO, in order of entry
+    _processes: dict[Process, int]
+    # Heap of [completion tick, process name, push order, process]
+    _completions: list[list]
+    _push_counter: int
+    _tick: int
+    _version: int = 0
 
     def __init__(self) -> None:
-        self._processes = []
+        self._processes = {}
+        self._completions = []
+        self._push_counter = 0
+        self._tick = 0
 
     def __repr__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     def __str__(self) -> str:
-        return str(self._processes)
+        return str(self.processes)
 
     @property
-    def is_empty(self) -> bool:
-        return len(self._processes) == 0
+    def processes(self) -> list[Process]:
+        return list(self._processes)
 
-    def on_tick(self):
-        for process in self._processes:
-            process.on_tick()
+    @property
+    def num_processes(self) -> int:
+        return len(self._processes)
+
+    @property
+    def version(self) -> int:
+        """
+        Counter that changes whenever the processes in IO change
+        """
+        return self._version
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self._processes) == 0
+
+    def on_tick(self, ticks: int = 1):
+        # Bursts are only brought up to date once the process leaves IO
+        self._tick += ticks
+
+    def ticks_until_release(self) -> int | None:
+        """
+        Number of ticks until the next process finishes its IO burst
+        """
+        if self.is_empty:
+            return
+
+        return max(self._completions[0][0] - self._tick, 1)
 
     def push_process(self, process: Process):
-        self._processes.append(process)
+        # A process spends at least one tick in IO, even for an empty burst
+        completion_tick = self._tick + max(process.remaining_current_burst, 1)
+
+        self._processes[process] = self._tick
+        heapq.heappush(
+            self._completions,
+            [completion_tick, process.process_name, self._push_counter, process],
+        )
+        self._push_counter += 1
+        self._version += 1
 
     def release_expired_processes(self) -> list[Process]:
         """
         Release processes from IO once burst time is used up
         """
-        expired_processes: list[Process] = [
-            process for process in self._processes if process.is_burst_complete
-        ]
+        expired_processes: list[Process] = []
 
-        # Removes expired processes from IO
-        for process in expired_processes:
-            self._processes.remove(process)
+        while self._completions and self._completions[0][0] <= self._tick:
+            process: Process = heapq.heappop(self._completions)[3]
+            process.on_tick(self._tick - self._processes.pop(process))
+            expired_processes.append(process)
 
+        if expired_processes:
+            self._version += 1
         return expired_processes
 
+    def get_state(self, process_ref: Callable[[Process], int]) -> array[int]:
+        # Clock, push counter and number of processes, then each process as
+        # (ref, entry tick), then the completion heap as (tick, push order, ref)
+        state = array('q', [self._tick, self._push_counter, len(self._processes)])
+        for process, entry_tick in self._processes.items():
+            state.extend((process_ref(process), entry_tick))
+        for completion_tick, _, push_order, process in self._completions:
+            state.extend((completion_tick, push_order, process_ref(process)))
+        return state
+
+    def set_state(
+        self, state: Sequence[int], process_of: Callable[[int], Process]
+    ) -> None:
+        self._tick, self._push_counter, num_processes = state[:3]
+        end = 3 + 2 * num_processes
+        self._processes = {process_of(state[i]): state[i + 1] for i in range(3, end, 2)}
+        self._completions = []
+        for i in range(end, len(state), 3):
+            process = process_of(state[i + 2])
+            self._completions.append(
+                [state[i], process.process_name, state[i + 1], process]
+            )
+        self._version += 1
+
+
+class TraceSink(Protocol):
+    # Whether the per-tick trace is wanted at all
+    # If not, the simulator skips formatting it and only writes the final stats
+    traces_ticks: bool
+
+    def write(self, line: str) -> None:
+        """
+        Write a single line of output (without the trailing newline)
+        """
+        ...
+
+    def flush(self) -> None:
+        """
+        Write out any buffered output
+        """
+        ...
+
+    def checkpoint(self) -> int | None:
+        """
+        Write out any buffered output, and return the position in the output
+        that a simulation resumed from this point continues from, if known
+        """
+        ...
+
+
+class TextTraceSink(TraceSink):
+    traces_ticks: bool = True
+
+    _stream: TextIO | None
+    _buffer: list[str]
+    _buffered_size: int
+    _buffer_size: int
+
+    def __init__(self, stream: TextIO | None = None, buffer_size: int = 1 << 16):
+        """
+        Block-buffered text sink, writing to stream (stdout if None) once
+        buffer_size characters have accumulated
+        """
+        self._stream = stream
+        self._buffer = []
+        self._buffered_size = 0
+        self._buffer_size = buffer_size
+
+    def write(self, line: str) -> None:
+        self._buffer.append(line)
+        self._buffered_size += len(line) + 1
+
+        if self._buffered_size >= self._buffer_size:
+            self._write_buffer()
+
+    def flush(self) -> None:
+        self._write_buffer()
+        (self._stream or sys.stdout).flush()
+
+    def checkpoint(self) -> int | None:
+        self._write_buffer()
+        if self._stream is None or not self._stream.seekable():
+            return
+
+        # Only the buffers are flushed, without waiting for the disk
+        self._stream.flush()
+        return self._stream.tell()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+
+        # stdout is looked up on each write in case it has been redirected
+        (self._stream or sys.stdout).write('\n'.join(self._buffer) + '\n')
+        self._buffer = []
+        self._buffered_size = 0
+
+
+class SummaryTraceSink(TextTraceSink):
+    """
+    Text sink that only receives the final stats of the simulation
+    """
+
+    traces_ticks: bool = False
+
+
+class NullTraceSink(TraceSink):
+    traces_ticks: bool = False
+
+    def write(self, line: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def checkpoint(self) -> int | None:
+        pass
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles of integer values (e.g. tick counts), accurate to
+    within relative_accuracy, using memory logarithmic in the range of the
+    values instead of one slot per value
+
+    Values are counted in buckets whose bounds grow geometrically, so small
+    values, which fall in buckets narrower than 1, are exact
+    """
+
+    _gamma: float
+    _log_gamma: float
+    # Bucket index mapped to the number of values in it
+    _buckets: dict[int, int]
+    # Values below 1, which have no logarithm
+    _low_count: int
+    count: int
+    min: int
+    max: int
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+        self._low_count = 0
+        self.count = 0
+        self.min = 0
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        if self.count == 0:
+            self.min = self.max = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        self.count += 1
+
+        if value < 1:
+            self._low_count += 1
+            return
+
+        bucket = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def quantile(self, q: float) -> int:
+        """
+        Value at quantile q (between 0 and 1), or 0 if no values were added
+        """
+        if self.count == 0:
+            return 0
+
+        # Nearest rank, i.e. the smallest value with at least q of the values
+        # less than or equal to it
+        rank = max(math.ceil(q * self.count), 1)
+        seen = self._low_count
+        if rank <= seen:
+            return self.min
+
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if rank <= seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                value = round(2 * self._gamma**bucket / (self._gamma + 1))
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def get_state(self) -> array[int]:
+        state = array('q', [self.count, self.min, self.max, self._low_count])
+        for bucket, count in self._buckets.items():
+            state.extend((bucket, count))
+        return state
+
+    def set_state(self, state: Sequence[int]) -> None:
+        self.count, self.min, self.max, self._low_count = state[:4]
+        self._buckets = {state[i]: state[i + 1] for i in range(4, len(state), 2)}
+
+
+class LatencyMetrics:
+    """
+    Per-process latency metrics, accumulated as the simulation runs
+
+    Only aggregates are kept, so memory does not grow with the number of
+    completed processes
+    """
+
+    QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+    turnaround_times: QuantileSketch
+    waiting_times: QuantileSketch
+    response_times: QuantileSketch
+    _total_turnaround_time: int
+    _total_waiting_time: int
+    _total_response_time: int
+    # Ticks spent by all processes in each queue level, waiting or running
+    # Computed as the sum of release ticks minus the sum of entry ticks
+    _queue_times: list[int]
+    # Number of processes demoted out of each queue level
+    _demotions: list[int]
+    _end_time: int
+
+    def __init__(self, num_queues: int, relative_accuracy: float = 0.01) -> None:
+        self.turnaround_times = QuantileSketch(relative_accuracy)
+        self.waiting_times = QuantileSketch(relative_accuracy)
+        self.response_times = QuantileSketch(relative_accuracy)
+        self._total_turnaround_time = 0
+        self._total_waiting_time = 0
+        self._total_response_time = 0
+        self._queue_times = [0] * num_queues
+        self._demotions = [0] * num_queues
+        self._end_time = 0
+
+    @property
+    def num_completed(self) -> int:
+        return self.turnaround_times.count
+
+    @property
+    def average_turnaround_time(self) -> float:
+        return self._total_turnaround_time / self.num_completed
+
+    def on_queue_entry(self, queue_level: int, tick: int) -> None:
+        self._queue_times[queue_level] -= tick
+
+    def on_queue_exit(self, queue_level: int, tick: int) -> None:
+        self._queue_times[queue_level] += tick
+
+    def on_boost(self, queue_level: int, num_processes: int, tick: int) -> None:
+        """
+        Records num_processes moving from queue_level to the top queue
+        """
+        self._queue_times[queue_level] += num_processes * tick
+        self._queue_times[0] -= num_processes * tick
+
+    def on_demotion(self, queue_level: int) -> None:
+        """
+        Records a demotion out of queue_level
+        """
+        self._demotions[queue_level] += 1
+
+    def on_first_run(self, process: Process) -> None:
+        response_time = process.response_time
+        self._total_response_time += response_time
+        self.response_times.add(response_time)
+
+    def on_completion(self, process: Process) -> None:
+        turnaround_time = process.turnaround_time
+        waiting_time = process.waiting_time
+        self._total_turnaround_time += turnaround_time
+        self._total_waiting_time += waiting_time
+        self.turnaround_times.add(turnaround_time)
+        self.waiting_times.add(waiting_time)
+        self._end_time = max(self._end_time, process.completion_time)
+
+    def get_state(self) -> list[array[int]]:
+        return [
+            array(
+                'q',
+                [
+                    self._end_time,
+                    self._total_turnaround_time,
+                    self._total_waiting_time,
+                    self._total_response_time,
+                    *self._queue_times,
+                    *self._demotions,
+                ],
+            ),
+            self.turnaround_times.get_state(),
+            self.waiting_times.get_state(),
+            self.response_times.get_state(),
+        ]
+
+    def set_state(self, state: Sequence[Sequence[int]]) -> None:
+        totals, turnaround_times, waiting_times, response_times = state
+        (
+            self._end_time,
+            self._total_turnaround_time,
+            self._total_waiting_time,
+            self._total_response_time,
+        ) = totals[:4]
+        num_queues = len(self._queue_times)
+        self._queue_times = list(totals[4 : 4 + num_queues])
+        self._demotions = list(totals[4 + num_queues :])
+        self.turnaround_times.set_state(turnaround_times)
+        self.waiting_times.set_state(waiting_times)
+        self.response_times.set_state(response_times)
+
+    def _distribution(self, sketch: QuantileSketch, total: int) -> dict[str, float]:
+        distribution: dict[str, float] = {
+            'mean': round(total / sketch.count, 3) if sketch.count else 0.0,
+            'min': sketch.min,
+            'max': sketch.max,
+        }
+        for q in self.QUANTILES:
+            distribution[f'p{round(q * 100)}'] = sketch.quantile(q)
+        return distribution
+
+    def summary(self) -> dict:
+        """
+        Machine-readable summary of the metrics
+        """
+        num_completed = self.num_completed
+        return {
+            'processes': num_completed,
+            'end_time': self._end_time,
+            'turnaround_time': self._distribution(
+                self.turnaround_times, self._total_turnaround_time
+            ),
+            'waiting_time': self._distribution(
+                self.waiting_times, self._total_waiting_time
+            ),
+            'response_time': self._distribution(
+                self.response_times, self._total_response_time
+            ),
+            'demotions': sum(self._demotions),
+            'queues': [
+                {
+                    'level': level,
+                    'total_time': queue_time,
+                    'mean_time': (
+                        round(queue_time / num_completed, 3) if num_completed else 0.0
+                    ),
+                    'demotions': demotions,
+                }
+                for level, (queue_time, demotions) in enumerate(
+                    zip(self._queue_times, self._demotions)
+                )
+            ],
+        }
+
+
+class TimeSeries:
+    """
+    Per-tick time series of integer channels (see
+    MultiLevelFeedbackQueue.timeseries), kept as the min, max and sum of
+    each channel over buckets of ticks
+
+    Buckets start one tick wide. Once the series holds as many buckets as fit
+    in its memory budget, adjacent buckets are merged in pairs, which doubles
+    their width, so memory stays bounded however long the run is.
+    """
+
+    MAGIC: bytes = b'MLFQTS1\n'
+    # First tick, ticks per bucket, number of buckets, ticks in the last bucket
+    # and size of the channel names
+    _HEADER: struct.Struct = struct.Struct('<5q')
+
+    channels: tuple[str, ...]
+    start_tick: int | None = None
+    bucket_ticks: int = 1
+    _max_buckets: int
+    # Per channel, the min, max and sum of each bucket
+    _mins: list[array[int]]
+    _maxs: list[array[int]]
+    _sums: list[array[int]]
+    _last_bucket_ticks: int = 0
+
+    def __init__(self, channels: Sequence[str], memory_budget: int = 1 << 20) -> None:
+        self.channels = tuple(channels)
+        # Buckets are merged in pairs, so there is always an even number of them
+        bucket_size = 3 * 8 * len(self.channels)
+        self._max_buckets = max(memory_budget // bucket_size // 2 * 2, 2)
+        self._mins = [array('q') for _ in self.channels]
+        self._maxs = [array('q') for _ in self.channels]
+        self._sums = [array('q') for _ in self.channels]
+
+    @property
+    def num_buckets(self) -> int:
+        return len(self._sums[0]) if self.channels else 0
+
+    def record(self, tick: int, ticks: int, values: Sequence[int]) -> None:
+        """
+        Records the values of each channel during the ticks starting at tick,
+        which follow the ticks recorded last
+        """
+        if self.start_tick is None:
+            self.start_tick = tick
+
+        while ticks > 0:
+            if self._last_bucket_ticks == self.bucket_ticks or not self.num_buckets:
+                self._new_bucket(values)
+
+            span = min(ticks, self.bucket_ticks - self._last_bucket_ticks)
+            for mins, maxs, sums, value in zip(
+                self._mins, self._maxs, self._sums, values
+            ):
+                if value < mins[-1]:
+                    mins[-1] = value
+                elif value > maxs[-1]:
+                    maxs[-1] = value
+                sums[-1] += value * span
+            self._last_bucket_ticks += span
+            ticks -= span
+
+    def _new_bucket(self, values: Sequence[int]) -> None:
+        if self.num_buckets == self._max_buckets:
+            self._downsample()
+
+        for mins, maxs, sums, value in zip(self._mins, self._maxs, self._sums, values):
+            mins.append(value)
+            maxs.append(value)
+            sums.append(0)
+        self._last_bucket_ticks = 0
+
+    def _downsample(self) -> None:
+        """
+        Merges the (full) buckets in pairs
+        """
+        self._mins = [array('q', map(min, c[0::2], c[1::2])) for c in self._mins]
+        self._maxs = [array('q', map(max, c[0::2], c[1::2])) for c in self._maxs]
+        self._sums = [array('q', map(add, c[0::2], c[1::2])) for c in self._sums]
+        self.bucket_ticks *= 2
+        self._last_bucket_ticks = self.bucket_ticks
+
+    def buckets(self) -> Iterator[tuple[int, int, list[tuple[int, int, float]]]]:
+        """
+        First tick and number of ticks of each bucket, with the (min, max, mean)
+        of each channel over it
+        """
+        start_tick = self.start_tick or 0
+        last = self.num_buckets - 1
+        for i in range(self.num_buckets):
+            ticks = self._last_bucket_ticks if i == last else self.bucket_ticks
+            yield (
+                start_tick + i * self.bucket_ticks,
+                ticks,
+                [
+                    (mins[i], maxs[i], sums[i] / ticks)
+                    for mins, maxs, sums in zip(self._mins, self._maxs, self._sums)
+                ],
+            )
+
+    def write_csv(self, stream: TextIO) -> None:
+        columns = [
+            f'{channel}_{stat}'
+            for channel in self.channels
+            for stat in ('min', 'max', 'mean')
+        ]
+        stream.write(','.join(['tick', 'ticks', *columns]) + '\n')
+        for tick, ticks, stats in self.buckets():
+            values = [
+                str(value)
+                for minimum, maximum, mean in stats
+                for value in (minimum, maximum, round(mean, 3))
+            ]
+            stream.write(','.join([str(tick), str(ticks), *values]) + '\n')
+
+    def encode(self) -> bytes:
+        """
+        Binary form of the series: the magic string, the header, the channel
+        names separated by newlines, then the mins, maxs and sums of each
+        channel, as int64 in native byte order
+        """
+        names = '\n'.join(self.channels).encode()
+        chunks: list[bytes] = [
+            self.MAGIC,
+            self._HEADER.pack(
+                -1 if self.start_tick is None else self.start_tick,
+                self.bucket_ticks,
+                self.num_buckets,
+                self._last_bucket_ticks,
+                len(names),
+            ),
+            names,
+        ]
+        for mins, maxs, sums in zip(self._mins, self._maxs, self._sums):
+            chunks += [mins.tobytes(), maxs.tobytes(), sums.tobytes()]
+        return b''.join(chunks)
+
+    @classmethod
+    def decode(cls, data: bytes) -> TimeSeries:
+        if not data.startswith(cls.MAGIC):
+            raise Exception('Error: Not a time series file.')
+
+        offset = len(cls.MAGIC)
+        start_tick, bucket_ticks, num_buckets, last_bucket_ticks, names_size = (
+            cls._HEADER.unpack_from(data, offset)
+        )
+        offset += cls._HEADER.size
+        names = data[offset : offset + names_size].decode()
+        offset += names_size
+
+        series = cls(names.split('\n') if names else [])
+        series.start_tick = None if start_tick < 0 else start_tick
+        series.bucket_ticks = bucket_ticks
+        series._last_bucket_ticks = last_bucket_ticks
+        columns: list[array[int]] = []
+        for _ in range(3 * len(series.channels)):
+            columns.append(array('q', data[offset : offset + 8 * num_buckets]))
+            offset += 8 * num_buckets
+        series._mins = columns[0::3]
+        series._maxs = columns[1::3]
+        series._sums = columns[2::3]
+        return series
+
+    def write(self, path: str) -> None:
+        """
+        Writes the series to path, as CSV if it ends in .csv and in binary otherwise
+        """
+        if path.endswith('.csv'):
+            with open(path, 'w') as csv_file:
+                self.write_csv(csv_file)
+        else:
+            with open(path, 'wb') as series_file:
+                series_file.write(self.encode())
+
+    @classmethod
+    def read(cls, path: str) -> TimeSeries:
+        with open(path, 'rb') as series_file:
+            return cls.decode(series_file.read())
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of a MultiLevelFeedbackQueue
+
+    instrument() replaces the phases of the simulation loop, and the methods
+    of the queues, with timing and counting wrappers on that instance only.
+    Nothing is wrapped unless a profiler is given, so an uninstrumented run
+    does not pay for it.
+    """
+
+    PHASES: tuple[str, ...] = (
+        'push_arriving_processes',
+        'reschedule_expired_processes',
+        'context_switch',
+        'ticks_until_next_event',
+        'on_tick',
+        'output_tick',
+        'final_stats',
+    )
+
+    # Phase name mapped to [calls, nanoseconds]
+    _phases: dict[str, list[int]]
+    # Per-queue counters, one dict per queue level
+    _queues: list[dict[str, int]]
+    _io: dict[str, int]
+    _context_switches: int
+
+    def __init__(self) -> None:
+        self._phases = {}
+        self._queues = []
+        self._io = {'pushes': 0, 'pops': 0}
+        self._context_switches = 0
+
+    def instrument(self, mlfq: MultiLevelFeedbackQueue) -> None:
+        for phase in self.PHASES:
+            setattr(mlfq, phase, self._timed(phase, getattr(mlfq, phase)))
+
+        context_switch = mlfq.context_switch
+
+        def counted_context_switch() -> None:
+            last_running_process = mlfq._last_running_process
+            context_switch()
+            if mlfq._last_running_process is not last_running_process:
+                self._context_switches += 1
+
+        mlfq.context_switch = counted_context_switch
+
+        for queue in mlfq._priority_queues:
+            self._instrument_queue(queue)
+        self._instrument_io(mlfq._io)
+
+    def _timed(self, phase: str, method: Callable) -> Callable:
+        totals = self._phases.setdefault(phase, [0, 0])
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[0] += 1
+                totals[1] += perf_counter_ns() - start
+
+        return timed
+
+    def _instrument_queue(self, queue: PriorityQueue) -> None:
+        counters = {'pushes': 0, 'pops': 0, 'rotations': 0, 'demotions': 0}
+        self._queues.append(counters)
+        push_process = queue.push_process
+        release_current_on_expiry = queue.release_current_on_expiry
+        select_new_process = queue.select_new_process
+
+        def counted_push_process(process: Process):
+            counters['pushes'] += 1
+            push_process(process)
+
+        def counted_release_current_on_expiry() -> Process | None:
+            process = release_current_on_expiry()
+            if process is not None:
+                counters['pops'] += 1
+                # Released before the burst is done, so the process is demoted
+                if not process.is_burst_complete:
+                    counters['demotions'] += 1
+            return process
+
+        def counted_select_new_process() -> Process | None:
+            # RR queues rotate on selection once the quantum is used up
+            if isinstance(queue, RRPriorityQueue) and not queue.is_empty:
+                counters['rotations'] += queue._time_quantum_counter <= 0
+            return select_new_process()
+
+        queue.push_process = counted_push_process
+        queue.release_current_on_expiry = counted_release_current_on_expiry
+        queue.select_new_process = counted_select_new_process
+
+    def _instrument_io(self, io: IO) -> None:
+        push_process = io.push_process
+        release_expired_processes = io.release_expired_processes
+
+        def counted_push_process(process: Process):
+            self._io['pushes'] += 1
+            push_process(process)
+
+        def counted_release_expired_processes() -> list[Process]:
+            processes = release_expired_processes()
+            self._io['pops'] += len(processes)
+            return processes
+
+        io.push_process = counted_push_process
+        io.release_expired_processes = counted_release_expired_processes
+
+    def summary(self) -> dict:
+        """
+        Machine-readable summary of the timers and counters
+        """
+        return {
+            'phases': {
+                phase: {'calls': calls, 'seconds': nanoseconds / 1e9}
+                for phase, (calls, nanoseconds) in self._phases.items()
+            },
+            'queues': [
+                {'level': level, **counters}
+                for level, counters in enumerate(self._queues)
+            ],
+            'io': dict(self._io),
+            'context_switches': self._context_switches,
+        }
+
+
+@dataclass
+class SimulationState:
+    """
+    State of a simulation between two iterations of run(), with processes
+    referred to by refs (see MultiLevelFeedbackQueue.get_state), which
+    src/checkpoint.py saves and restores
+    """
+
+    # Names of the classes of the priority queues, separated by spaces
+    queue_types: str
+    tick: int
+    context_switch_counter: int
+    boost_epoch: int
+    # Refs of the processes last run and on the CPU, or -1 if there are none
+    last_running_ref: int
+    current_ref: int
+    queue_states: list[array[int]]
+    io_state: array[int]
+    metrics_state: list[array[int]]
+    # Every process, and the processes loaded so far in order of arrival, of
+    # which those from next_arrival_index on have not arrived yet. These are
+    # the lists of the simulation itself, which must not be modified.
+    all_processes: list[Process]
+    future_processes: list[Process]
+    next_arrival_index: int
+    # Bumped whenever processes are added, which reorders future_processes
+    future_generation: int
+    # Processes loaded from the stream so far, or None if not streamed
+    num_streamed: int | None
+    # Where to resume the stream from, if it is known
+    stream_position: Sequence[int] | None
+    # Position in the trace output, if it is known
+    trace_position: int | None
+
+
+class RunObserver(Protocol):
+    """
+    Offered the simulation before each iteration of a run, to checkpoint or
+    index it (see src/checkpoint.py and src/trace_index.py)
+    """
+
+    def on_iteration(self, mlfq: MultiLevelFeedbackQueue) -> None: ...
+
+    def close(self) -> None: ...
+
+
+# (process name, order, arrival time, completion time, waiting time) of a
+# completed process, where order is the order it was added to the simulation in
+CompletedRecord = tuple[str, int, int, int, int]
+
+
+class CompletedProcessStore:
+    """
+    Compact records of completed processes, kept for the final stats
+
+    Once run_size records are held, they are sorted by name and spilled to a
+    temporary file as a sorted run, so that at most run_size records are in
+    memory at once. records() merges the runs back in order of name, and of
+    order between processes of the same name.
+    """
+
+    # Integer fields and name length of a spilled record, followed by the name
+    _RECORD_HEADER: struct.Struct = struct.Struct('<4qI')
+
+    _run_size: int
+    _records: list[CompletedRecord]
+    _directory: tempfile.TemporaryDirectory | None = None
+    _run_files: list
+    _num_records: int = 0
+
+    def __init__(self, run_size: int = 1 << 16) -> None:
+        if run_size < 1:
+            raise Exception('Error: Sorted runs must hold at least one record')
+
+        self._run_size = run_size
+        self._records = []
+        self._run_files = []
+
+    def __len__(self) -> int:
+        return self._num_records
+
+    @property
+    def num_runs(self) -> int:
+        """
+        Number of sorted runs spilled to disk
+        """
+        return len(self._run_files)
+
+    def add(self, process: Process, order: int) -> None:
+        """
+        Record a completed process, which is no longer needed afterwards
+        """
+        self._records.append(
+            (
+                process.process_name,
+                order,
+                process.arrival_time,
+                process.completion_time,
+                process.waiting_time,
+            )
+        )
+        self._num_records += 1
+        if len(self._records) >= self._run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._directory is None:
+            self._directory = tempfile.TemporaryDirectory()
+
+        self._records.sort()
+        run_file = open(f'{self._directory.name}/{len(self._run_files)}', 'w+b')
+        self._run_files.append(run_file)
+        pack = self._RECORD_HEADER.pack
+        for name, *fields in self._records:
+            encoded_name = name.encode()
+            run_file.write(pack(*fields, len(encoded_name)))
+            run_file.write(encoded_name)
+        self._records.clear()
+
+    def _read_run(self, run_file) -> Iterator[CompletedRecord]:
+        run_file.seek(0)
+        header_size = self._RECORD_HEADER.size
+        unpack = self._RECORD_HEADER.unpack
+        while header := run_file.read(header_size):
+            *fields, name_size = unpack(header)
+            yield (run_file.read(name_size).decode(), *fields)
+
+    def records(self) -> Iterator[CompletedRecord]:
+        """
+        All records, in order of (name, order)
+        Only one record per sorted run is held in memory while iterating.
+        """
+        self._records.sort()
+        if not self._run_files:
+            return iter(self._records)
+
+        runs = [self._read_run(run_file) for run_file in self._run_files]
+        return heapq.merge(*runs, self._records)
+
+    def close(self) -> None:
+        for run_file in self._run_files:
+            run_file.close()
+        self._run_files = []
+        if self._directory is not None:
+            self._directory.cleanup()
+            self._directory = None
+
+
+def _highest_level(occupancy: int) -> int:
+    """
+    Level of the highest priority non-empty queue of an occupancy bitmap, in
+    which bit i is set if queue i is not empty (-1 if every queue is empty)
+    """
+    return (occupancy & -occupancy).bit_length() - 1
+
+
+def _occupied_levels(occupancy: int) -> Iterator[int]:
+    """
+    Levels of the non-empty queues of an occupancy bitmap, highest priority first
+    """
+    while occupancy:
+        lowest_bit = occupancy & -occupancy
+        yield lowest_bit.bit_length() - 1
+        occupancy ^= lowest_bit
+
+
+class _BoostedProcesses(DetachedProcesses):
+    """
+    Processes detached from a queue by a priority boost, which each reconcile
+    with the boost once taken (see MultiLevelFeedbackQueue.boost)
+    """
+
+    _processes: DetachedProcesses
+    _boost_epoch: int
+
+    def __init__(self, processes: DetachedProcesses, boost_epoch: int) -> None:
+        self._processes = processes
+        self._boost_epoch = boost_epoch
+
+    def __len__(self) -> int:
+        return len(self._processes)
+
+    def __iter__(self) -> Iterator[Process]:
+        return iter(self._processes)
+
+    def popleft(self) -> Process:
+        process = self._processes.popleft()
+        process.reconcile_boost(self._boost_epoch)
+        return process
+
+    def pop(self) -> Process:
+        process = self._processes.pop()
+        process.reconcile_boost(self._boost_epoch)
+        return process
+
+
+def _boost_queues(
+    priority_queues: Sequence[PriorityQueue],
+    occupancy: int,
+    boost_epoch: int,
+    metrics: LatencyMetrics,
+    tick: int,
+) -> int:
+    """
+    Moves the processes of every lower queue to the back of the top queue,
+    level by level, and returns the new occupancy bitmap
+    """
+    top_queue = priority_queues[0]
+    for queue_level in _occupied_levels(occupancy & ~1):
+        processes = priority_queues[queue_level].detach_processes()
+        metrics.on_boost(queue_level, len(processes), tick)
+        top_queue.push_detached(_BoostedProcesses(processes, boost_epoch))
+    return 1 if occupancy else 0
+
+
+class QueueRenderer:
+    """
+    Renders the waiting processes of a set of queues, as in the 'Queues' line
+
+    Rendered queues are cached along with their version, and a queue is only
+    rendered again once its version changes, or the running process enters
+    or leaves it. Rendering a tick in which nothing changed is then O(1) in
+    the number of processes.
+    """
+
+    _priority_queues: Sequence[PriorityQueue]
+    _versions: list[int]
+    _rendered_queues: list[str]
+    _current_process: Process | None = None
+    _line: str | None = None
+
+    def __init__(self, priority_queues: Sequence[PriorityQueue]) -> None:
+        self._priority_queues = priority_queues
+        self._versions = [-1] * len(priority_queues)
+        self._rendered_queues = [''] * len(priority_queues)
+
+    def render(self, current_process: Process | None) -> str:
+        versions = self._versions
+        if current_process is not self._current_process:
+            # The running process is left out of the queue it is in
+            for process in (self._current_process, current_process):
+                if process is not None:
+                    versions[process.queue_level] = -1
+            self._current_process = current_process
+
+        for level, queue in enumerate(self._priority_queues):
+            if queue.version != versions[level]:
+                versions[level] = queue.version
+                self._rendered_queues[level] = str(
+                    [p for p in queue.processes if p != current_process]
+                )
+                self._line = None
+
+        if self._line is None:
+            self._line = ';'.join(self._rendered_queues)
+        return self._line
+
 
 class MultiLevelFeedbackQueue:
     _tick: int = 0
+    # Every process, unless completed processes are retired to _completed_store
     _all_processes: list[Process]
+    _completed_store: CompletedProcessStore | None = None
+    # Order each process that has not completed yet was added in, when retiring
+    # them (see CompletedProcessStore)
+    _process_orders: dict[Process, int]
+    _next_order: int = 0
+    # Sorted by (arrival time, name), consumed through _next_arrival_index
     _future_processes: list[Process]
+    _next_arrival_index: int = 0
+    # Source of processes that have not been loaded into _future_processes yet
+    _future_stream: Iterator[Process] | None = None
     _priority_queues: Sequence[PriorityQueue]
+    # Bit i is set if _priority_queues[i] is not empty (see _highest_level)
+    _occupancy: int = 0
+    # Processes in the priority queues
+    _num_queued: int = 0
     _io: IO
     _context_switch_time: int
     _context_switch_counter: int = 0
     _last_running_process: Process | None = None
     _current_process: Process | None = None
     _demoted_process_names: list[str]
+    # Ticks between priority boosts, or None to never boost (see boost)
+    _boost_interval: int | None = None
+    # Number of priority boosts so far
+    _boost_epoch: int = 0
+    _trace: TraceSink
+    _queue_renderer: QueueRenderer
+    # Version of the IO the 'I/O' line was last rendered at, and the line
+    _rendered_io: tuple[int, str] = (-1, '')
+    _metrics: LatencyMetrics
+    _timeseries: TimeSeries | None = None
+    # Bumped whenever processes are added (see add_future_processes)
+    _future_generation: int = 0
 
     def __init__(
         self,
-        future_processes: Sequence[Process],
+        future_processes: Iterable[Process],
         priority_queues: Sequence[PriorityQueue],
         context_switch_time: int = 0,
+        presorted: bool = False,
+        trace: TraceSink | None = None,
+        profiler: Profiler | None = None,
+        completed_store: CompletedProcessStore | None = None,
+        boost_interval: int | None = None,
+        timeseries_budget: int | None = None,
     ) -> None:
-        self._all_processes = list(future_processes)
-        self._future_processes = list(future_processes)
+        """
+        If presorted is set, future_processes must already be sorted by
+        (arrival time, process name), and sorting them is skipped
+        A presorted iterator (e.g. from read_process_stream()) is consumed
+        lazily, one process at a time as the simulation reaches its arrival
+
+        All output is written to trace, which defaults to a buffered stdout sink
+        If a profiler is given, the simulation is instrumented by it
+        If a completed_store is given, completed processes are retired to it
+        instead of being kept until the final stats, so that streamed processes
+        are only held while they are live
+        If a boost_interval is given, every process is returned to the top
+        queue every boost_interval ticks (see boost)
+        If a timeseries_budget is given, a time series of the run is recorded
+        in that many bytes (see timeseries)
+        """
+        if boost_interval is not None and boost_interval < 1:
+            raise Exception('Error: The boost interval must be at least 1 tick')
+        self._boost_interval = boost_interval
+        self._trace = trace if trace is not None else TextTraceSink()
+        if presorted and not isinstance(future_processes, Sequence):
+            # Processes are only known once they arrive
+            self._future_stream = iter(future_processes)
+            self._all_processes = []
+            self._future_processes = []
+        else:
+            self._all_processes = list(future_processes)
+            self._future_processes = list(self._all_processes)
+            if not presorted:
+                self._future_processes.sort(
+                    key=lambda p: (p.arrival_time, p.process_name)
+                )
+        self._process_orders = {}
+        if completed_store is not None:
+            self._completed_store = completed_store
+            for process in self._all_processes:
+                self._process_orders[process] = self._next_order
+                self._next_order += 1
+            self._all_processes = []
+
         self._priority_queues = priority_queues
+        self._queue_renderer = QueueRenderer(priority_queues)
         self._context_switch_time = context_switch_time
         self._io = IO()
+        self._metrics = LatencyMetrics(len(priority_queues))
+        if timeseries_budget is not None:
+            channels = [f'q{level + 1}' for level in range(len(priority_queues))]
+            self._timeseries = TimeSeries(
+                [*channels, 'busy', 'switching', 'idle', 'io'], timeseries_budget
+            )
+
+        if profiler is not None:
+            profiler.instrument(self)
 
     def __repr__(self) -> str:
+        # Processes that have not arrived yet, in input order
+        pending = {id(p) for p in self.future_processes}
+        if self._future_stream is not None:
+            pending_processes = self.future_processes
+        elif self._completed_store is not None:
+            pending_processes = sorted(
+                self.future_processes, key=self._process_orders.__getitem__
+            )
+        else:
+            pending_processes = [p for p in self._all_processes if id(p) in pending]
         return '\n'.join(
             [
-                f'Processes: {self._future_processes}',
+                f'Processes: {pending_processes}',
                 f'PriorityQueues: {self._priority_queues}',
                 f'Context Switch Time: {self._context_switch_time}',
             ]
@@ -492,53 +2429,352 @@ class MultiLevelFeedbackQueue:
 
     @property
     def is_empty(self):
-        return all(
-            [queue.is_empty for queue in self._priority_queues]
-            + [len(self._future_processes) == 0]
-            + [self._io.is_empty]
+        return (
+            self._peek_future_process() is None
+            and self._num_queued == 0
+            and self._io.is_empty
         )
 
-    def on_tick(self):
+    @property
+    def num_future_processes(self) -> int:
+        """
+        Number of processes that have not arrived yet
+
+        When streaming, only the processes loaded so far are counted
+        """
+        return len(self._future_processes) - self._next_arrival_index
+
+    @property
+    def num_queued_processes(self) -> int:
+        return self._num_queued
+
+    @property
+    def num_blocked_processes(self) -> int:
+        return self._io.num_processes
+
+    def on_tick(self, ticks: int = 1):
         """
         Run both IO and CPU Ticks
+
+        Advancing by more than one tick at once is only valid if no event
+        (see ticks_until_next_event) happens in between
         """
-        self._tick += 1
+        self._tick += ticks
 
         # IO Tick
-        self._io.on_tick()
+        self._io.on_tick(ticks)
 
         # CPU Tick (if not currently context switching)
         if self._context_switch_counter > 0:
-            self._context_switch_counter -= 1
+            self._context_switch_counter -= ticks
             return
 
-        for queue in self._priority_queues:
-            if not queue.is_empty:
-                queue.on_tick()
-                break
+        if self._occupancy:
+            self._priority_queues[_highest_level(self._occupancy)].on_tick(ticks)
 
-    def push_arriving_processes(self):
+    def ticks_until_next_event(self) -> int:
         """
-        Push all processes arriving during the tick
+        Number of ticks until the next tick in which something can change, i.e.
+        an arrival, a burst or IO completion, a quantum or allotment expiry,
+        the end of a context switch, or a priority boost
+
+        Must be called after context_switch() and before on_tick()
         """
-        newly_arrived_processes = sorted(
-            [
-                process
-                for process in self._future_processes
-                if process.arrival_time == self._tick
+        candidates: list[int] = []
+
+        next_arrival = self._peek_future_process()
+        if next_arrival is not None:
+            candidates.append(next_arrival.arrival_time - self._tick)
+
+        io_ticks = self._io.ticks_until_release()
+        if io_ticks is not None:
+            candidates.append(io_ticks)
+
+        # The simulation stops once empty, without waiting for the next boost
+        if self._boost_interval and not self.is_empty:
+            candidates.append(self._boost_interval - self._tick % self._boost_interval)
+
+        if self._context_switch_counter > 0:
+            candidates.append(self._context_switch_counter)
+        elif self._occupancy:
+            queue = self._priority_queues[_highest_level(self._occupancy)]
+            queue_ticks = queue.ticks_until_expiry()
+            if queue_ticks is not None:
+                candidates.append(queue_ticks)
+
+        return max(min(candidates, default=1), 1)
+
+    @property
+    def metrics(self) -> LatencyMetrics:
+        return self._metrics
+
+    @property
+    def timeseries(self) -> TimeSeries | None:
+        """
+        Per tick, the processes in each queue (the running one included), the
+        number of running, context switching and idle CPUs, and the processes
+        in IO, or None unless a timeseries_budget was given
+        """
+        return self._timeseries
+
+    def _timeseries_values(self) -> list[int]:
+        """
+        Values of the time series channels for the ticks about to be simulated
+        """
+        switching = self._context_switch_counter > 0
+        busy = not switching and self._occupancy != 0
+        return [
+            *(queue.num_processes for queue in self._priority_queues),
+            busy,
+            switching,
+            not (busy or switching),
+            self._io.num_processes,
+        ]
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> SimulationState:
+        """
+        State of the simulation, which must be between two iterations of run(),
+        with processes referred to by process_ref
+        Only the processes in the queues, the IO and on the CPU are passed to
+        process_ref, which are all that is live.
+        """
+        if self._completed_store is not None:
+            raise Exception(
+                'Error: Cannot checkpoint a simulation that retires completed processes.'
+            )
+
+        stream = self._future_stream
+        return SimulationState(
+            queue_types=' '.join(
+                type(queue).__name__ for queue in self._priority_queues
+            ),
+            tick=self._tick,
+            context_switch_counter=self._context_switch_counter,
+            boost_epoch=self._boost_epoch,
+            last_running_ref=(
+                process_ref(self._last_running_process)
+                if self._last_running_process is not None
+                else -1
+            ),
+            current_ref=(
+                process_ref(self._current_process)
+                if self._current_process is not None
+                else -1
+            ),
+            queue_states=[
+                queue.get_state(process_ref) for queue in self._priority_queues
             ],
-            key=lambda p: p.process_name,
+            io_state=self._io.get_state(process_ref),
+            metrics_state=self._metrics.get_state(),
+            all_processes=self._all_processes,
+            future_processes=self._future_processes,
+            next_arrival_index=self._next_arrival_index,
+            future_generation=self._future_generation,
+            num_streamed=(
+                len(self._all_processes) + len(self.future_processes)
+                if stream is not None
+                else None
+            ),
+            stream_position=(
+                stream.position if isinstance(stream, WorkloadStream) else None
+            ),
+            trace_position=self._trace.checkpoint(),
+        )
+
+    def set_state(
+        self, state: SimulationState, process_of: Callable[[int], Process]
+    ) -> None:
+        """
+        Continues from the state of a simulation with the same queues, whose
+        refs are resolved by process_of, replacing the processes it was
+        created with
+
+        A streamed simulation must be given the same stream, which is
+        advanced past the processes that were already loaded, by seeking a
+        WorkloadStream to where it was or else by reading them again
+        """
+        if self._completed_store is not None:
+            raise Exception(
+                'Error: Cannot restore a simulation that retires completed processes.'
+            )
+
+        queue_types = ' '.join(type(queue).__name__ for queue in self._priority_queues)
+        if state.queue_types != queue_types:
+            raise Exception(
+                'Error: Checkpoint was taken with different priority queues.'
+            )
+        if (state.num_streamed is not None) != (self._future_stream is not None):
+            raise Exception(
+                'Error: Checkpoint and simulation do not both stream their processes.'
+            )
+
+        self._tick = state.tick
+        self._context_switch_counter = state.context_switch_counter
+        self._boost_epoch = state.boost_epoch
+        self._all_processes = state.all_processes
+        self._future_processes = state.future_processes
+        self._next_arrival_index = state.next_arrival_index
+        self._future_generation = state.future_generation
+        stream = self._future_stream
+        if isinstance(stream, WorkloadStream) and state.stream_position:
+            stream.seek(state.stream_position)
+        elif stream is not None and state.num_streamed is not None:
+            # Skip the processes that were loaded before the checkpoint
+            next(itertools.islice(stream, state.num_streamed, state.num_streamed), None)
+
+        self._last_running_process = (
+            process_of(state.last_running_ref) if state.last_running_ref >= 0 else None
+        )
+        self._current_process = (
+            process_of(state.current_ref) if state.current_ref >= 0 else None
+        )
+        self._demoted_process_names = []
+
+        self._occupancy = 0
+        self._num_queued = 0
+        for level, queue in enumerate(self._priority_queues):
+            queue.set_state(state.queue_states[level], process_of)
+            self._occupancy |= (not queue.is_empty) << level
+            self._num_queued += queue.num_processes
+        self._io.set_state(state.io_state, process_of)
+        self._metrics.set_state(state.metrics_state)
+
+    @property
+    def future_processes(self) -> list[Process]:
+        """
+        Processes that have not arrived yet, ordered by arrival time and name
+
+        When streaming, only the processes loaded so far are included
+        """
+        return self._future_processes[self._next_arrival_index :]
+
+    def add_future_processes(self, processes: Iterable[Process]) -> None:
+        """
+        Add processes that were not known when the simulation started, e.g. for
+        online scheduling
+        They must not arrive before the current tick
+        """
+        if self._future_stream is not None:
+            raise Exception('Error: Cannot add processes to a streamed simulation')
+
+        self._future_generation += 1
+        # Drop the processes that have already arrived
+        if self._next_arrival_index > len(self._future_processes) // 2:
+            del self._future_processes[: self._next_arrival_index]
+            self._next_arrival_index = 0
+
+        future_processes = self._future_processes
+        process_orders = (
+            self._process_orders if self._completed_store is not None else None
         )
+        last_key: tuple[int, str] | None = None
+        if len(future_processes) > self._next_arrival_index:
+            last_process = future_processes[-1]
+            last_key = (last_process.arrival_time, last_process.process_name)
+
+        for process in processes:
+            if process.arrival_time < self._tick:
+                raise Exception(
+                    f'Error: Process {process.process_name} arrives at {process.arrival_time}, before the current tick {self._tick}'
+                )
+
+            if process_orders is None:
+                self._all_processes.append(process)
+            else:
+                process_orders[process] = self._next_order
+                self._next_order += 1
+            key = (process.arrival_time, process.process_name)
+            if last_key is None or last_key <= key:
+                # Processes usually arrive in order
+                future_processes.append(process)
+                last_key = key
+            else:
+                bisect.insort(
+                    future_processes,
+                    process,
+                    lo=self._next_arrival_index,
+                    key=lambda p: (p.arrival_time, p.process_name),
+                )
 
-        # Removes newly arrived processes from future processes list
-        for process in newly_arrived_processes:
-            self._future_processes.remove(process)
+    def _peek_future_process(self) -> Process | None:
+        """
+        Next process to arrive, loading it from the stream if needed
+        """
+        if self._next_arrival_index < len(self._future_processes):
+            return self._future_processes[self._next_arrival_index]
+
+        if self._future_stream is None:
+            return
+
+        # Drop the processes that have already arrived before loading the next one
+        self._future_processes.clear()
+        self._next_arrival_index = 0
+
+        process = next(self._future_stream, None)
+        if process is not None:
+            self._future_processes.append(process)
+        return process
+
+    def push_arriving_processes(self):
+        """
+        Push all processes arriving during the tick
+        """
+        newly_arrived_processes: list[Process] = []
+        while (process := self._peek_future_process()) is not None and (
+            process.arrival_time <= self._tick
+        ):
+            newly_arrived_processes.append(process)
+            self._next_arrival_index += 1
 
         if newly_arrived_processes:
-            print(f'Arriving : {newly_arrived_processes}')
+            # Already sorted by name, since future processes are sorted by arrival and name
+            if self._future_stream is not None and self._completed_store is None:
+                self._all_processes.extend(newly_arrived_processes)
+            elif self._future_stream is not None:
+                for process in newly_arrived_processes:
+                    self._process_orders[process] = self._next_order
+                    self._next_order += 1
+
+            if self._trace.traces_ticks:
+                self._trace.write(f'Arriving : {newly_arrived_processes}')
 
             for process in newly_arrived_processes:
-                self._priority_queues[0].push_process(process)
+                self._push_process(process)
+                self._metrics.on_queue_entry(0, self._tick)
+
+    def _push_process(self, process: Process) -> None:
+        """
+        Push a process to the priority queue of its queue level
+        """
+        if self._boost_epoch:
+            process.reconcile_boost(self._boost_epoch)
+        self._priority_queues[process.queue_level].push_process(process)
+        self._occupancy |= 1 << process.queue_level
+        self._num_queued += 1
+
+    def _release_expired_processes(self) -> Iterator[tuple[int, Process]]:
+        """
+        Release the processes that completed their burst or used up their time
+        allotment, with the level of the queue they were released from
+        """
+        for queue_level in _occupied_levels(self._occupancy):
+            queue = self._priority_queues[queue_level]
+            process = queue.release_current_on_expiry()
+            if process:
+                self._num_queued -= 1
+                if queue.is_empty:
+                    self._occupancy ^= 1 << queue_level
+                yield queue_level, process
+
+    def _complete_process(self, process: Process) -> None:
+        process.end_process(self._tick)
+        self._metrics.on_completion(process)
+        if self._completed_store is not None:
+            self._completed_store.add(process, self._process_orders.pop(process))
 
     def reschedule_expired_processes(self):
         """
@@ -551,23 +2787,22 @@ class MultiLevelFeedbackQueue:
         self._demoted_process_names = []
 
         # Check all priority queues and sort into three separate lists
-        for queue in self._priority_queues:
-            process = queue.release_current_on_expiry()
-            if process:
-                if process.is_process_complete:
-                    completed_processes.append(process)
-                    process.end_process(self._tick)
-                elif process.is_burst_complete:
-                    burst_completed_processes.append(process)
-                else:
-                    demoted_processes.append(process)
+        for queue_level, process in self._release_expired_processes():
+            self._metrics.on_queue_exit(queue_level, self._tick)
+            if process.is_process_complete:
+                completed_processes.append(process)
+                self._complete_process(process)
+            elif process.is_burst_complete:
+                burst_completed_processes.append(process)
+            else:
+                demoted_processes.append(process)
 
         # Check IO and release finished IO processes
         io_completed_processes = self._io.release_expired_processes()
         for process in io_completed_processes:
             if process.is_process_complete:
                 completed_processes.append(process)
-                process.end_process(self._tick)
+                self._complete_process(process)
             else:
                 burst_completed_processes.append(process)
 
@@ -577,8 +2812,9 @@ class MultiLevelFeedbackQueue:
         demoted_processes.sort(key=lambda p: p.process_name)
 
         # Output all finished processes (i.e. all burst times are now 0)
-        for process in completed_processes:
-            print(f'{process.process_name} DONE')
+        if self._trace.traces_ticks:
+            for process in completed_processes:
+                self._trace.write(f'{process.process_name} DONE')
 
         # Reassign demoted processes
         for process in demoted_processes:
@@ -587,8 +2823,10 @@ class MultiLevelFeedbackQueue:
 
             # stash list of demoted process names for output later
             self._demoted_process_names.append(process.process_name)
+            self._metrics.on_demotion(process.queue_level)
             process.demote()
-            self._priority_queues[process.queue_level].push_process(process)
+            self._push_process(process)
+            self._metrics.on_queue_entry(process.queue_level, self._tick)
 
         # Reassign based on IO or CPU burst completion
         for process in burst_completed_processes:
@@ -603,13 +2841,14 @@ class MultiLevelFeedbackQueue:
                 process.update_time_in_queue(
                     self._priority_queues[process.queue_level].time_allotment
                 )
-                self._priority_queues[process.queue_level].push_process(process)
+                self._push_process(process)
+                self._metrics.on_queue_entry(process.queue_level, self._tick)
             else:
                 self._io.push_process(process)
 
     def output_demoted_processes(self):
         for proc_str in self._demoted_process_names:
-            print(f'{proc_str} DEMOTED')
+            self._trace.write(f'{proc_str} DEMOTED')
 
     def context_switch(self):
         """
@@ -628,10 +2867,11 @@ class MultiLevelFeedbackQueue:
 
         next_process: Process | None = None
 
-        for queue in self._priority_queues:
-            if not queue.is_empty:
-                next_process = queue.select_new_process()
-                break
+        if self._occupancy:
+            queue = self._priority_queues[_highest_level(self._occupancy)]
+            next_process = queue.select_new_process()
+            if next_process and self._boost_epoch:
+                next_process.reconcile_boost(self._boost_epoch)
 
         if next_process and self._last_running_process != next_process:
             self._last_running_process = next_process
@@ -641,8 +2881,40 @@ class MultiLevelFeedbackQueue:
         if self._context_switch_counter <= 0:
             self._current_process = next_process
 
+            if next_process and not next_process.has_started:
+                next_process.start_process(self._tick)
+                self._metrics.on_first_run(next_process)
+
+    def boost(self) -> None:
+        """
+        Priority boost: returns every process to the top queue with a fresh
+        time allotment, so that long running processes cannot starve
+
+        The waiting processes of the lower queues join the back of the top
+        queue, level by level and in queue order, and processes in IO return
+        to it. This is O(1) in the number of processes: lower queues are
+        detached whole and only pulled into the top queue one process at a
+        time (see PriorityQueue.push_detached), and the boost epoch is bumped,
+        which each process reconciles with the next time it is pushed or
+        selected (see Process.reconcile_boost)
+        """
+        self._boost_epoch += 1
+        self._boost_queues()
+
+        if self._trace.traces_ticks:
+            self._trace.write('PRIORITY BOOST')
+
+    def _boost_queues(self) -> None:
+        self._occupancy = _boost_queues(
+            self._priority_queues,
+            self._occupancy,
+            self._boost_epoch,
+            self._metrics,
+            self._tick,
+        )
+
     def final_stats(self) -> None:
-        print('SIMULATION DONE\n')
+        self._trace.write('SIMULATION DONE\n')
 
         # sort all processses in alphabetical order
         self._all_processes = sorted(
@@ -651,60 +2923,637 @@ class MultiLevelFeedbackQueue:
         )
 
         # print turnaround time of each process
-        for p in self._all_processes:
-            print(
-                f'Turn-around time for Process {p.process_name} : {p.completion_time} - {p.arrival_time} = {p.turnaround_time} ms'
+        for name, arrival_time, completion_time, _ in self._completed_records():
+            self._trace.write(
+                f'Turn-around time for Process {name} : {completion_time} - {arrival_time} = {completion_time - arrival_time} ms'
             )
 
         # print average turnaround time
-        avg_ta_time = round(
-            sum([p.turnaround_time for p in self._all_processes])
-            / len(self._all_processes),
-            3,
-        )
+        avg_ta_time = round(self._metrics.average_turnaround_time, 3)
         avg_ta_time_int = int(avg_ta_time)
-        print(
+        self._trace.write(
             f'Average Turn-around time = {avg_ta_time_int if float(avg_ta_time_int) == avg_ta_time else avg_ta_time} ms'
         )
 
         # print waiting time of each process
+        for name, _, _, waiting_time in self._completed_records():
+            self._trace.write(f'Waiting time for Process {name} : {waiting_time} ms')
+
+    def _completed_records(self) -> Iterator[tuple[str, int, int, int]]:
+        """
+        (name, arrival time, completion time, waiting time) of every process,
+        in alphabetical order
+        """
+        if self._completed_store is not None:
+            for record in self._completed_store.records():
+                name, _, arrival_time, completion_time, waiting_time = record
+                yield name, arrival_time, completion_time, waiting_time
+            return
+
         for p in self._all_processes:
-            print(f'Waiting time for Process {p.process_name} : {p.waiting_time} ms')
+            yield (
+                p.process_name,
+                p.arrival_time,
+                p.completion_time,
+                p.waiting_time,
+            )
+
+    def _io_line(self) -> str:
+        version, line = self._rendered_io
+        if version != self._io.version:
+            line = f'I/O : {self._io}'
+            self._rendered_io = (self._io.version, line)
+        return line
+
+    def output_state(self):
+        self._trace.write(
+            f'Queues : {self._queue_renderer.render(self._current_process)}'
+        )
 
-    def run(self):
+        if self._current_process:
+            self._trace.write(f'CPU : {self._current_process}')
+        else:
+            self._trace.write('CPU : []')
+
+        if not self._io.is_empty:
+            self._trace.write(self._io_line())
+
+    def output_tick(
+        self, event_tick: int, ticks: int, print_collapsed_ticks: bool = False
+    ):
+        """
+        Output the state after the event tick, and the ticks collapsed after it
+        """
+        self.output_state()
+        self.output_demoted_processes()
+        self._trace.write('')
+
+        # Nothing happens during collapsed ticks, so only the time changes
+        if print_collapsed_ticks:
+            for tick in range(event_tick + 1, event_tick + ticks):
+                self._trace.write(f'At Time = {tick}')
+                self.output_state()
+                self._trace.write('')
+
+    def step(
+        self,
+        event_driven: bool = False,
+        print_collapsed_ticks: bool = False,
+        max_ticks: int | None = None,
+    ) -> None:
+        """
+        Run a single iteration of the simulation (see run)
+        If max_ticks is given, at most that many ticks are simulated
+        """
+        traces_ticks = self._trace.traces_ticks
+
+        event_tick = self._tick
+        if traces_ticks:
+            self._trace.write(f'At Time = {event_tick}')
+        self.push_arriving_processes()
+        self.reschedule_expired_processes()
+        boost_interval = self._boost_interval
+        if boost_interval and event_tick > 0 and event_tick % boost_interval == 0:
+            self.boost()
+        self.context_switch()
+
+        ticks = self.ticks_until_next_event() if event_driven else 1
+        if max_ticks is not None:
+            ticks = min(ticks, max_ticks)
+        if self._timeseries is not None:
+            self._timeseries.record(event_tick, ticks, self._timeseries_values())
+        self.on_tick(ticks)
+
+        if traces_ticks:
+            self.output_tick(event_tick, ticks, print_collapsed_ticks)
+
+    def run(
+        self,
+        event_driven: bool = False,
+        print_collapsed_ticks: bool = False,
+        checkpointer: RunObserver | None = None,
+    ):
         """
         Run the MLFQ simulation.
         Note that the context switch runs first *when the program is simulated*.
-        """
-        while not self.is_empty:
-            print(f'At Time = {self._tick}')
-            self.push_arriving_processes()
-            self.reschedule_expired_processes()
-            self.context_switch()
-            self.on_tick()
-
-            # Has to be done this way to remove the current process
-            queue_processes_list = [queue.processes for queue in self._priority_queues]
-            queues_waiting_processes = [
-                list(filter(lambda p: p != self._current_process, processes))
-                for processes in queue_processes_list
-            ]
-            print(f'Queues : { ";".join(map(str, queues_waiting_processes)) }')
 
-            if self._current_process:
-                print(f'CPU : {self._current_process}')
-            else:
-                print('CPU : []')
+        If event_driven is set, the simulation jumps straight to the next tick in
+        which something can change instead of stepping through every tick.
+        The schedule and final statistics are identical to the tick-by-tick run.
+        The ticks that were jumped over are only printed if print_collapsed_ticks
+        is also set, in which case the trace is identical as well.
 
-            if not self._io.is_empty:
-                print(f'I/O : {self._io}')
+        If a checkpointer is given, it is offered a checkpoint before each iteration.
+        """
+        while not self.is_empty:
+            if checkpointer is not None:
+                checkpointer.on_iteration(self)
 
-            self.output_demoted_processes()
+            self.step(event_driven, print_collapsed_ticks)
+        if checkpointer is not None:
+            checkpointer.close()
 
-            print()
         # output final statistics of simulation (turnaround and waiting time)
         self.final_stats()
-        return
+        self._trace.flush()
+
+
+class Core:
+    """
+    A CPU of a MultiCoreMultiLevelFeedbackQueue, with its own priority queues
+
+    With shared queues, its queues only hold the process it runs (or switches
+    to), which it took from the shared queues
+    """
+
+    index: int
+    priority_queues: Sequence[PriorityQueue]
+    queue_renderer: QueueRenderer
+    # Bit i is set if priority_queues[i] is not empty (see _highest_level)
+    occupancy: int = 0
+    num_processes: int = 0
+    context_switch_counter: int = 0
+    last_running_process: Process | None = None
+    current_process: Process | None = None
+
+    num_context_switches: int = 0
+    busy_ticks: int = 0
+    switching_ticks: int = 0
+    num_completed: int = 0
+    # Processes taken from other cores
+    num_migrated: int = 0
+
+    def __init__(self, index: int, priority_queues: Sequence[PriorityQueue]) -> None:
+        self.index = index
+        self.priority_queues = priority_queues
+        self.queue_renderer = QueueRenderer(priority_queues)
+
+    @property
+    def running_level(self) -> int:
+        """
+        Level of the queue the core runs from, or the number of queues if idle
+        """
+        if not self.occupancy:
+            return len(self.priority_queues)
+        return _highest_level(self.occupancy)
+
+    def push_process(self, process: Process) -> None:
+        self.priority_queues[process.queue_level].push_process(process)
+        self.occupancy |= 1 << process.queue_level
+        self.num_processes += 1
+
+    def _on_removed(self, queue_level: int) -> None:
+        self.num_processes -= 1
+        if self.priority_queues[queue_level].is_empty:
+            self.occupancy ^= 1 << queue_level
+
+    def release_expired_processes(self) -> Iterator[tuple[int, Process]]:
+        """
+        See MultiLevelFeedbackQueue._release_expired_processes
+        """
+        for queue_level in _occupied_levels(self.occupancy):
+            process = self.priority_queues[queue_level].release_current_on_expiry()
+            if process:
+                self._on_removed(queue_level)
+                yield queue_level, process
+
+    def steal_process(self, queue_level: int) -> Process | None:
+        """
+        Remove a waiting process from a queue, for another core to run
+        """
+        process = self.priority_queues[queue_level].steal_process(
+            keep_front=queue_level == self.running_level
+        )
+        if process is not None:
+            self._on_removed(queue_level)
+        return process
+
+    def take_process(self) -> Process | None:
+        """
+        Remove the process of a core running from shared queues, e.g. to give
+        it back to them
+        """
+        if not self.occupancy:
+            return
+
+        queue_level = self.running_level
+        process = self.priority_queues[queue_level].take_front()
+        self._on_removed(queue_level)
+        return process
+
+    def stats(self, total_ticks: int) -> dict:
+        return {
+            'core': self.index,
+            'busy_ticks': self.busy_ticks,
+            'switching_ticks': self.switching_ticks,
+            'idle_ticks': total_ticks - self.busy_ticks - self.switching_ticks,
+            'utilization': self.busy_ticks / total_ticks if total_ticks else 0.0,
+            'context_switches': self.num_context_switches,
+            'completed': self.num_completed,
+            'throughput': self.num_completed / total_ticks if total_ticks else 0.0,
+            'migrated': self.num_migrated,
+        }
+
+
+class MultiCoreMultiLevelFeedbackQueue(MultiLevelFeedbackQueue):
+    """
+    MLFQ running one process on each of several cores
+
+    Every core has its own context switches, while the IO is shared.
+
+    By default, every core also has its own priority queues. Arriving processes
+    go to the core with the fewest processes, and processes stay on their core
+    when demoted or back from IO. Cores only balance the load by work stealing:
+    an idle core takes a waiting process from the core with the most processes.
+
+    With shared_queues, all processes wait in one set of global queues instead.
+    Whenever a process waits in a higher queue than some core is running from,
+    that core takes the front of the highest non-empty queue: its head for RR
+    and FCFS, the shortest burst for SJF. Idle cores take it first, then those
+    running from the lowest queues, whose process goes back to the front of
+    its queue. A process that used up its RR quantum goes to the back of its
+    queue if another process waits there, as on a single core. Likewise, once
+    a process is demoted to SJF, the processes already chosen for their SJF
+    burst compete with the waiting ones again: a core running a longer burst
+    than the shortest waiting one swaps them.
+
+    With a single core, both are the same as MultiLevelFeedbackQueue.
+    """
+
+    _cores: list[Core]
+    _shared_queues: bool
+    # Bit i is set if a process that preempts the selected processes was
+    # pushed to shared queue i (see PriorityQueue.preempts_selected)
+    _preempting_levels: int = 0
+    # Core of each process that has arrived and not completed, or that ran it
+    # last with shared queues
+    _home_cores: dict[Process, Core]
+
+    def __init__(
+        self,
+        future_processes: Iterable[Process],
+        make_priority_queues: Callable[[], Sequence[PriorityQueue]],
+        num_cores: int = 1,
+        shared_queues: bool = False,
+        context_switch_time: int = 0,
+        presorted: bool = False,
+        trace: TraceSink | None = None,
+        completed_store: CompletedProcessStore | None = None,
+        boost_interval: int | None = None,
+        timeseries_budget: int | None = None,
+    ) -> None:
+        """
+        make_priority_queues is called once per core, for queues of its own
+        A priority boost returns every process to the top queue of its core
+        """
+        if num_cores < 1:
+            raise Exception('Error: There must be at least one core')
+
+        self._cores = [Core(i, make_priority_queues()) for i in range(num_cores)]
+        # A single core runs from its own queues either way
+        self._shared_queues = shared_queues and num_cores > 1
+        self._home_cores = {}
+        super().__init__(
+            future_processes,
+            make_priority_queues()
+            if self._shared_queues
+            else self._cores[0].priority_queues,
+            context_switch_time,
+            presorted,
+            trace,
+            completed_store=completed_store,
+            boost_interval=boost_interval,
+            timeseries_budget=timeseries_budget,
+        )
+
+    @property
+    def cores(self) -> list[Core]:
+        return self._cores
+
+    def _timeseries_values(self) -> list[int]:
+        num_processes = [0] * len(self._priority_queues)
+        if self._shared_queues:
+            for level, queue in enumerate(self._priority_queues):
+                num_processes[level] += queue.num_processes
+        busy = switching = 0
+        for core in self._cores:
+            for level, queue in enumerate(core.priority_queues):
+                num_processes[level] += queue.num_processes
+            if core.context_switch_counter > 0:
+                switching += 1
+            elif core.occupancy:
+                busy += 1
+        return [
+            *num_processes,
+            busy,
+            switching,
+            len(self._cores) - busy - switching,
+            self._io.num_processes,
+        ]
+
+    def on_tick(self, ticks: int = 1):
+        self._tick += ticks
+        self._io.on_tick(ticks)
+
+        for core in self._cores:
+            if core.context_switch_counter > 0:
+                core.context_switch_counter -= ticks
+                core.switching_ticks += ticks
+            elif core.occupancy:
+                core.priority_queues[_highest_level(core.occupancy)].on_tick(ticks)
+                core.busy_ticks += ticks
+
+    def ticks_until_next_event(self) -> int:
+        candidates: list[int] = []
+
+        next_arrival = self._peek_future_process()
+        if next_arrival is not None:
+            candidates.append(next_arrival.arrival_time - self._tick)
+
+        io_ticks = self._io.ticks_until_release()
+        if io_ticks is not None:
+            candidates.append(io_ticks)
+
+        # The simulation stops once empty, without waiting for the next boost
+        if self._boost_interval and not self.is_empty:
+            candidates.append(self._boost_interval - self._tick % self._boost_interval)
+
+        for core in self._cores:
+            if core.context_switch_counter > 0:
+                candidates.append(core.context_switch_counter)
+            elif core.occupancy:
+                queue = core.priority_queues[_highest_level(core.occupancy)]
+                queue_ticks = queue.ticks_until_expiry()
+                if queue_ticks is not None:
+                    candidates.append(queue_ticks)
+
+        return max(min(candidates, default=1), 1)
+
+    def get_state(self, process_ref: Callable[[Process], int]) -> SimulationState:
+        raise Exception('Error: Checkpoints only support a single core')
+
+    def set_state(
+        self, state: SimulationState, process_of: Callable[[int], Process]
+    ) -> None:
+        raise Exception('Error: Checkpoints only support a single core')
+
+    def _push_process(self, process: Process) -> None:
+        if self._shared_queues:
+            super()._push_process(process)
+            queue_level = process.queue_level
+            if self._priority_queues[queue_level].preempts_selected(process):
+                self._preempting_levels |= 1 << queue_level
+            return
+
+        core = self._home_cores.get(process)
+        if core is None:
+            # First come, lowest index first among the least loaded cores
+            core = min(self._cores, key=lambda core: core.num_processes)
+            self._home_cores[process] = core
+        if self._boost_epoch:
+            process.reconcile_boost(self._boost_epoch)
+        core.push_process(process)
+        self._num_queued += 1
+
+    def _release_expired_processes(self) -> Iterator[tuple[int, Process]]:
+        for core in self._cores:
+            for queue_level, process in core.release_expired_processes():
+                self._num_queued -= 1
+                yield queue_level, process
+
+    def _complete_process(self, process: Process) -> None:
+        super()._complete_process(process)
+        self._home_cores.pop(process).num_completed += 1
+
+    def _boost_queues(self) -> None:
+        if self._shared_queues:
+            # Processes running from the lower queues are boosted along with
+            # the processes waiting there, ahead of them
+            for core in reversed(self._cores):
+                if core.running_level > 0:
+                    self._give_back(core)
+            super()._boost_queues()
+            return
+
+        for core in self._cores:
+            core.occupancy = _boost_queues(
+                core.priority_queues,
+                core.occupancy,
+                self._boost_epoch,
+                self._metrics,
+                self._tick,
+            )
+
+    def balance_load(self) -> None:
+        """
+        Migrate waiting processes between cores, through the shared queues or
+        by work stealing (see MultiCoreMultiLevelFeedbackQueue)
+        """
+        if len(self._cores) == 1:
+            return
+
+        if self._shared_queues:
+            self._dispatch()
+            self._preempt()
+            # Processes that used up their RR quantum make way for the next
+            rotated = False
+            for core in self._cores:
+                queue_level = core.running_level
+                if (
+                    self._occupancy >> queue_level & 1
+                    and core.priority_queues[queue_level].is_quantum_used_up
+                ):
+                    process = core.take_process()
+                    if process is not None:
+                        self._priority_queues[queue_level].push_process(process)
+                        rotated = True
+            if rotated:
+                self._dispatch()
+        else:
+            for core in self._cores:
+                if core.num_processes == 0:
+                    # The last process of a core is left for the core itself
+                    victims = sorted(
+                        (victim for victim in self._cores if victim.num_processes > 1),
+                        key=lambda c: -c.num_processes,
+                    )
+                    self._steal(core, victims, -1)
+
+    def _dispatch(self) -> None:
+        """
+        Gives the front of the highest shared queue to a core, as long as one
+        is idle or runs from a lower queue, idle cores first, then those
+        running from the lowest queues
+        """
+        while self._occupancy:
+            queue_level = _highest_level(self._occupancy)
+            core = max(self._cores, key=lambda c: (c.running_level, -c.index))
+            if core.running_level <= queue_level:
+                return
+
+            self._give_back(core)
+            queue = self._priority_queues[queue_level]
+            process = queue.take_front()
+            if queue.is_empty:
+                self._occupancy ^= 1 << queue_level
+            if process is None:
+                continue
+
+            if self._boost_epoch:
+                process.reconcile_boost(self._boost_epoch)
+            core.push_process(process)
+            if self._home_cores.get(process, core) is not core:
+                core.num_migrated += 1
+            self._home_cores[process] = core
+
+    def _preempt(self) -> None:
+        """
+        Swaps the processes of the cores running from the shared queues that
+        preempting processes were pushed to for the front of those queues, as
+        long as it runs first
+        """
+        for queue_level in _occupied_levels(self._preempting_levels):
+            queue = self._priority_queues[queue_level]
+            for core in self._cores:
+                if core.running_level != queue_level or queue.is_empty:
+                    continue
+
+                process = core.take_process()
+                assert process is not None
+                front = queue.swap_front(process)
+                if front is None:
+                    core.push_process(process)
+                    continue
+
+                if self._boost_epoch:
+                    front.reconcile_boost(self._boost_epoch)
+                core.push_process(front)
+                if self._home_cores.get(front, core) is not core:
+                    core.num_migrated += 1
+                self._home_cores[front] = core
+        self._preempting_levels = 0
+
+    def _give_back(self, core: Core) -> None:
+        """
+        Returns the process of a core to the front of its shared queue
+        """
+        queue_level = core.running_level
+        process = core.take_process()
+        if process is not None:
+            self._priority_queues[queue_level].push_front(process)
+            self._occupancy |= 1 << queue_level
+
+    def _steal(self, core: Core, victims: Iterable[Core], levels: int) -> bool:
+        """
+        Migrate the first process that can be stolen from the victims, in order,
+        to core, out of the queues whose bits are set in levels
+        """
+        for victim in victims:
+            for queue_level in _occupied_levels(victim.occupancy & levels):
+                process = victim.steal_process(queue_level)
+                if process is not None:
+                    if self._boost_epoch:
+                        process.reconcile_boost(self._boost_epoch)
+                    core.push_process(process)
+                    core.num_migrated += 1
+                    self._home_cores[process] = core
+                    return True
+        return False
+
+    def context_switch(self):
+        """
+        Balances the load, then performs a context switch on every core that
+        is not already switching (see MultiLevelFeedbackQueue.context_switch)
+        """
+        self.balance_load()
+
+        for core in self._cores:
+            if core.context_switch_counter > 0:
+                continue
+
+            next_process: Process | None = None
+
+            if core.occupancy:
+                queue = core.priority_queues[_highest_level(core.occupancy)]
+                next_process = queue.select_new_process()
+                if next_process and self._boost_epoch:
+                    next_process.reconcile_boost(self._boost_epoch)
+
+            if next_process and core.last_running_process != next_process:
+                core.last_running_process = next_process
+                core.current_process = None
+                core.context_switch_counter = self._context_switch_time
+                core.num_context_switches += 1
+
+            if core.context_switch_counter <= 0:
+                core.current_process = next_process
+
+                if next_process and not next_process.has_started:
+                    next_process.start_process(self._tick)
+                    self._metrics.on_first_run(next_process)
+
+    def core_stats(self) -> list[dict]:
+        """
+        Ticks spent running, switching and idle, utilization, context switches,
+        completions and throughput (completions per tick) of each core
+        """
+        return [core.stats(self._tick) for core in self._cores]
+
+    def final_stats(self) -> None:
+        super().final_stats()
+
+        # Kept out of the output of a single core, which is the same as MultiLevelFeedbackQueue
+        if len(self._cores) == 1:
+            return
+
+        for stats in self.core_stats():
+            self._trace.write(
+                f'CPU {stats["core"]} : utilization = {stats["utilization"]:.1%}, '
+                f'throughput = {stats["throughput"]:.3f} processes/ms, '
+                f'context switches = {stats["context_switches"]}'
+            )
+
+    def output_state(self):
+        if self._shared_queues:
+            self._output_shared_state()
+            return
+
+        for core in self._cores:
+            label = f' {core.index}' if len(self._cores) > 1 else ''
+            queues_label = f' (CPU{label})' if label else ''
+            self._trace.write(
+                f'Queues{queues_label} : {core.queue_renderer.render(core.current_process)}'
+            )
+            self._trace.write(f'CPU{label} : {core.current_process or []}')
+
+        if not self._io.is_empty:
+            self._trace.write(self._io_line())
+
+    def _output_shared_state(self) -> None:
+        line = self._queue_renderer.render(None)
+        # Processes that cores are switching to still wait, at the front of
+        # their queue
+        switching = [
+            core
+            for core in self._cores
+            if core.occupancy and core.current_process is None
+        ]
+        if switching:
+            fronts: list[list[Process]] = [[] for _ in self._priority_queues]
+            for core in switching:
+                queue_level = core.running_level
+                fronts[queue_level] += core.priority_queues[queue_level].processes
+            line = ';'.join(
+                str([*front, *queue.processes])
+                for front, queue in zip(fronts, self._priority_queues)
+            )
+        self._trace.write(f'Queues : {line}')
+
+        for core in self._cores:
+            self._trace.write(f'CPU {core.index} : {core.current_process or []}')
+
+        if not self._io.is_empty:
+            self._trace.write(self._io_line())
 
 
 # ---
@@ -716,13 +3565,587 @@ def get_user_input() -> tuple[int, int, int, list[Process]]:
     time_allotment_q2: int = int(input())
     context_switch_time: int = int(input())
 
-    processes: list[Process] = []
+    table: ProcessTable = ProcessTable()
     for _ in range(num_processes):
         [process_name, *process_details] = input().split(';')
         [arrival_time, *burst_times] = map(int, process_details)
-        processes.append(Process(process_name, arrival_time, burst_times))
+        table.append(process_name, arrival_time, burst_times)
 
-    return time_allotment_q1, time_allotment_q2, context_switch_time, processes
+    return time_allotment_q1, time_allotment_q2, context_switch_time, table.processes
+
+
+class WorkloadStream(Iterator[Process]):
+    """
+    Processes of a workload file in order of (arrival time, process name),
+    loaded as they are pulled (see open_workload())
+
+    position tells where in the file the stream is, so that a simulation
+    resumed from a checkpoint can seek() a new stream of the same file there,
+    instead of reading the processes that were loaded before it again
+    """
+
+    _processes: Iterator[Process]
+    _num_yielded: int = 0
+
+    def __next__(self) -> Process:
+        process = next(self._processes)
+        self._num_yielded += 1
+        return process
+
+    @property
+    def position(self) -> tuple[int, ...] | None:
+        """
+        Position of the next process in the file, or None if the stream cannot
+        be resumed from there
+        """
+        raise NotImplementedError
+
+    def seek(self, position: Sequence[int]) -> None:
+        """
+        Continues from the position of a stream of the same file
+        """
+        raise NotImplementedError
+
+
+class TextWorkloadStream(WorkloadStream):
+    """
+    Processes of a workload file in the format of get_user_input() (see
+    read_process_stream())
+
+    Its position is the source of the next process (0 for the file, 1 for its
+    sorted copy), the byte offset of the group of lines arriving at the same
+    tick that it is in, the number of processes yielded before that group and
+    the number yielded in all, so that seeking skips the processes of the
+    group that were already yielded.
+
+    Input that is sorted externally is no longer in the order of the file, so
+    its position is unknown, unless it is given a sorted_path to write a
+    sorted copy of the input to, which it is then streamed from instead.
+    """
+
+    _path: str
+    _data_offset: int
+    _num_processes: int
+    _unsorted: bool
+    _sorted_path: str | None
+    _buffer_size: int
+    _sort_run_size: int
+    _table_size: int
+    # Source, byte offset and number of processes before the group being
+    # yielded, or None until the input is known to be sorted
+    _group: tuple[int, int, int] | None = None
+
+    def __init__(
+        self,
+        path: str,
+        data_offset: int,
+        num_processes: int,
+        unsorted: bool,
+        sorted_path: str | None,
+        buffer_size: int,
+        sort_run_size: int,
+        table_size: int,
+    ) -> None:
+        self._path = path
+        self._data_offset = data_offset
+        self._num_processes = num_processes
+        self._unsorted = unsorted
+        self._sorted_path = sorted_path
+        self._buffer_size = buffer_size
+        self._sort_run_size = sort_run_size
+        self._table_size = table_size
+        self._processes = self._read(0, data_offset, 0, 0)
+
+    @property
+    def position(self) -> tuple[int, ...] | None:
+        if self._group is None:
+            return None
+        return (*self._group, self._num_yielded)
+
+    def seek(self, position: Sequence[int]) -> None:
+        source, offset, first, num_yielded = position
+        self._group = None
+        self._num_yielded = num_yielded
+        self._processes = self._read(source, offset, first, num_yielded - first)
+
+    def _read(
+        self, source: int, offset: int, first: int, skip: int
+    ) -> Iterator[Process]:
+        # Processes are stored in small tables, which are freed along with the
+        # last of their processes
+        table_size = self._table_size
+        table: ProcessTable = ProcessTable()
+        for line in self._lines(source, offset, first, skip):
+            if len(table) == table_size:
+                table = ProcessTable()
+
+            [process_name, *process_details] = line.decode().split(';')
+            [arrival_time, *burst_times] = map(int, process_details)
+            yield table.add(process_name, arrival_time, burst_times)
+
+    def _lines(
+        self, source: int, offset: int, first: int, skip: int
+    ) -> Iterator[bytes]:
+        """
+        Lines in order of (arrival time, process name), from offset in the
+        file or in its sorted copy on, where first processes come before,
+        skipping the first skip of them
+        """
+        path = self._sorted_path if source else self._path
+        with open(path, 'rb', buffering=self._buffer_size) as workload_file:  # type: ignore[arg-type]
+            workload_file.seek(offset)
+            # The sorted copy only holds the lines from where it was sorted on
+            lines: Iterator[bytes] = (
+                iter(workload_file)
+                if source
+                else itertools.islice(workload_file, self._num_processes - first)
+            )
+
+            if not source and offset == self._data_offset and not skip:
+                unsorted = self._unsorted
+                if not unsorted:
+                    # Unsorted input is usually told apart within its first run
+                    head = list(itertools.islice(lines, self._sort_run_size))
+                    arrival_times = map(_line_arrival_time, head)
+                    unsorted = any(a > b for a, b in itertools.pairwise(arrival_times))
+                    lines = itertools.chain(head, lines)
+                if unsorted:
+                    yield from self._externally_sorted(map(_strip_line, lines), 0)
+                    return
+
+            yield from self._sorted_lines(lines, source, offset, first, skip)
+
+    def _sorted_lines(
+        self,
+        lines: Iterator[bytes],
+        source: int,
+        offset: int,
+        first: int,
+        skip: int,
+    ) -> Iterator[bytes]:
+        """
+        Orders lines that are sorted by arrival time by (arrival time, process
+        name), which only reorders the lines arriving at the same tick
+
+        Once a line arrives before the line preceding it, the lines from the
+        arrival time of that one on are sorted externally instead, which fails
+        if they arrive before the lines that were already yielded
+        """
+        group: list[bytes] = []
+        group_arrival_time: int = -1
+        group_start: tuple[int, int, int] = (source, offset, first)
+        number = first
+        last_key: tuple[int, bytes] | None = None
+        for line in lines:
+            arrival_time = _line_arrival_time(line)
+            if arrival_time == group_arrival_time:
+                group.append(line.rstrip(b'\r\n'))
+                offset += len(line)
+                number += 1
+                continue
+
+            if arrival_time < group_arrival_time:
+                rest = self._externally_sorted(
+                    itertools.chain(
+                        group, [_strip_line(line)], map(_strip_line, lines)
+                    ),
+                    group_start[2],
+                )
+                first_line = next(rest)
+                if last_key is not None and _line_sort_key(first_line) < last_key:
+                    process_name = first_line.split(b';', 1)[0].decode()
+                    raise Exception(
+                        f'Error: Process {process_name} arrives before processes that were already loaded, as the workload is not sorted by arrival time. Read it as unsorted (--unsorted) instead.'
+                    )
+                yield first_line
+                yield from rest
+                return
+
+            if group:
+                group.sort(key=_line_sort_key)
+                self._group = group_start
+                yield from group[skip:]
+                skip = 0
+                last_key = _line_sort_key(group[-1])
+            group = [line.rstrip(b'\r\n')]
+            group_arrival_time = arrival_time
+            group_start = (source, offset, number)
+            offset += len(line)
+            number += 1
+
+        group.sort(key=_line_sort_key)
+        self._group = group_start
+        yield from group[skip:]
+
+    def _externally_sorted(
+        self, lines: Iterator[bytes], num_yielded: int
+    ) -> Iterator[bytes]:
+        """
+        Sorts lines externally, after num_yielded processes were yielded, and
+        streams them from the sorted copy if there is one
+        """
+        self._group = None
+        sorted_lines = _external_sort(lines, self._sort_run_size)
+        if self._sorted_path is None:
+            return sorted_lines
+
+        # Written whole before it is read, so that a stream resumed from it
+        # never finds it partly written
+        temporary_path = f'{self._sorted_path}.tmp'
+        with open(temporary_path, 'wb', buffering=self._buffer_size) as sorted_file:
+            sorted_file.writelines(line + b'\n' for line in sorted_lines)
+        os.replace(temporary_path, self._sorted_path)
+        return self._lines(1, 0, num_yielded, 0)
+
+
+def read_process_stream(
+    path: str,
+    buffer_size: int = 1 << 20,
+    sort_run_size: int = 1 << 16,
+    table_size: int = 1 << 12,
+    unsorted: bool = False,
+    sorted_path: str | None = None,
+) -> tuple[int, int, int, TextWorkloadStream]:
+    """
+    Reads a workload file in the format of get_user_input() as a stream
+
+    Processes are yielded in order of (arrival time, process name), and are
+    only parsed once the simulation asks for them, i.e. as their arrival nears
+    Input that is not sorted by arrival time is sorted externally instead, in
+    runs of at most sort_run_size processes spilled to temporary files, and
+    written to sorted_path if given (see TextWorkloadStream)
+    Sorting is checked as the input is read, from its first sort_run_size
+    processes up front, then line by line. If unsorted is set, the input is
+    sorted externally without checking
+    """
+    with open(path, 'rb', buffering=buffer_size) as workload_file:
+        num_processes: int = int(workload_file.readline())
+        time_allotment_q1: int = int(workload_file.readline())
+        time_allotment_q2: int = int(workload_file.readline())
+        context_switch_time: int = int(workload_file.readline())
+        data_offset: int = workload_file.tell()
+
+    return (
+        time_allotment_q1,
+        time_allotment_q2,
+        context_switch_time,
+        TextWorkloadStream(
+            path,
+            data_offset,
+            num_processes,
+            unsorted,
+            sorted_path,
+            buffer_size,
+            sort_run_size,
+            table_size,
+        ),
+    )
+
+
+def _strip_line(line: bytes) -> bytes:
+    return line.rstrip(b'\r\n')
+
+
+def _line_arrival_time(line: bytes) -> int:
+    return int(line.split(b';', 2)[1])
+
+
+def _line_sort_key(line: bytes) -> tuple[int, bytes]:
+    # UTF-8 bytes compare in the same order as the decoded names
+    [process_name, arrival_time, *_] = line.split(b';', 2)
+    return int(arrival_time), process_name
+
+
+def _external_sort(lines: Iterator[bytes], run_size: int) -> Iterator[bytes]:
+    """
+    Sorts lines by (arrival time, process name), holding at most run_size
+    lines in memory at once
+    """
+    run = sorted(itertools.islice(lines, run_size), key=_line_sort_key)
+    if len(run) < run_size:
+        yield from run
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        run_files = []
+        try:
+            while run:
+                run_file = open(f'{directory}/{len(run_files)}', 'w+b')
+                run_files.append(run_file)
+                run_file.writelines(line + b'\n' for line in run)
+                run_file.seek(0)
+                run = sorted(itertools.islice(lines, run_size), key=_line_sort_key)
+
+            runs = [(line.rstrip(b'\n') for line in run_file) for run_file in run_files]
+            yield from heapq.merge(*runs, key=_line_sort_key)
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+
+# Columnar workload format (see write_columnar_workload), in native byte order:
+#   magic, then int64 num_processes, num_bursts, names_size, time_allotment_q1,
+#   time_allotment_q2 and context_switch_time
+#   int64 columns of the workload: arrival times, burst offsets, bursts and
+#   name offsets, with one more offset than there are processes
+#   int64 columns of the initial state of each process, in _STATE_COLUMNS order
+#   a byte column of the initial from_IO flags, then the UTF-8 names
+COLUMNAR_MAGIC: bytes = b'MLFQCOL2'
+_COLUMNAR_HEADER: struct.Struct = struct.Struct('<8s6q')
+# State columns of a ProcessTable, with the initial value of the columns that
+# are the same for every process
+_STATE_COLUMNS: dict[str, int | None] = {
+    '_burst_indices': 0,
+    '_current_bursts': None,
+    '_remaining_bursts': None,
+    '_queue_levels': 0,
+    '_times_in_queue': 0,
+    '_first_run_times': -1,
+    '_completion_times': -1,
+    '_boost_epochs': 0,
+}
+
+
+class _MappedNames(Sequence[str]):
+    """
+    Names of a columnar workload, decoded from the mapped file when accessed
+    """
+
+    _names: memoryview
+    _offsets: memoryview
+
+    def __init__(self, names: memoryview, offsets: memoryview) -> None:
+        self._names = names
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._names[start:end], 'utf-8')
+
+
+def write_columnar_workload(
+    path: str,
+    time_allotment_q1: int,
+    time_allotment_q2: int,
+    context_switch_time: int,
+    processes: Iterable[Process],
+    chunk_size: int = 1 << 16,
+) -> int:
+    """
+    Writes processes in the columnar format read by read_columnar_workload(),
+    and returns the number of processes written
+
+    Processes must be sorted by (arrival time, process name), as they are by
+    read_process_stream(). They are written chunk by chunk to a temporary file
+    per column, which are concatenated at the end, so at most chunk_size
+    processes are held in memory.
+    """
+    spilled_columns = (
+        '_arrival_times',
+        '_burst_offsets',
+        '_bursts',
+        'name_offsets',
+        '_current_bursts',
+        '_remaining_bursts',
+        'names',
+    )
+    num_processes = 0
+    num_bursts = 0
+    names_size = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        column_files = {
+            column: open(f'{directory}/{column}', 'w+b') for column in spilled_columns
+        }
+        try:
+            column_files['_burst_offsets'].write(array('q', [0]).tobytes())
+            column_files['name_offsets'].write(array('q', [0]).tobytes())
+
+            processes = iter(processes)
+            while chunk := list(itertools.islice(processes, chunk_size)):
+                columns: dict[str, array[int]] = {
+                    column: array('q') for column in spilled_columns[:-1]
+                }
+                names: list[bytes] = []
+                for process in chunk:
+                    burst_times = process.burst_times
+                    name = process.process_name.encode()
+                    num_bursts += len(burst_times)
+                    names_size += len(name)
+
+                    columns['_arrival_times'].append(process.arrival_time)
+                    columns['_bursts'].extend(burst_times)
+                    columns['_burst_offsets'].append(num_bursts)
+                    columns['name_offsets'].append(names_size)
+                    columns['_current_bursts'].append(
+                        burst_times[0] if burst_times else 0
+                    )
+                    columns['_remaining_bursts'].append(
+                        sum(1 for burst in burst_times if burst > 0)
+                    )
+                    names.append(name)
+
+                for column, values in columns.items():
+                    column_files[column].write(values.tobytes())
+                column_files['names'].write(b''.join(names))
+                num_processes += len(chunk)
+
+            with open(path, 'wb') as workload_file:
+                workload_file.write(
+                    _COLUMNAR_HEADER.pack(
+                        COLUMNAR_MAGIC,
+                        num_processes,
+                        num_bursts,
+                        names_size,
+                        time_allotment_q1,
+                        time_allotment_q2,
+                        context_switch_time,
+                    )
+                )
+
+                def copy_column(column: str) -> None:
+                    column_file = column_files[column]
+                    column_file.seek(0)
+                    shutil.copyfileobj(column_file, workload_file)
+
+                def fill_column(value: int, size: int, item_size: int = 8) -> None:
+                    item = value.to_bytes(item_size, sys.byteorder, signed=True)
+                    for start in range(0, size, chunk_size):
+                        workload_file.write(item * min(chunk_size, size - start))
+
+                # Workload columns, in the order they were spilled in
+                for column in spilled_columns[:4]:
+                    copy_column(column)
+                for column, value in _STATE_COLUMNS.items():
+                    if value is None:
+                        copy_column(column)
+                    else:
+                        fill_column(value, num_processes)
+                fill_column(1, num_processes, item_size=1)
+                copy_column('names')
+        finally:
+            for column_file in column_files.values():
+                column_file.close()
+
+    return num_processes
+
+
+def read_columnar_workload(path: str) -> tuple[int, int, int, ProcessTable]:
+    """
+    Maps a workload written by write_columnar_workload(), without reading or
+    parsing it, and returns its settings and a table of its processes
+
+    The table is backed by a copy-on-write mapping of the whole file, state
+    columns included, so only the pages of the processes the simulation
+    touches are ever read, and changes are never written back to the file.
+    Its processes are sorted by (arrival time, process name).
+    """
+    with open(path, 'rb') as workload_file:
+        mapping = mmap.mmap(workload_file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    buffer = memoryview(mapping)
+    if len(buffer) < _COLUMNAR_HEADER.size:
+        raise Exception(f'Error: {path} is not a columnar workload.')
+    (
+        magic,
+        num_processes,
+        num_bursts,
+        names_size,
+        time_allotment_q1,
+        time_allotment_q2,
+        context_switch_time,
+    ) = _COLUMNAR_HEADER.unpack_from(buffer)
+    if magic != COLUMNAR_MAGIC:
+        if magic[:7] == COLUMNAR_MAGIC[:7]:
+            raise Exception(
+                f'Error: {path} is in an older columnar format, convert it again.'
+            )
+        raise Exception(f'Error: {path} is not a columnar workload.')
+
+    offset = _COLUMNAR_HEADER.size
+
+    def column(size: int, item_size: int = 8) -> memoryview:
+        nonlocal offset
+        view = buffer[offset : offset + size * item_size]
+        offset += size * item_size
+        if len(view) != size * item_size:
+            raise Exception(f'Error: {path} is truncated.')
+        return view.cast('q') if item_size == 8 else view
+
+    table = ProcessTable()
+    table._arrival_times = column(num_processes)
+    table._burst_offsets = column(num_processes + 1)
+    table._bursts = column(num_bursts)
+    name_offsets = column(num_processes + 1)
+    for state_column in _STATE_COLUMNS:
+        setattr(table, state_column, column(num_processes))
+    table._from_IO = column(num_processes, item_size=1)
+    table._process_names = _MappedNames(column(names_size, item_size=1), name_offsets)
+
+    return time_allotment_q1, time_allotment_q2, context_switch_time, table
+
+
+def is_columnar_workload(path: str) -> bool:
+    """
+    Whether a file is a columnar workload, in any version of the format
+    """
+    with open(path, 'rb') as workload_file:
+        # The last byte of the magic is the version
+        return workload_file.read(len(COLUMNAR_MAGIC) - 1) == COLUMNAR_MAGIC[:-1]
+
+
+class ColumnarWorkloadStream(WorkloadStream):
+    """
+    Processes of a table mapped by read_columnar_workload(), whose position is
+    the index of the next process in the table
+    """
+
+    _table: ProcessTable
+
+    def __init__(self, table: ProcessTable) -> None:
+        self._table = table
+        self._processes = iter(table)
+
+    @property
+    def position(self) -> tuple[int, ...] | None:
+        return (self._num_yielded,)
+
+    def seek(self, position: Sequence[int]) -> None:
+        (index,) = position
+        table = self._table
+        self._num_yielded = index
+        self._processes = (
+            Process._from_table(table, i) for i in range(index, len(table))
+        )
+
+
+def open_workload(
+    path: str, unsorted: bool = False, sorted_path: str | None = None
+) -> tuple[int, int, int, WorkloadStream]:
+    """
+    Processes of a workload file in either the text or the columnar format,
+    in order of (arrival time, process name), as a stream that a resumed
+    simulation can seek back to where the checkpoint was taken
+    unsorted and sorted_path are passed on to read_process_stream() for text
+    workloads
+    """
+    if is_columnar_workload(path):
+        time_allotment_q1, time_allotment_q2, context_switch_time, table = (
+            read_columnar_workload(path)
+        )
+        return (
+            time_allotment_q1,
+            time_allotment_q2,
+            context_switch_time,
+            ColumnarWorkloadStream(table),
+        )
+
+    return read_process_stream(path, unsorted=unsorted, sorted_path=sorted_path)
 
 
 def get_fake_input() -> tuple[int, int, int, list[Process]]:
@@ -739,23 +4162,385 @@ def get_fake_input() -> tuple[int, int, int, list[Process]]:
     return time_allotment_q1, time_allotment_q2, context_switch_time, processes
 
 
-def main() -> None:
-    time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
-        get_user_input()
+# Smallest value of each integer option, when it is given
+OPTION_MINIMUMS: dict[str, int] = {
+    'cores': 1,
+    'digest_every': 1,
+    'boost_every': 1,
+    'timeseries_budget': 1,
+    'cache_size': 1,
+    'index_every': 1,
+}
+# Options that each option does not support, when both are given
+UNSUPPORTED_OPTIONS: dict[str, tuple[str, ...]] = {
+    'checkpoint': ('retire_completed',),
+    'digest': ('trace_window', 'resume'),
+    'cache': ('checkpoint', 'profile', 'digest', 'trace_window', 'timeseries'),
+    'index': ('checkpoint', 'retire_completed', 'digest', 'cache'),
+}
+# Options that only support a single core
+SINGLE_CORE_OPTIONS: tuple[str, ...] = ('checkpoint', 'profile', 'index')
+
+
+def check_options(args: argparse.Namespace) -> str | None:
+    """
+    First error in the options of parse_args(), following OPTION_MINIMUMS,
+    UNSUPPORTED_OPTIONS and SINGLE_CORE_OPTIONS, or None if they are valid
+    """
+
+    def flag(option: str) -> str:
+        return '--' + option.replace('_', '-')
+
+    for option, minimum in OPTION_MINIMUMS.items():
+        value = getattr(args, option)
+        if value is not None and value < minimum:
+            return f'{flag(option)} must be at least {minimum}'
+
+    for option, unsupported in UNSUPPORTED_OPTIONS.items():
+        if getattr(args, option):
+            for other in unsupported:
+                if getattr(args, other):
+                    return f'{flag(option)} does not support {flag(other)}'
+
+    if args.cores > 1:
+        for option in SINGLE_CORE_OPTIONS:
+            if getattr(args, option):
+                return f'{flag(option)} only supports a single core'
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Simulates an MLFQ scheduler on a workload read from stdin.'
+    )
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        help='jump between events instead of stepping through every tick',
+    )
+    parser.add_argument(
+        '--print-collapsed-ticks',
+        action='store_true',
+        help='print the ticks skipped by --event-driven (full trace)',
+    )
+    parser.add_argument(
+        '--verbosity',
+        choices=['quiet', 'summary', 'full'],
+        default='full',
+        help='full trace, final stats only (summary), or no output (quiet)',
+    )
+    parser.add_argument(
+        '--output',
+        help='file to write the output to instead of stdout',
+    )
+    parser.add_argument(
+        '--metrics',
+        help='file to write a JSON summary of latency metrics to',
+    )
+    parser.add_argument(
+        '--timeseries',
+        help='file to write a time series of queue lengths, CPU states and IO occupancy to, as CSV if it ends in .csv and in binary otherwise',
+    )
+    parser.add_argument(
+        '--timeseries-budget',
+        type=int,
+        default=1 << 20,
+        help='bytes the time series is kept in, beyond which its buckets of ticks are merged in pairs',
+    )
+    parser.add_argument(
+        '--cache',
+        help='directory of cached results, which a run with the same workload and options is read back from instead of simulated',
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=1 << 30,
+        help='bytes of cached results kept, beyond which the least recently used are evicted',
+    )
+    parser.add_argument(
+        '--profile',
+        help='file to write per-phase timers and per-queue counters to, as JSON',
+    )
+    parser.add_argument(
+        '--checkpoint',
+        help='file to checkpoint the simulation to, on SIGUSR1 and every --checkpoint-every ticks',
+    )
+    parser.add_argument(
+        '--checkpoint-every',
+        type=int,
+        help='ticks between checkpoints',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='resume from the --checkpoint file, if it exists (the --output file is rewritten from the checkpoint on)',
+    )
+    parser.add_argument(
+        '--input',
+        help='workload file to stream instead of reading stdin, in the text or columnar format',
+    )
+    parser.add_argument(
+        '--unsorted',
+        action='store_true',
+        help='sort the text --input file externally up front instead of checking that it is sorted by arrival time as it is streamed',
+    )
+    parser.add_argument(
+        '--cores',
+        type=int,
+        default=1,
+        help='number of cores, each with its own priority queues',
+    )
+    parser.add_argument(
+        '--shared-queues',
+        action='store_true',
+        help='run the queues of all cores as global queues, instead of work stealing',
+    )
+    parser.add_argument(
+        '--boost-every',
+        type=int,
+        help='ticks between priority boosts, which return every process to Q1 (off by default)',
+    )
+    parser.add_argument(
+        '--retire-completed',
+        action='store_true',
+        help='only keep records of completed processes, spilled to disk in sorted runs, so that memory is bounded by the live processes with --input',
+    )
+    parser.add_argument(
+        '--digest',
+        help='file to write a rolling digest of the full trace to, instead of the trace (see src/digest.py)',
+    )
+    parser.add_argument(
+        '--digest-every',
+        type=int,
+        default=1000,
+        help='ticks between digest checkpoints',
     )
+    parser.add_argument(
+        '--index',
+        help='file to write a seekable index of the run to, with a snapshot of the state every --index-every ticks (see src/trace_index.py)',
+    )
+    parser.add_argument(
+        '--index-every',
+        type=int,
+        default=10000,
+        help='ticks between index snapshots',
+    )
+    parser.add_argument(
+        '--trace-window',
+        type=parse_window,
+        help='only output the ticks in START:END (END excluded), and the final stats if END is left out',
+    )
+    args = parser.parse_args(argv)
 
-    priority_queues: list[PriorityQueue] = [
-        RRPriorityQueue(time_allotment_q1),
-        FCFSPriorityQueue(time_allotment_q2),
-        SJFPriorityQueue(None),
-    ]
+    error = check_options(args)
+    if error is not None:
+        parser.error(error)
+    return args
+
+
+def parse_window(window: str) -> tuple[int, int | None]:
+    """
+    Parses a START:END window of ticks, where END may be left out
+    """
+    start, end = window.split(':')
+    return int(start), int(end) if end else None
+
+
+def make_trace_sink(verbosity: str, stream: TextIO | None = None) -> TraceSink:
+    if verbosity == 'quiet':
+        return NullTraceSink()
+    if verbosity == 'summary':
+        return SummaryTraceSink(stream)
+    return TextTraceSink(stream)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+
+    # The tools import this module, so they are only imported once it is loaded
+    from .cache import ResultCache, ResultRecorder, result_key, write_cached_result
+    from .checkpoint import Checkpoint, CheckpointCodec, Checkpointer
+    from .digest import DigestTraceSink, WindowTraceSink
+    from .trace_index import TraceIndexer
+
+    # Input sorted externally is copied sorted next to the checkpoint or the
+    # index, so that resuming from them seeks into the copy
+    sorted_path: str | None = None
+    if args.checkpoint or args.index:
+        sorted_path = f'{args.checkpoint or args.index}.sorted'
+
+    processes: Iterable[Process]
+    if args.input:
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            open_workload(args.input, args.unsorted, sorted_path)
+        )
+    else:
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            get_user_input()
+        )
 
-    mlfq: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
-        processes, priority_queues, context_switch_time
+    def make_priority_queues() -> list[PriorityQueue]:
+        return [
+            RRPriorityQueue(time_allotment_q1),
+            FCFSPriorityQueue(time_allotment_q2),
+            SJFPriorityQueue(None),
+        ]
+
+    cache: ResultCache | None = None
+    cache_key: str = ''
+    # The trace also depends on these, while the results do not
+    trace_options: dict | None = None
+    if args.verbosity == 'full':
+        trace_options = {
+            'event_driven': args.event_driven,
+            'print_collapsed_ticks': args.event_driven and args.print_collapsed_ticks,
+        }
+    if args.cache:
+        cache = ResultCache(args.cache, args.cache_size)
+        workload: Iterable[Process] = (
+            open_workload(args.input, args.unsorted)[3]
+            if args.input
+            else sorted(processes, key=lambda p: (p.arrival_time, p.process_name))
+        )
+        cache_key = result_key(
+            make_priority_queues(),
+            context_switch_time,
+            workload,
+            {
+                'cores': args.cores,
+                'shared_queues': args.shared_queues,
+                'boost_interval': args.boost_every,
+            },
+        )
+        result = cache.get(cache_key, trace_options)
+        if result is not None:
+            write_cached_result(result, args)
+            return
+
+    profiler: Profiler | None = Profiler() if args.profile else None
+
+    codec: CheckpointCodec = CheckpointCodec()
+    checkpoint: Checkpoint | None = None
+    if args.resume and args.checkpoint and os.path.exists(args.checkpoint):
+        checkpoint = Checkpoint.read(args.checkpoint)
+
+    output: TextIO | None = None
+    if args.output and checkpoint is not None and checkpoint.trace_position is not None:
+        # Output after the checkpoint is written again
+        output = open(args.output, 'r+')
+        output.seek(checkpoint.trace_position)
+        output.truncate()
+    elif args.output:
+        output = open(args.output, 'w')
+
+    checkpointer: RunObserver | None = None
+    if args.checkpoint:
+        checkpointer = Checkpointer(
+            args.checkpoint,
+            args.checkpoint_every,
+            getattr(signal, 'SIGUSR1', None),
+            codec,
+        )
+    elif args.index:
+        checkpointer = TraceIndexer(
+            args.index,
+            args.index_every,
+            {
+                'time_allotment_q1': time_allotment_q1,
+                'time_allotment_q2': time_allotment_q2,
+                'context_switch_time': context_switch_time,
+                'boost_interval': args.boost_every,
+                'input': args.input and os.path.abspath(args.input),
+                'unsorted': args.unsorted,
+                'sorted_path': sorted_path and os.path.abspath(sorted_path),
+                'output': args.output and os.path.abspath(args.output),
+            },
+        )
+
+    completed_store: CompletedProcessStore | None = (
+        CompletedProcessStore() if args.retire_completed else None
     )
 
-    mlfq.run()
+    trace: TraceSink
+    digest: DigestTraceSink | None = None
+    if args.digest:
+        trace = digest = DigestTraceSink(open(args.digest, 'w'), args.digest_every)
+    else:
+        trace = make_trace_sink(args.verbosity, output)
+        if args.trace_window:
+            trace = WindowTraceSink(trace, *args.trace_window)
+    recorder: ResultRecorder | None = None
+    if cache is not None:
+        trace = recorder = ResultRecorder(
+            trace, trace_options is not None, args.cache_size
+        )
+
+    try:
+        mlfq: MultiLevelFeedbackQueue
+        if args.cores > 1:
+            mlfq = MultiCoreMultiLevelFeedbackQueue(
+                processes,
+                make_priority_queues,
+                args.cores,
+                args.shared_queues,
+                context_switch_time,
+                presorted=args.input is not None,
+                trace=trace,
+                completed_store=completed_store,
+                boost_interval=args.boost_every,
+                timeseries_budget=args.timeseries_budget if args.timeseries else None,
+            )
+        else:
+            mlfq = MultiLevelFeedbackQueue(
+                processes,
+                make_priority_queues(),
+                context_switch_time,
+                # Streamed processes are already sorted
+                presorted=args.input is not None,
+                trace=trace,
+                profiler=profiler,
+                completed_store=completed_store,
+                boost_interval=args.boost_every,
+                timeseries_budget=args.timeseries_budget if args.timeseries else None,
+            )
+        if checkpoint is not None:
+            codec.restore(mlfq, checkpoint)
+
+        mlfq.run(args.event_driven, args.print_collapsed_ticks, checkpointer)
+        if digest is not None:
+            digest.finish()
+
+        if args.metrics or recorder is not None:
+            summary = mlfq.metrics.summary()
+            if isinstance(mlfq, MultiCoreMultiLevelFeedbackQueue):
+                summary['cores'] = mlfq.core_stats()
+        if args.metrics:
+            with open(args.metrics, 'w') as metrics_file:
+                json.dump(summary, metrics_file, indent=2)
+                metrics_file.write('\n')
+        if cache is not None and recorder is not None and recorder.stats is not None:
+            cache.put(cache_key, recorder.stats, summary, trace_options, recorder.trace)
+
+        if mlfq.timeseries is not None:
+            mlfq.timeseries.write(args.timeseries)
+
+        if profiler is not None:
+            with open(args.profile, 'w') as profile_file:
+                json.dump(profiler.summary(), profile_file, indent=2)
+                profile_file.write('\n')
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+        if output is not None:
+            output.close()
+        if digest is not None:
+            digest.close()
+        if completed_store is not None:
+            completed_store.close()
 
 
 if __name__ == '__main__':
-    main()
+    # The tools main() imports import this module by its package name, so run
+    # that copy rather than the one loaded as __main__
+    from .mlfq import main as package_main
+
+    package_main(sys.argv[1:])
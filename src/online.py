@@ -0,0 +1,490 @@
+"""
+Online MLFQ dispatcher, fed by process submissions over a local asyncio stream
+
+Processes are submitted while the simulation runs, one per line in the process
+format of mlfq.main(), i.e. `name;arrival;bursts...`, on stdin or over a Unix
+socket. The trace is published as it is produced, to stdout (or --output) and
+to every client connected to the socket.
+
+The simulation follows either
+    a virtual clock     it runs as fast as it can, but never past the latest
+                        arrival time submitted, so submissions are expected
+                        in order of arrival
+    a wall clock        every tick lasts --tick-ms milliseconds, and processes
+                        arrive once they are submitted, or at their arrival
+                        time if it is later
+Either way, a process submitted late arrives on the current tick.
+
+Submissions wait for admission in a bounded queue: once --max-pending of them
+are waiting, reading stops, which pushes back on the clients through the
+stream. The simulation hands control back to the readers at least every
+--max-latency-ms milliseconds, which bounds how long submissions wait.
+Completed processes are retired to records on disk (see
+mlfq.CompletedProcessStore), so memory does not grow with the number of
+processes served, only with the number of live ones.
+
+Run from the root directory:
+    python -m src.online --q1 8 --q2 8 --context-switch 1 < submissions.txt
+    python -m src.online --q1 8 --q2 8 --socket /tmp/mlfq.sock --clock wall
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from collections.abc import Awaitable, Callable, Sequence
+from time import monotonic, perf_counter
+from typing import TextIO
+
+from .mlfq import (
+    CompletedProcessStore,
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    PriorityQueue,
+    ProcessTable,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+    TraceSink,
+    make_trace_sink,
+)
+
+# (process name, arrival time, burst times)
+Submission = tuple[str, int, list[int]]
+
+READ_SIZE: int = 1 << 16
+
+
+def parse_submission(line: bytes) -> Submission:
+    try:
+        [process_name, *process_details] = line.decode().split(';')
+        [arrival_time, *burst_times] = map(int, process_details)
+    except ValueError:
+        raise ValueError(f'Error: Invalid submission {line!r}') from None
+
+    if not process_name or not burst_times:
+        raise ValueError(f'Error: Invalid submission {line!r}')
+    return process_name, arrival_time, burst_times
+
+
+class PublishingTraceSink(TraceSink):
+    """
+    Sink writing to another sink, which also sends every line to the stream
+    writers subscribed to it (e.g. socket clients) whenever it is published
+    """
+
+    traces_ticks: bool
+
+    _sink: TraceSink
+    _subscribers: set[asyncio.StreamWriter]
+    # Lines not sent to the subscribers yet
+    _pending: list[str]
+
+    def __init__(self, sink: TraceSink) -> None:
+        self._sink = sink
+        self._subscribers = set()
+        self._pending = []
+        self.traces_ticks = sink.traces_ticks
+
+    def subscribe(self, writer: asyncio.StreamWriter) -> None:
+        self._subscribers.add(writer)
+
+    def write(self, line: str) -> None:
+        self._sink.write(line)
+        if self._subscribers:
+            self._pending.append(line)
+
+    def flush(self) -> None:
+        self._sink.flush()
+
+    def checkpoint(self) -> int | None:
+        return self._sink.checkpoint()
+
+    async def publish(self) -> None:
+        """
+        Flush the sink and send the pending lines to the subscribers, waiting
+        for slow subscribers to catch up
+        """
+        self._sink.flush()
+        if not self._pending:
+            return
+
+        data = ('\n'.join(self._pending) + '\n').encode()
+        self._pending = []
+        for writer in list(self._subscribers):
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                # Clients that went away stop receiving the trace
+                self._subscribers.discard(writer)
+
+    async def close(self) -> None:
+        """
+        Publish the pending lines, then close the subscribers
+        """
+        await self.publish()
+        for writer in self._subscribers:
+            writer.close()
+        self._subscribers.clear()
+
+
+class OnlineDispatcher:
+    """
+    Runs a MultiLevelFeedbackQueue on processes submitted while it runs
+    (see the module docstring)
+    """
+
+    _mlfq: MultiLevelFeedbackQueue
+    _trace: PublishingTraceSink
+    # Batches of submissions waiting for admission, and None once admission closes
+    _submissions: asyncio.Queue[list[Submission] | None]
+    _batch_size: int
+    # Seconds per tick of the wall clock, or None for the virtual clock
+    _tick_duration: float | None
+    _start_time: float = 0.0
+    _max_latency: float
+    _event_driven: bool
+    _print_collapsed_ticks: bool
+    # Latest arrival time admitted, which the virtual clock cannot go past
+    _latest_arrival_time: int = 0
+    _is_closed: bool = False
+    # Admitted processes are stored in small tables, like read_process_stream()
+    _table: ProcessTable
+    _table_size: int
+    _num_admitted: int = 0
+    _completed_store: CompletedProcessStore
+
+    def __init__(
+        self,
+        priority_queues: Sequence[PriorityQueue],
+        context_switch_time: int = 0,
+        trace: PublishingTraceSink | None = None,
+        tick_duration: float | None = None,
+        max_pending: int = 1 << 16,
+        batch_size: int = 1 << 10,
+        max_latency: float = 0.001,
+        event_driven: bool = False,
+        print_collapsed_ticks: bool = False,
+        table_size: int = 1 << 12,
+    ) -> None:
+        """
+        At most max_pending submissions wait for admission, in batches of at
+        most batch_size submissions
+        The clock is a wall clock if tick_duration (in seconds) is given, and a
+        virtual clock otherwise
+        """
+        self._trace = (
+            trace if trace is not None else PublishingTraceSink(make_trace_sink('full'))
+        )
+        self._completed_store = CompletedProcessStore()
+        self._mlfq = MultiLevelFeedbackQueue(
+            [],
+            priority_queues,
+            context_switch_time,
+            presorted=True,
+            trace=self._trace,
+            completed_store=self._completed_store,
+        )
+        self._submissions = asyncio.Queue(max(max_pending // batch_size, 1))
+        self._batch_size = batch_size
+        self._tick_duration = tick_duration
+        self._max_latency = max_latency
+        self._event_driven = event_driven
+        self._print_collapsed_ticks = print_collapsed_ticks
+        self._table = ProcessTable()
+        self._table_size = table_size
+
+    @property
+    def mlfq(self) -> MultiLevelFeedbackQueue:
+        return self._mlfq
+
+    @property
+    def trace(self) -> PublishingTraceSink:
+        return self._trace
+
+    @property
+    def num_admitted(self) -> int:
+        return self._num_admitted
+
+    @property
+    def completed_store(self) -> CompletedProcessStore:
+        return self._completed_store
+
+    async def read_submissions(self, read: Callable[[int], Awaitable[bytes]]) -> None:
+        """
+        Read submissions with read (e.g. StreamReader.read) until it returns
+        no data, waiting whenever too many submissions are pending
+        Invalid submissions are reported on stderr and skipped
+        """
+        remainder = b''
+        while chunk := await read(READ_SIZE):
+            lines = (remainder + chunk).split(b'\n')
+            remainder = lines.pop()
+            await self._put_lines(lines)
+        await self._put_lines([remainder])
+
+    async def _put_lines(self, lines: list[bytes]) -> None:
+        batch: list[Submission] = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                batch.append(parse_submission(line))
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                continue
+
+            if len(batch) == self._batch_size:
+                await self._submissions.put(batch)
+                batch = []
+        if batch:
+            await self._submissions.put(batch)
+
+    async def close(self) -> None:
+        """
+        Close admission once the submissions read so far are admitted, after
+        which the simulation finishes the admitted processes
+        """
+        await self._submissions.put(None)
+
+    def _wall_tick(self) -> int:
+        assert self._tick_duration is not None
+        return int((monotonic() - self._start_time) / self._tick_duration)
+
+    def _admit(self, batch: list[Submission] | None) -> None:
+        if batch is None:
+            self._is_closed = True
+            return
+
+        first_tick = self._mlfq.tick
+        if self._tick_duration is not None:
+            first_tick = max(first_tick, self._wall_tick())
+
+        processes = []
+        for process_name, arrival_time, burst_times in batch:
+            if len(self._table) == self._table_size:
+                self._table = ProcessTable()
+            arrival_time = max(arrival_time, first_tick)
+            processes.append(self._table.add(process_name, arrival_time, burst_times))
+            self._latest_arrival_time = max(self._latest_arrival_time, arrival_time)
+
+        self._mlfq.add_future_processes(processes)
+        self._num_admitted += len(processes)
+
+    def _admit_pending(self) -> None:
+        while not self._submissions.empty():
+            self._admit(self._submissions.get_nowait())
+
+    def _tick_limit(self) -> int | None:
+        """
+        First tick that cannot be simulated yet, or None if there is none
+        """
+        if self._tick_duration is not None:
+            return self._wall_tick() + 1
+        if self._is_closed:
+            return
+        # More processes may still arrive on the latest arrival time
+        return self._latest_arrival_time
+
+    async def _wait(self, timeout: float | None) -> None:
+        """
+        Wait for the next batch of submissions, for at most timeout seconds
+        """
+        try:
+            batch = await asyncio.wait_for(self._submissions.get(), timeout)
+        except TimeoutError:
+            return
+        self._admit(batch)
+
+    async def run(self) -> None:
+        """
+        Run the simulation until admission is closed and every admitted process
+        has completed, then output the final statistics
+        """
+        mlfq = self._mlfq
+        self._start_time = monotonic()
+
+        while True:
+            self._admit_pending()
+            is_empty = mlfq.is_empty
+            if is_empty and self._is_closed:
+                break
+
+            tick_limit = self._tick_limit()
+            if is_empty or (tick_limit is not None and mlfq.tick >= tick_limit):
+                await self._trace.publish()
+
+                # Waits for submissions, or for the wall clock to reach the next tick
+                timeout = None
+                if not is_empty and self._tick_duration is not None:
+                    next_tick_time = self._start_time + mlfq.tick * self._tick_duration
+                    timeout = max(next_tick_time - monotonic(), 0)
+                await self._wait(timeout)
+                continue
+
+            # Submissions are only read while the simulation waits or yields,
+            # so there is nothing to admit until the end of the slice
+            slice_end = perf_counter() + self._max_latency
+            while True:
+                mlfq.step(
+                    self._event_driven,
+                    self._print_collapsed_ticks,
+                    None if tick_limit is None else tick_limit - mlfq.tick,
+                )
+                if (
+                    mlfq.is_empty
+                    or (tick_limit is not None and mlfq.tick >= tick_limit)
+                    or perf_counter() >= slice_end
+                ):
+                    break
+
+            await self._trace.publish()
+            # Lets the readers run even if there is nothing to publish
+            await asyncio.sleep(0)
+
+        mlfq.final_stats()
+        self._completed_store.close()
+        await self._trace.close()
+
+
+async def _read_stdin(dispatcher: OnlineDispatcher) -> None:
+    loop = asyncio.get_running_loop()
+    stdin = sys.stdin.buffer
+
+    # Read in a thread, which unlike a pipe transport also works for files
+    def read(size: int) -> Awaitable[bytes]:
+        return loop.run_in_executor(None, stdin.read1, size)
+
+    await dispatcher.read_submissions(read)
+    await dispatcher.close()
+
+
+async def _serve(dispatcher: OnlineDispatcher, socket_path: str) -> None:
+    """
+    Admit the submissions of every client of a Unix socket, until SIGINT or SIGTERM
+    """
+
+    async def handle_client(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        dispatcher.trace.subscribe(writer)
+        await dispatcher.read_submissions(reader.read)
+
+    loop = asyncio.get_running_loop()
+    server = await asyncio.start_unix_server(handle_client, socket_path)
+    closing: list[asyncio.Task] = []
+
+    def close() -> None:
+        if not closing:
+            server.close()
+            closing.append(asyncio.create_task(dispatcher.close()))
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, close)
+    try:
+        await dispatcher.run()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+async def run_online(args: argparse.Namespace, output: TextIO | None = None) -> None:
+    dispatcher = OnlineDispatcher(
+        [
+            RRPriorityQueue(args.q1, args.quantum),
+            FCFSPriorityQueue(args.q2),
+            SJFPriorityQueue(None),
+        ],
+        args.context_switch,
+        PublishingTraceSink(make_trace_sink(args.verbosity, output)),
+        tick_duration=args.tick_ms / 1000 if args.clock == 'wall' else None,
+        max_pending=args.max_pending,
+        max_latency=args.max_latency_ms / 1000,
+        event_driven=args.event_driven,
+        print_collapsed_ticks=args.print_collapsed_ticks,
+    )
+
+    if args.socket:
+        await _serve(dispatcher, args.socket)
+    else:
+        reader = asyncio.create_task(_read_stdin(dispatcher))
+        await dispatcher.run()
+        await reader
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Runs an MLFQ scheduler on processes submitted while it runs.'
+    )
+    parser.add_argument('--q1', type=int, required=True, help='Q1 time allotment')
+    parser.add_argument('--q2', type=int, required=True, help='Q2 time allotment')
+    parser.add_argument('--quantum', type=int, default=4, help='RR time quantum')
+    parser.add_argument(
+        '--context-switch', type=int, default=0, help='context switch time'
+    )
+    parser.add_argument(
+        '--socket',
+        help='Unix socket to accept submissions on, instead of reading stdin',
+    )
+    parser.add_argument(
+        '--clock',
+        choices=['virtual', 'wall'],
+        default='virtual',
+        help='run as fast as submissions allow (virtual), or in real time (wall)',
+    )
+    parser.add_argument(
+        '--tick-ms', type=float, default=1.0, help='duration of a wall clock tick'
+    )
+    parser.add_argument(
+        '--max-pending',
+        type=int,
+        default=1 << 16,
+        help='submissions waiting for admission before reading stops',
+    )
+    parser.add_argument(
+        '--max-latency-ms',
+        type=float,
+        default=1.0,
+        help='longest the simulation runs without admitting submissions',
+    )
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        help='jump between events instead of stepping through every tick',
+    )
+    parser.add_argument(
+        '--print-collapsed-ticks',
+        action='store_true',
+        help='print the ticks skipped by --event-driven (full trace)',
+    )
+    parser.add_argument(
+        '--verbosity',
+        choices=['quiet', 'summary', 'full'],
+        default='full',
+        help='full trace, final stats only (summary), or no output (quiet)',
+    )
+    parser.add_argument(
+        '--output',
+        help='file to write the output to instead of stdout',
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+    output: TextIO | None = open(args.output, 'w') if args.output else None
+    try:
+        asyncio.run(run_online(args, output))
+    finally:
+        if output is not None:
+            output.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
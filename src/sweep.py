@@ -0,0 +1,277 @@
+"""
+Parameter sweep over MLFQ configurations, spread across a process pool
+
+The workload is parsed once and placed in shared memory, which the workers
+attach to instead of receiving a pickled copy with every task. Results are
+streamed in configuration order, so the output does not depend on the order
+in which the workers finish.
+
+Run from the root directory:
+    python -m src.sweep WORKLOAD --q1 1:20 --q2 1:20 --quantum 4 --context-switch 0:3
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+from array import array
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from .mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    NullTraceSink,
+    Process,
+    ProcessTable,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+    open_workload,
+)
+
+# (time_allotment_q1, time_allotment_q2, time_quantum, context_switch_time)
+Configuration = tuple[int, int, int, int]
+
+# Shared memory layout: a header of int64s followed by the workload columns
+_HEADER = ('num_processes', 'num_bursts', 'names_size')
+_ITEM_SIZE: int = array('q').itemsize
+
+
+class SharedWorkload:
+    """
+    Workload columns of a ProcessTable, stored in a shared memory block
+    """
+
+    _shared_memory: shared_memory.SharedMemory
+    _process_names: list[str]
+    _arrival_times: memoryview
+    _burst_offsets: memoryview
+    _bursts: memoryview
+
+    def __init__(self, shared_memory_block: shared_memory.SharedMemory) -> None:
+        self._shared_memory = shared_memory_block
+
+        buffer = shared_memory_block.buf
+        header = buffer[: len(_HEADER) * _ITEM_SIZE].cast('q')
+        num_processes, num_bursts, names_size = header.tolist()
+        header.release()
+
+        offset = len(_HEADER) * _ITEM_SIZE
+        columns: list[memoryview] = []
+        for size in (num_processes, num_processes + 1, num_bursts):
+            columns.append(buffer[offset : offset + size * _ITEM_SIZE].cast('q'))
+            offset += size * _ITEM_SIZE
+        self._arrival_times, self._burst_offsets, self._bursts = columns
+
+        names = bytes(buffer[offset : offset + names_size]).decode()
+        self._process_names = names.split('\n') if num_processes else []
+
+    @classmethod
+    def create(cls, processes: Sequence[Process]) -> SharedWorkload:
+        """
+        Copies the workload of processes into a new shared memory block
+        """
+        arrival_times = array('q', (p.arrival_time for p in processes))
+        burst_offsets = array('q', [0])
+        bursts = array('q')
+        for process in processes:
+            bursts.extend(process.burst_times)
+            burst_offsets.append(len(bursts))
+        names = '\n'.join(p.process_name for p in processes).encode()
+
+        header = array('q', [len(processes), len(bursts), len(names)])
+        data = b''.join(
+            [
+                header.tobytes(),
+                arrival_times.tobytes(),
+                burst_offsets.tobytes(),
+                bursts.tobytes(),
+                names,
+            ]
+        )
+
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        block.buf[: len(data)] = data
+        return cls(block)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedWorkload:
+        # Workers share the resource tracker of the creating process, which
+        # unlinks the block once the sweep is done
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    def processes(self) -> list[Process]:
+        """
+        Fresh processes for a single run, backed by the shared columns
+        """
+        return ProcessTable.from_columns(
+            self._process_names,
+            self._arrival_times,
+            self._burst_offsets,
+            self._bursts,
+        ).processes
+
+    def close(self, unlink: bool = False) -> None:
+        for column in (self._arrival_times, self._burst_offsets, self._bursts):
+            column.release()
+        self._shared_memory.close()
+        if unlink:
+            self._shared_memory.unlink()
+
+
+# Workload of the current worker process, attached once by _init_worker
+_worker_workload: SharedWorkload | None = None
+
+
+def _init_worker(name: str) -> None:
+    global _worker_workload
+    _worker_workload = SharedWorkload.attach(name)
+
+
+def _run_configurations(
+    configurations: Sequence[Configuration],
+) -> list[tuple[float, float]]:
+    assert _worker_workload is not None
+    return [
+        simulate(_worker_workload.processes(), *configuration)
+        for configuration in configurations
+    ]
+
+
+def simulate(
+    processes: Sequence[Process],
+    time_allotment_q1: int,
+    time_allotment_q2: int,
+    time_quantum: int,
+    context_switch_time: int,
+) -> tuple[float, float]:
+    """
+    Runs a single configuration and returns its average turnaround and
+    waiting times, rounded like final_stats()
+    """
+    MultiLevelFeedbackQueue(
+        processes,
+        [
+            RRPriorityQueue(time_allotment_q1, time_quantum),
+            FCFSPriorityQueue(time_allotment_q2),
+            SJFPriorityQueue(None),
+        ],
+        context_switch_time,
+        trace=NullTraceSink(),
+    ).run(event_driven=True)
+
+    return (
+        round(sum(p.turnaround_time for p in processes) / len(processes), 3),
+        round(sum(p.waiting_time for p in processes) / len(processes), 3),
+    )
+
+
+def sweep(
+    processes: Sequence[Process],
+    configurations: Sequence[Configuration],
+    max_workers: int | None = None,
+    chunk_size: int = 16,
+) -> Iterator[tuple[Configuration, float, float]]:
+    """
+    Runs every configuration on a process pool, yielding
+    (configuration, average turnaround time, average waiting time)
+    in the order of configurations
+    """
+    workload = SharedWorkload.create(processes)
+    try:
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(workload.name,)
+        ) as executor:
+            chunks = [
+                configurations[i : i + chunk_size]
+                for i in range(0, len(configurations), chunk_size)
+            ]
+            # map() yields in submission order, whatever order the chunks finish in
+            for chunk, results in zip(
+                chunks, executor.map(_run_configurations, chunks)
+            ):
+                for configuration, (avg_ta_time, avg_waiting_time) in zip(
+                    chunk, results
+                ):
+                    yield configuration, avg_ta_time, avg_waiting_time
+    finally:
+        workload.close(unlink=True)
+
+
+def parse_values(values: str) -> list[int]:
+    """
+    Parses a comma separated list of values or inclusive start:stop[:step] ranges
+    """
+    result: list[int] = []
+    for part in values.split(','):
+        if ':' in part:
+            start, stop, *step = map(int, part.split(':'))
+            result.extend(range(start, stop + 1, step[0] if step else 1))
+        else:
+            result.append(int(part))
+    return result
+
+
+def read_workload(path: str) -> list[Process]:
+    """
+    Reads the processes of a workload file in the text or columnar format
+    """
+    # The allotments and context switch time are swept over instead
+    _, _, _, processes = open_workload(path)
+    return list(processes)
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Runs a workload under every combination of the given MLFQ settings.'
+    )
+    parser.add_argument(
+        'workload', help='workload file, in the same format as stdin or columnar'
+    )
+    parser.add_argument(
+        '--q1', type=parse_values, required=True, help='Q1 time allotments'
+    )
+    parser.add_argument(
+        '--q2', type=parse_values, required=True, help='Q2 time allotments'
+    )
+    parser.add_argument(
+        '--quantum', type=parse_values, default=[4], help='RR time quanta'
+    )
+    parser.add_argument(
+        '--context-switch', type=parse_values, default=[0], help='context switch times'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count(), help='worker processes'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=16, help='configurations per task'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+    processes = read_workload(args.workload)
+    configurations: list[Configuration] = list(
+        itertools.product(args.q1, args.q2, args.quantum, args.context_switch)
+    )
+
+    print('q1\tq2\tquantum\tcontext_switch\tavg_turnaround\tavg_waiting')
+    for configuration, avg_ta_time, avg_waiting_time in sweep(
+        processes, configurations, args.workers, args.chunk_size
+    ):
+        print(
+            '\t'.join(map(str, (*configuration, avg_ta_time, avg_waiting_time))),
+            flush=True,
+        )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,354 @@
+"""
+Random access to the state of a run at any tick, through the index written
+by the simulator with --index
+
+The index holds a snapshot of the simulation every K ticks, along with the
+position of the trace at that tick (see TraceIndexer). To show a window
+of ticks, the simulation is resumed from the last snapshot at or before the
+start of the window and stepped through it tick by tick, printing the queue,
+CPU and I/O state of every tick even if the run itself was event-driven. At
+most K ticks are simulated before the window, however far into the run it is.
+If the trace of the run was written to a file, the window can be read from it
+instead, starting at the position of that snapshot.
+
+Snapshots of runs streamed with --input only hold the processes loaded so
+far, along with the position of the next one in the workload file, which the
+resumed simulation seeks to rather than reading the workload up to it again.
+Input that had to be sorted externally is streamed from a sorted copy written
+next to the index, which positions then point into.
+
+Run from the root directory:
+    python -m src.mlfq --index run.index --index-every 100 --output run.txt < tests/input/set1.txt
+    python -m src.trace_index run.index 40:60
+    python -m src.trace_index run.index 40:60 --from-trace
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import BinaryIO, TextIO
+
+from .checkpoint import Checkpoint, CheckpointCodec
+from .digest import WindowTraceSink, trace_tick
+from .mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+    TextTraceSink,
+    TraceSink,
+    open_workload,
+    parse_window,
+)
+
+
+class TraceIndexer:
+    """
+    Writes a seekable index of a run: a snapshot of the simulation (see
+    Checkpoint) at the first iteration at or after every multiple of `every`
+    ticks, along with the position of the trace at that tick, so that the
+    state at any tick can be found again by resuming from the snapshot before
+    it (see TraceIndex)
+
+    Snapshots only hold the live processes (see CheckpointCodec.checkpoint),
+    so that each stays small and quick to take however many processes have
+    completed, and the position of the workload stream, if any. Once the
+    run is complete, a last snapshot of the whole simulation is taken, which
+    the final stats are printed from.
+
+    The file is the magic string, a length-prefixed JSON header with the
+    settings the simulation is rebuilt from, and a record per snapshot: its
+    tick, trace position (-1 if unknown), whether it only holds the live
+    processes and its size, followed by the encoded checkpoint. close()
+    appends a table of the tick and file offset of every record, then the
+    offset of the table and the number of records, so that the snapshot
+    before a tick is found without reading the others.
+    """
+
+    MAGIC: bytes = b'MLFQINDEX1\n'
+    LENGTH: struct.Struct = struct.Struct('<Q')
+    RECORD_HEADER: struct.Struct = struct.Struct('<4q')
+    FOOTER: struct.Struct = struct.Struct('<2q')
+
+    _file: BinaryIO
+    _every: int
+    _next_tick: int = 0
+    _ticks: array[int]
+    _offsets: array[int]
+    _codec: CheckpointCodec
+    _mlfq: MultiLevelFeedbackQueue | None = None
+
+    def __init__(self, path: str, every: int, settings: dict) -> None:
+        if every < 1:
+            raise Exception('Error: Index snapshots must be at least a tick apart')
+
+        self._every = every
+        self._ticks = array('q')
+        self._offsets = array('q')
+        self._codec = CheckpointCodec()
+        header = json.dumps({'every': every, **settings}).encode()
+        self._file = open(path, 'wb')
+        self._file.write(self.MAGIC + self.LENGTH.pack(len(header)) + header)
+
+    def on_iteration(self, mlfq: MultiLevelFeedbackQueue) -> None:
+        self._mlfq = mlfq
+        if mlfq.tick < self._next_tick:
+            return
+
+        self._next_tick = (mlfq.tick // self._every + 1) * self._every
+        self._write_snapshot(mlfq, live_only=True)
+
+    def _write_snapshot(self, mlfq: MultiLevelFeedbackQueue, live_only: bool) -> None:
+        checkpoint = self._codec.checkpoint(mlfq, live_only)
+        snapshot = checkpoint.encode()
+        trace_position = checkpoint.trace_position
+        self._ticks.append(mlfq.tick)
+        self._offsets.append(self._file.tell())
+        self._file.write(
+            self.RECORD_HEADER.pack(
+                mlfq.tick,
+                -1 if trace_position is None else trace_position,
+                live_only,
+                len(snapshot),
+            )
+        )
+        self._file.write(snapshot)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        if self._mlfq is not None and self._mlfq.is_empty:
+            self._write_snapshot(self._mlfq, live_only=False)
+        table_offset = self._file.tell()
+        self._file.write(self._ticks.tobytes() + self._offsets.tobytes())
+        self._file.write(self.FOOTER.pack(table_offset, len(self._ticks)))
+        self._file.close()
+
+
+class TraceIndex:
+    """
+    Index of a run written by TraceIndexer
+    """
+
+    path: str
+    # Settings of the run, which the simulation is rebuilt from
+    settings: dict
+    # Tick of each snapshot, in increasing order
+    ticks: array[int]
+    # File offset of the record of each snapshot
+    _offsets: array[int]
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as index_file:
+            if index_file.read(len(TraceIndexer.MAGIC)) != TraceIndexer.MAGIC:
+                raise Exception('Error: Not a trace index file.')
+
+            (header_size,) = TraceIndexer.LENGTH.unpack(
+                index_file.read(TraceIndexer.LENGTH.size)
+            )
+            self.settings = json.loads(index_file.read(header_size))
+            records_offset = index_file.tell()
+
+            self.ticks = array('q')
+            self._offsets = array('q')
+            if not self._read_table(index_file):
+                self._scan_records(index_file, records_offset)
+
+    def _read_table(self, index_file: BinaryIO) -> bool:
+        """
+        Reads the table of records at the end of the index, returning False if
+        there is none, e.g. as the run did not finish
+        """
+        table_end = index_file.seek(0, os.SEEK_END) - TraceIndexer.FOOTER.size
+        if table_end < 0:
+            return False
+
+        index_file.seek(table_end)
+        table_offset, num_records = TraceIndexer.FOOTER.unpack(
+            index_file.read(TraceIndexer.FOOTER.size)
+        )
+        table_size = 2 * 8 * num_records
+        if table_offset < 0 or table_offset + table_size != table_end:
+            return False
+
+        index_file.seek(table_offset)
+        table = array('q', index_file.read(table_size))
+        self.ticks = table[:num_records]
+        self._offsets = table[num_records:]
+        return True
+
+    def _scan_records(self, index_file: BinaryIO, offset: int) -> None:
+        """
+        Finds the records of an index without a table, up to the last whole one
+        """
+        size = index_file.seek(0, os.SEEK_END)
+        while offset + TraceIndexer.RECORD_HEADER.size <= size:
+            index_file.seek(offset)
+            tick, _, _, snapshot_size = TraceIndexer.RECORD_HEADER.unpack(
+                index_file.read(TraceIndexer.RECORD_HEADER.size)
+            )
+            end = offset + TraceIndexer.RECORD_HEADER.size + snapshot_size
+            # A partly written record, or table
+            if (
+                end > size
+                or (self.ticks and tick <= self.ticks[-1])
+                or index_file.read(len(Checkpoint.MAGIC)) != Checkpoint.MAGIC
+            ):
+                break
+
+            self.ticks.append(tick)
+            self._offsets.append(offset)
+            offset = end
+
+    def _read_record(self, i: int, read_snapshot: bool) -> tuple[int, bool, bytes]:
+        """
+        Trace position, whether it only holds the live processes and, if
+        read_snapshot is set, encoded snapshot of the record i
+        """
+        with open(self.path, 'rb') as index_file:
+            index_file.seek(self._offsets[i])
+            _, trace_position, live_only, snapshot_size = (
+                TraceIndexer.RECORD_HEADER.unpack(
+                    index_file.read(TraceIndexer.RECORD_HEADER.size)
+                )
+            )
+            snapshot = index_file.read(snapshot_size) if read_snapshot else b''
+            return trace_position, bool(live_only), snapshot
+
+    def _record_before(self, tick: int) -> int:
+        """
+        Number of the last record at or before tick, or of the first one if
+        there is none
+        """
+        if not self.ticks:
+            raise Exception('Error: The index has no snapshots.')
+        return max(bisect.bisect_right(self.ticks, tick) - 1, 0)
+
+    def trace_position_before(self, tick: int) -> int:
+        """
+        Position in the trace of the last snapshot at or before tick, or -1 if
+        unknown
+        """
+        return self._read_record(self._record_before(tick), False)[0]
+
+    @property
+    def is_complete(self) -> bool:
+        """
+        Whether the run finished, so that its final stats can be printed
+        """
+        return bool(self.ticks) and not self._read_record(len(self.ticks) - 1, False)[1]
+
+    def resume(self, tick: int | None, trace: TraceSink) -> MultiLevelFeedbackQueue:
+        """
+        Simulation resumed from the last snapshot at or before tick, or from
+        the end of the run if tick is None
+        """
+        if tick is not None:
+            i = self._record_before(tick)
+        elif self.is_complete:
+            i = len(self.ticks) - 1
+        else:
+            raise Exception('Error: The run did not finish, so it has no final stats.')
+
+        settings = self.settings
+        input_path: str | None = settings['input']
+        checkpoint = Checkpoint.decode(self._read_record(i, True)[2])
+        mlfq = MultiLevelFeedbackQueue(
+            open_workload(input_path, settings['unsorted'], settings['sorted_path'])[3]
+            if input_path
+            else [],
+            [
+                RRPriorityQueue(settings['time_allotment_q1']),
+                FCFSPriorityQueue(settings['time_allotment_q2']),
+                SJFPriorityQueue(None),
+            ],
+            settings['context_switch_time'],
+            presorted=input_path is not None,
+            trace=trace,
+            boost_interval=settings['boost_interval'],
+        )
+        CheckpointCodec().restore(mlfq, checkpoint)
+        return mlfq
+
+
+def simulate_window(
+    index: TraceIndex, start: int, end: int | None, stream: TextIO
+) -> None:
+    """
+    Writes the trace of the ticks in [start, end), and the final stats if end
+    is None, by simulating them tick by tick from the snapshot before start
+    """
+    trace = TextTraceSink(stream)
+    window = WindowTraceSink(trace, start, end)
+    mlfq = index.resume(start, window)
+    while not mlfq.is_empty and (end is None or mlfq.tick < end):
+        mlfq.step()
+    if end is None:
+        # Snapshots before the end miss the processes that completed earlier
+        index.resume(None, window).final_stats()
+    trace.flush()
+
+
+def read_window(index: TraceIndex, start: int, end: int | None, stream: TextIO) -> None:
+    """
+    Writes the lines of the ticks in [start, end) from the trace file of the
+    run, and the final stats if end is None, reading it from the position of
+    the snapshot before start
+    """
+    trace_position = index.trace_position_before(start)
+    output_path: str | None = index.settings['output']
+    if output_path is None or trace_position < 0:
+        raise Exception('Error: The trace of this run was not written to a file.')
+
+    trace = TextTraceSink(stream)
+    window = WindowTraceSink(trace, start, end)
+    with open(output_path, 'rb') as output:
+        output.seek(trace_position)
+        for line in output:
+            decoded_line = line.decode().removesuffix('\n')
+            tick = trace_tick(decoded_line)
+            if end is not None and tick is not None and tick >= end:
+                break
+            window.write(decoded_line)
+    trace.flush()
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Shows the state of an indexed run over a window of ticks.'
+    )
+    parser.add_argument('index', help='index file written with --index')
+    parser.add_argument(
+        'window',
+        type=parse_window,
+        help='ticks to show, as START:END (END excluded), and the final stats if END is left out',
+    )
+    parser.add_argument(
+        '--from-trace',
+        action='store_true',
+        help='read the window from the trace file of the run instead of simulating it',
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> None:
+    args = parse_args(argv)
+    index = TraceIndex(args.index)
+    start, end = args.window
+    if args.from_trace:
+        read_window(index, start, end, sys.stdout)
+    else:
+        simulate_window(index, start, end, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
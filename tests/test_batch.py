@@ -0,0 +1,62 @@
+import itertools
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from src.batch import BatchMultiLevelFeedbackQueue
+from src.mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    NullTraceSink,
+    Process,
+    ProcessTable,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+)
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+
+
+def read_processes(input_file: Path) -> list[Process]:
+    table: ProcessTable = ProcessTable()
+    lines: list[str] = open(input_file, 'r').read().split('\n')
+    for line in lines[4 : 4 + int(lines[0])]:
+        [process_name, *process_details] = line.split(';')
+        [arrival_time, *burst_times] = map(int, process_details)
+        table.append(process_name, arrival_time, burst_times)
+    return table.processes
+
+
+def test_batch_matches_sequential_runs() -> None:
+    configurations: list[tuple[int, int, int]] = list(
+        itertools.product([0, 1, 4, 8], [0, 3, 8], [0, 1, 3])
+    )
+
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        batch: BatchMultiLevelFeedbackQueue = BatchMultiLevelFeedbackQueue(
+            read_processes(input_file), configurations
+        )
+        batch.run()
+
+        for i, (time_allotment_q1, time_allotment_q2, context_switch_time) in enumerate(
+            configurations
+        ):
+            processes: list[Process] = read_processes(input_file)
+            MultiLevelFeedbackQueue(
+                processes,
+                [
+                    RRPriorityQueue(time_allotment_q1),
+                    FCFSPriorityQueue(time_allotment_q2),
+                    SJFPriorityQueue(None),
+                ],
+                context_switch_time,
+                trace=NullTraceSink(),
+            ).run()
+
+            assert list(batch.turnaround_times[i]) == [
+                p.turnaround_time for p in processes
+            ]
+            assert list(batch.waiting_times[i]) == [p.waiting_time for p in processes]
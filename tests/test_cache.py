@@ -0,0 +1,134 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+from pytest import CaptureFixture, MonkeyPatch, raises
+
+from src import cache, mlfq
+from src.cache import ResultCache, ResultRecorder, result_key
+from src.mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    NullTraceSink,
+    Process,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+)
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+
+def test_result_key(monkeypatch: MonkeyPatch) -> None:
+    def key(time_allotment_q1: int = 2, burst_times: tuple[int, ...] = (5,)) -> str:
+        return result_key(
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(4),
+                SJFPriorityQueue(None),
+            ],
+            1,
+            [Process('A', 0, list(burst_times))],
+            {'cores': 1},
+        )
+
+    assert key() == key()
+    assert key(3) != key()
+    assert key(burst_times=(5, 1, 2)) != key()
+
+    # Entries cached before the format version was bumped are not read
+    previous: str = key()
+    monkeypatch.setattr(cache, 'CACHE_FORMAT_VERSION', cache.CACHE_FORMAT_VERSION + 1)
+    assert key() != previous
+
+
+def test_result_cache(tmp_path: Path) -> None:
+    cache: ResultCache = ResultCache(str(tmp_path / 'cache'), 1 << 20)
+    assert cache.get('a') is None
+
+    trace_options: dict = {'event_driven': False, 'print_collapsed_ticks': False}
+    recorder: ResultRecorder = ResultRecorder(NullTraceSink(), True)
+    for line in [
+        'At Time = 0',
+        'SIMULATION DONE\n',
+        'Waiting time for Process é : 1 ms',
+    ]:
+        recorder.write(line)
+    assert recorder.stats == ['SIMULATION DONE\n', 'Waiting time for Process é : 1 ms']
+    cache.put('a', recorder.stats, {'average': 1.5}, trace_options, recorder.trace)
+
+    result = cache.get('a', trace_options)
+    assert result is not None
+    assert result.stats == recorder.stats and result.metrics == {'average': 1.5}
+    stream: StringIO = StringIO()
+    result.write_trace(stream, chunk_size=7)
+    assert (
+        stream.getvalue()
+        == 'At Time = 0\nSIMULATION DONE\n\nWaiting time for Process é : 1 ms\n'
+    )
+
+    # The trace must have been rendered with the same options, unlike the stats
+    assert cache.get('a', {**trace_options, 'event_driven': True}) is None
+    assert cache.get('a') is not None
+
+    (tmp_path / 'cache' / f'b{ResultCache.SUFFIX}').write_bytes(b'MLFQRESULT1\n\0')
+    assert cache.get('b') is None
+
+    # The least recently used entries are evicted past the size cap
+    entry_size: int = len((tmp_path / 'cache' / f'a{ResultCache.SUFFIX}').read_bytes())
+    small_cache: ResultCache = ResultCache(str(tmp_path / 'small'), 2 * entry_size)
+    for key in ('a', 'b'):
+        small_cache.put(
+            key, recorder.stats, {'average': 1.5}, trace_options, result._trace
+        )
+    os.utime(tmp_path / 'small' / f'a{ResultCache.SUFFIX}', (0, 0))
+    os.utime(tmp_path / 'small' / f'b{ResultCache.SUFFIX}', (1, 1))
+    assert small_cache.get('a') is not None
+    small_cache.put('c', recorder.stats, {'average': 1.5}, trace_options, result._trace)
+    assert sorted(os.listdir(tmp_path / 'small')) == [
+        f'a{ResultCache.SUFFIX}',
+        f'c{ResultCache.SUFFIX}',
+    ]
+
+
+def test_main_result_cache(
+    monkeypatch: MonkeyPatch, capfd: CaptureFixture[str], tmp_path: Path
+) -> None:
+    cache_dir: str = str(tmp_path / 'cache')
+
+    def run_main(test_input: str, *args: str) -> str:
+        monkeypatch.setattr('sys.stdin', StringIO(test_input))
+        mlfq.main(['--cache', cache_dir, *args])
+        out, _ = capfd.readouterr()
+        return out
+
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        test_input: str = input_file.read_text()
+        expected: str = (OUTPUTS_PATH / input_file.name).read_text().strip()
+        metrics_path: Path = tmp_path / 'metrics.json'
+
+        assert run_main(test_input, '--metrics', str(metrics_path)).strip() == expected
+        expected_metrics: str = metrics_path.read_text()
+        summary: str = run_main(test_input, '--verbosity', 'summary')
+
+        # Results are read back, even from a reordered workload
+        with monkeypatch.context() as patch:
+            patch.setattr(MultiLevelFeedbackQueue, 'run', None)
+            header, *lines = test_input.strip().split('\n')
+            reordered: str = '\n'.join([header, *lines[:3], *reversed(lines[3:])])
+            assert (
+                run_main(reordered, '--metrics', str(metrics_path)).strip() == expected
+            )
+            assert metrics_path.read_text() == expected_metrics
+            assert run_main(test_input, '--verbosity', 'summary') == summary
+            assert run_main(test_input, '--verbosity', 'quiet') == ''
+
+        # Other options are simulated again
+        event_driven: str = run_main(test_input, '--event-driven')
+        assert event_driven.strip() != expected
+        with monkeypatch.context() as patch:
+            patch.setattr(MultiLevelFeedbackQueue, 'run', None)
+            assert run_main(test_input, '--event-driven') == event_driven
+            with raises(TypeError):
+                run_main(test_input, '--boost-every', '5')
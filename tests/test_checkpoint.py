@@ -0,0 +1,276 @@
+from collections.abc import Iterable
+from io import StringIO
+from pathlib import Path
+
+from src import mlfq
+from src.checkpoint import Checkpoint, CheckpointCodec, CheckpointHeader, CheckpointLog
+from src.mlfq import (
+    FCFSPriorityQueue,
+    MultiLevelFeedbackQueue,
+    Process,
+    ProcessTable,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+    SummaryTraceSink,
+    TextTraceSink,
+)
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+
+def test_checkpoint_resume(tmp_path: Path) -> None:
+    checkpoint_file: Path = tmp_path / 'checkpoint'
+    output_file: Path = tmp_path / 'output.txt'
+
+    for input_file in sorted(f for f in INPUTS_PATH.iterdir() if f.is_file()):
+        expected: str = open(OUTPUTS_PATH / input_file.name, 'r').read().strip()
+        for flags in ([], ['--event-driven', '--print-collapsed-ticks']):
+            args: list[str] = [
+                *flags,
+                '--input',
+                str(input_file),
+                '--output',
+                str(output_file),
+                '--checkpoint',
+                str(checkpoint_file),
+            ]
+            checkpoint_file.unlink(missing_ok=True)
+            mlfq.main([*args, '--checkpoint-every', '5'])
+            assert checkpoint_file.exists()
+
+            # the output is rewritten from the last checkpoint on
+            mlfq.main([*args, '--resume'])
+            assert output_file.read_text().strip() == expected
+
+
+class CheckpointRecorder:
+    """
+    Takes a checkpoint before every iteration of the simulation loop
+    """
+
+    def __init__(self, live_only: bool = False) -> None:
+        self.checkpoints: list[Checkpoint] = []
+        self.live_only: bool = live_only
+        self.codec: CheckpointCodec = CheckpointCodec()
+
+    def on_iteration(self, scheduler: MultiLevelFeedbackQueue) -> None:
+        checkpoint: Checkpoint = self.codec.checkpoint(scheduler, self.live_only)
+        self.checkpoints.append(Checkpoint.decode(checkpoint.encode()))
+
+    def close(self) -> None:
+        pass
+
+
+def test_checkpoint_every_iteration() -> None:
+    input_file: Path = INPUTS_PATH / 'set2.txt'
+
+    def generate_streamed_mlfq(stream: StringIO) -> MultiLevelFeedbackQueue:
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        return MultiLevelFeedbackQueue(
+            processes,
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ],
+            context_switch_time,
+            presorted=True,
+            trace=TextTraceSink(stream),
+        )
+
+    stream: StringIO = StringIO()
+    recorder: CheckpointRecorder = CheckpointRecorder()
+    generate_streamed_mlfq(stream).run(
+        event_driven=True,
+        print_collapsed_ticks=True,
+        checkpointer=recorder,  # type: ignore[arg-type]
+    )
+    expected: str = stream.getvalue()
+    assert len(recorder.checkpoints) > 10
+
+    for checkpoint in recorder.checkpoints:
+        assert checkpoint.trace_position is not None
+        header: CheckpointHeader = checkpoint.header
+        assert header.num_streamed is not None
+        assert CheckpointHeader.decode(header.encode()) == header
+        resumed_stream: StringIO = StringIO(expected[: checkpoint.trace_position])
+        resumed_stream.seek(checkpoint.trace_position)
+
+        resumed: MultiLevelFeedbackQueue = generate_streamed_mlfq(resumed_stream)
+        CheckpointCodec().restore(resumed, checkpoint)
+        resumed.run(event_driven=True, print_collapsed_ticks=True)
+        assert resumed_stream.getvalue() == expected
+
+
+class TickCheckpointRecorder:
+    """
+    Takes a checkpoint at the first iteration at or after each of the ticks
+    """
+
+    def __init__(self, ticks: list[int]) -> None:
+        self.checkpoints: list[Checkpoint] = []
+        self.ticks: list[int] = ticks
+        self.codec: CheckpointCodec = CheckpointCodec()
+
+    def on_iteration(self, scheduler: MultiLevelFeedbackQueue) -> None:
+        if len(self.checkpoints) < len(self.ticks) and (
+            scheduler.tick >= self.ticks[len(self.checkpoints)]
+        ):
+            self.checkpoints.append(self.codec.checkpoint(scheduler))
+
+    def close(self) -> None:
+        pass
+
+
+def test_incremental_checkpoint(tmp_path: Path) -> None:
+    def generate_mlfq(stream: StringIO) -> MultiLevelFeedbackQueue:
+        table: ProcessTable = ProcessTable()
+        for i in range(10000):
+            table.append(f'P{i}', i * 6, [i % 3 + 1, 5, i % 2 + 1])
+        return MultiLevelFeedbackQueue(
+            table.processes,
+            [RRPriorityQueue(4), FCFSPriorityQueue(8), SJFPriorityQueue(None)],
+            1,
+            presorted=True,
+            trace=SummaryTraceSink(stream),
+        )
+
+    stream: StringIO = StringIO()
+    recorder: TickCheckpointRecorder = TickCheckpointRecorder([30000, 31000])
+    generate_mlfq(stream).run(event_driven=True, checkpointer=recorder)  # type: ignore[arg-type]
+    first, second = recorder.checkpoints
+
+    # only the chunks of the processes that were live or arrived in between
+    # are copied again
+    copied: list[str] = [
+        name
+        for name, payload in second.sections.items()
+        if first.sections.get(name) is not payload
+    ]
+    state_chunks: list[str] = [name for name in copied if name.startswith('state_')]
+    assert 0 < 2 * len(state_chunks) < len(list(second.chunks('state_0')))
+    assert not any(name.startswith('workload_') for name in copied)
+
+    # and only those are written to the log
+    log_path: Path = tmp_path / 'checkpoint'
+    with open(log_path, 'wb') as log_file:
+        log_file.write(CheckpointLog.MAGIC)
+        log: CheckpointLog = CheckpointLog(log_file)
+        log.append(first)
+        first_size: int = log_file.tell()
+        log.append(second)
+        assert log_file.tell() - first_size < first_size // 4
+    assert Checkpoint.read(str(log_path)).sections == second.sections
+
+    # a checkpoint that was not written completely is skipped
+    data: bytes = log_path.read_bytes()
+    log_path.write_bytes(data[:-1])
+    assert Checkpoint.read(str(log_path)).sections == first.sections
+
+    for checkpoint in (first, second):
+        resumed_stream: StringIO = StringIO()
+        resumed: MultiLevelFeedbackQueue = generate_mlfq(resumed_stream)
+        CheckpointCodec().restore(resumed, checkpoint)
+        resumed.run(event_driven=True)
+        assert resumed_stream.getvalue() == stream.getvalue()
+
+
+def test_live_checkpoint_every_iteration() -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        for streamed in (False, True):
+            time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+                mlfq.read_process_stream(str(input_file), table_size=3)
+            )
+
+            def generate_live_mlfq(
+                stream: StringIO,
+                processes: Iterable[Process] = processes
+                if streamed
+                else list(processes),
+                time_allotment_q1: int = time_allotment_q1,
+                time_allotment_q2: int = time_allotment_q2,
+                context_switch_time: int = context_switch_time,
+            ) -> MultiLevelFeedbackQueue:
+                return MultiLevelFeedbackQueue(
+                    processes,
+                    [
+                        RRPriorityQueue(time_allotment_q1),
+                        FCFSPriorityQueue(time_allotment_q2),
+                        SJFPriorityQueue(None),
+                    ],
+                    context_switch_time,
+                    presorted=True,
+                    trace=TextTraceSink(stream),
+                    boost_interval=9,
+                )
+
+            stream: StringIO = StringIO()
+            recorder: CheckpointRecorder = CheckpointRecorder(live_only=True)
+            generate_live_mlfq(stream).run(checkpointer=recorder)  # type: ignore[arg-type]
+            expected: str = stream.getvalue()
+            expected = expected[: expected.index('SIMULATION DONE')]
+
+            for checkpoint in recorder.checkpoints:
+                assert checkpoint.trace_position is not None
+                resumed_stream: StringIO = StringIO(
+                    expected[: checkpoint.trace_position]
+                )
+                resumed_stream.seek(checkpoint.trace_position)
+
+                # Only the live processes are copied, which is enough to replay the run
+                _, _, _, stream_processes = mlfq.read_process_stream(str(input_file))
+                resumed: MultiLevelFeedbackQueue = generate_live_mlfq(
+                    resumed_stream, stream_processes if streamed else []
+                )
+                CheckpointCodec().restore(resumed, checkpoint)
+                live_processes: set[Process] = {
+                    *resumed._all_processes,
+                    *resumed.future_processes,
+                }
+                assert sum(checkpoint.sections['tables']) <= len(live_processes) + 1
+                while not resumed.is_empty:
+                    resumed.step()
+                resumed._trace.flush()
+                assert resumed_stream.getvalue() == expected
+
+
+def test_priority_boost_checkpoint() -> None:
+    input_file: Path = INPUTS_PATH / 'set2.txt'
+
+    def generate_boosted_mlfq(stream: StringIO) -> MultiLevelFeedbackQueue:
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        return MultiLevelFeedbackQueue(
+            list(processes),
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ],
+            context_switch_time,
+            trace=TextTraceSink(stream),
+            boost_interval=5,
+        )
+
+    stream: StringIO = StringIO()
+    recorder: CheckpointRecorder = CheckpointRecorder()
+    generate_boosted_mlfq(stream).run(checkpointer=recorder)  # type: ignore[arg-type]
+    expected: str = stream.getvalue()
+
+    # Processes still pending in the top queue after a boost are saved in order
+    for checkpoint in recorder.checkpoints:
+        assert checkpoint.trace_position is not None
+        # The boosted run is not streamed
+        assert checkpoint.header.num_streamed is None
+        resumed_stream: StringIO = StringIO(expected[: checkpoint.trace_position])
+        resumed_stream.seek(checkpoint.trace_position)
+
+        resumed: MultiLevelFeedbackQueue = generate_boosted_mlfq(resumed_stream)
+        CheckpointCodec().restore(resumed, checkpoint)
+        resumed.run()
+        assert resumed_stream.getvalue() == expected
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from pytest import CaptureFixture, raises
+
+from src import mlfq
+from src.convert import convert
+from src.mlfq import Process
+from src.sweep import read_workload
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+
+def test_columnar_main(capfd: CaptureFixture[str], tmp_path: Path) -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        workload: Path = tmp_path / 'workload.mlfq'
+        convert(str(input_file), str(workload))
+        contents: bytes = workload.read_bytes()
+
+        mlfq.main(['--input', str(workload)])
+        out, err = capfd.readouterr()
+        assert out.strip() == open(OUTPUTS_PATH / input_file.name, 'r').read().strip()
+        assert err == ''
+
+        # The state of the processes only changes in memory
+        assert workload.read_bytes() == contents
+
+
+def test_columnar_workload(tmp_path: Path) -> None:
+    lines: list[str] = [
+        f'P{i % 7}é{i};{(i * 37) % 11};{i % 5 + 1};{i % 3};1' for i in range(50)
+    ]
+    lines.append('Q;3')
+    text_workload: Path = tmp_path / 'workload.txt'
+    text_workload.write_text('\n'.join([str(len(lines)), '5', '6', '1', *lines]))
+    workload: Path = tmp_path / 'workload.mlfq'
+
+    # Chunks are smaller than the workload, so it is written in several parts
+    _, _, _, processes = mlfq.read_process_stream(str(text_workload))
+    expected: list[Process] = list(processes)
+    assert mlfq.write_columnar_workload(str(workload), 5, 6, 1, expected, 8) == 51
+
+    assert mlfq.is_columnar_workload(str(workload))
+    assert not mlfq.is_columnar_workload(str(text_workload))
+    time_allotment_q1, time_allotment_q2, context_switch_time, table = (
+        mlfq.read_columnar_workload(str(workload))
+    )
+    assert (time_allotment_q1, time_allotment_q2, context_switch_time) == (5, 6, 1)
+    assert len(table) == 51
+    for process, expected_process in zip(table, expected):
+        assert process.process_name == expected_process.process_name
+        assert process.arrival_time == expected_process.arrival_time
+        assert list(process.burst_times) == list(expected_process.burst_times)
+        assert process.is_from_IO
+        assert not process.has_started
+
+    # Both formats give the same processes to the sweep
+    assert [p.process_name for p in read_workload(str(workload))] == [
+        p.process_name for p in read_workload(str(text_workload))
+    ]
+
+    with raises(Exception, match='is not a columnar workload'):
+        mlfq.read_columnar_workload(str(text_workload))
+    workload.write_bytes(workload.read_bytes()[:-10])
+    with raises(Exception, match='is truncated'):
+        mlfq.read_columnar_workload(str(workload))
@@ -0,0 +1,95 @@
+from io import StringIO
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from src import mlfq
+from src.digest import (
+    digest_output,
+    first_divergence,
+    first_divergent_tick,
+    read_digest,
+    read_window,
+)
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+
+def make_digest(output: str, every: int) -> str:
+    stream = StringIO()
+    digest_output(StringIO(output), stream, every)
+    return stream.getvalue()
+
+
+def test_digest_matches_output(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+        digest_path = tmp_path / 'run.digest'
+        mlfq.main(['--digest', str(digest_path), '--digest-every', '5'])
+
+        expected = make_digest((OUTPUTS_PATH / input_file.name).read_text(), 5)
+        assert digest_path.read_text() == expected
+
+        every, entries = read_digest(StringIO(expected))
+        assert every == 5
+        ticks = [tick for tick, _, _ in entries]
+        assert ticks[-1] is None
+        assert all(tick % 5 == 0 for tick in ticks[:-1])
+
+
+def test_first_divergence(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    input_file = sorted(INPUTS_PATH.iterdir())[0]
+    output = (OUTPUTS_PATH / input_file.name).read_text()
+    assert (
+        first_divergence(
+            read_digest(StringIO(make_digest(output, 8)))[1],
+            read_digest(StringIO(make_digest(output, 8)))[1],
+        )
+        is None
+    )
+
+    # A line of tick 30 is changed
+    lines = output.split('\n')
+    line_index = lines.index('At Time = 30') + 2
+    lines[line_index] += ' X'
+    changed_output = '\n'.join(lines)
+    (tmp_path / 'expected.txt').write_text(output)
+    (tmp_path / 'changed.txt').write_text(changed_output)
+
+    divergence = first_divergence(
+        read_digest(StringIO(make_digest(output, 8)))[1],
+        read_digest(StringIO(make_digest(changed_output, 8)))[1],
+    )
+    assert divergence is not None
+    assert (divergence.start_tick, divergence.end_tick) == (24, 32)
+
+    result = first_divergent_tick(
+        read_window(str(tmp_path / 'expected.txt'), divergence, 0),
+        read_window(str(tmp_path / 'changed.txt'), divergence, 1),
+    )
+    assert result is not None
+    tick, _, changed_lines = result
+    assert tick == 30
+    assert lines[line_index] in changed_lines
+
+    # Only the window of the run is rendered again
+    monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+    window_path = tmp_path / 'window.txt'
+    mlfq.main(['--trace-window', '24:32', '--output', str(window_path)])
+    result = first_divergent_tick(
+        read_window(str(window_path), divergence, 0),
+        read_window(str(tmp_path / 'changed.txt'), divergence, 1),
+    )
+    assert result is not None and result[0] == 30
+
+    # Changes to the final stats are past the last checkpoint
+    changed_output = output.replace('SIMULATION DONE', 'SIMULATION DONE!')
+    divergence = first_divergence(
+        read_digest(StringIO(make_digest(output, 8)))[1],
+        read_digest(StringIO(make_digest(changed_output, 8)))[1],
+    )
+    assert divergence is not None and divergence.end_tick is None
+    result = first_divergent_tick(StringIO(output), StringIO(changed_output))
+    assert result is not None and result[0] is None
@@ -1,15 +1,22 @@
+import math
 from io import StringIO
-from pytest import CaptureFixture, MonkeyPatch
+from pytest import CaptureFixture, MonkeyPatch, raises
 from pathlib import Path
 
 from src import mlfq
+from src.checkpoint import CheckpointCodec
 from src.mlfq import (
+    IO,
     MultiLevelFeedbackQueue,
     RRPriorityQueue,
     FCFSPriorityQueue,
     SJFPriorityQueue,
+    TraceSink,
+    TextTraceSink,
+    SummaryTraceSink,
+    NullTraceSink,
 )
-from src.mlfq import Process
+from src.mlfq import Process, ProcessTable
 
 # note that pytest is called from the root directory, not from /tests
 INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
@@ -80,3 +87,1011 @@ def test_mlfq_instantiation(capfd: CaptureFixture[str]) -> None:
         ]
     )
     assert err == ''
+
+
+def test_main_event_driven(
+    monkeypatch: MonkeyPatch, capfd: CaptureFixture[str]
+) -> None:
+    input_files: list[Path] = sorted(f for f in INPUTS_PATH.iterdir() if f.is_file())
+
+    for input_file in input_files:
+        output_file: Path = OUTPUTS_PATH / input_file.name
+        expected: str = open(output_file, 'r').read().strip()
+        test_input: str = open(input_file, 'r').read()
+
+        # printing the collapsed ticks reproduces the full trace
+        monkeypatch.setattr('sys.stdin', StringIO(test_input))
+        mlfq.main(['--event-driven', '--print-collapsed-ticks'])
+        out, err = capfd.readouterr()
+        assert out.strip() == expected
+        assert err == ''
+
+        # otherwise only event ticks are printed, but the stats are the same
+        monkeypatch.setattr('sys.stdin', StringIO(test_input))
+        mlfq.main(['--event-driven'])
+        out, err = capfd.readouterr()
+        assert out.count('At Time = ') < expected.count('At Time = ')
+        assert (
+            out.strip().split('SIMULATION DONE')[1]
+            == expected.split('SIMULATION DONE')[1]
+        )
+        assert err == ''
+
+
+def test_queues_do_not_share_processes() -> None:
+    process: Process = Process('A', 0, [5])
+
+    for queue_class in (RRPriorityQueue, FCFSPriorityQueue):
+        first_queue = queue_class(8)
+        second_queue = queue_class(8)
+        first_queue.push_process(process)
+
+        assert first_queue.processes == [process]
+        assert second_queue.processes == []
+        assert str(first_queue) == '[A]'
+
+
+def test_sjf_queue_order() -> None:
+    queue: SJFPriorityQueue = SJFPriorityQueue(None)
+    for process in [
+        Process('C', 0, [5]),
+        Process('A', 0, [7]),
+        Process('B', 0, [5]),
+    ]:
+        queue.push_process(process)
+
+    # ordered by burst time upon entry, ties broken by name
+    assert str(queue) == '[B, C, A]'
+    assert queue.processes is queue.processes
+
+    selected = queue.select_new_process()
+    assert selected is not None and selected.process_name == 'B'
+    queue.on_tick(5)
+    assert queue.release_current_on_expiry() is selected
+    assert str(queue) == '[C, A]'
+
+
+def test_mlfq_future_processes_order() -> None:
+    processes: list[Process] = [
+        Process('B', 0, [5, 2, 5, 2, 5]),
+        Process('A', 2, [2, 2, 6]),
+        Process('C', 0, [30]),
+    ]
+
+    mlfq: MultiLevelFeedbackQueue = generate_mlfq(8, 8, 0, processes)
+    assert mlfq.future_processes == [processes[0], processes[2], processes[1]]
+
+    # presorted input is taken as is
+    presorted_mlfq: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+        processes, [RRPriorityQueue(8)], 0, presorted=True
+    )
+    assert presorted_mlfq.future_processes == processes
+
+
+def test_io_releases_in_completion_order() -> None:
+    io: IO = IO()
+    first: Process = Process('A', 0, [0, 3])
+    second: Process = Process('B', 0, [0, 1])
+    for process in (first, second):
+        process.next_burst()
+        io.push_process(process)
+
+    assert io.ticks_until_release() == 1
+    io.on_tick()
+    assert io.release_expired_processes() == [second]
+    assert second.is_burst_complete
+    assert str(io) == '[A]'
+
+    io.on_tick(2)
+    assert io.release_expired_processes() == [first]
+    assert first.is_process_complete
+    assert io.is_empty
+
+
+def test_trace_sinks() -> None:
+    def run_with(trace: TraceSink) -> None:
+        processes: list[Process] = [
+            Process('B', 0, [5, 2, 5, 2, 5]),
+            Process('A', 2, [2, 2]),
+            Process('C', 0, [30]),
+        ]
+        MultiLevelFeedbackQueue(
+            processes,
+            [RRPriorityQueue(8), FCFSPriorityQueue(8), SJFPriorityQueue(None)],
+            trace=trace,
+        ).run()
+
+    expected: str = open(OUTPUTS_PATH / 'sample1.txt', 'r').read().strip()
+
+    # a tiny buffer forces many partial writes
+    full_output: StringIO = StringIO()
+    run_with(TextTraceSink(full_output, buffer_size=16))
+    assert full_output.getvalue().strip() == expected
+
+    summary_output: StringIO = StringIO()
+    run_with(SummaryTraceSink(summary_output))
+    assert summary_output.getvalue().startswith('SIMULATION DONE\n')
+    assert summary_output.getvalue().strip() == (
+        'SIMULATION DONE' + expected.split('SIMULATION DONE')[1]
+    )
+
+    # the null sink swallows everything
+    run_with(NullTraceSink())
+
+
+def test_process_table() -> None:
+    table: ProcessTable = ProcessTable()
+    first: Process = table.add('A', 3, [2, 4, 1])
+    second: Process = table.add('B', 5, [7])
+
+    assert len(table) == 2
+    assert table.processes == [first, second]
+    assert table[0] == first and table[0] is not first
+    assert first != second
+    assert list(table.burst_times(0)) == [2, 4, 1]
+
+    first.on_tick(2)
+    assert first.is_burst_complete and not first.is_process_complete
+    first.next_burst()
+    assert first.remaining_current_burst == 4 and not first.is_CPU_burst
+    first.on_tick(4)
+    first.next_burst()
+    first.on_tick()
+    assert first.is_process_complete
+
+    first.end_process(10)
+    assert first.turnaround_time == 7
+    assert first.waiting_time == 0
+    assert not second.is_process_complete
+
+
+def test_shared_process_table(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(Process, '_shared_table', None)
+    monkeypatch.setattr(Process, 'SHARED_TABLE_ROWS', 2)
+    first, second, third = (Process(name, 0, [1]) for name in 'ABC')
+
+    # processes created directly share a table, until it is full
+    assert first._table is second._table is not third._table
+    assert len(first._table) == 2 and first != second
+    first.on_tick()
+    assert first.is_process_complete and not second.is_process_complete
+
+
+def test_main_streamed_input(capfd: CaptureFixture[str]) -> None:
+    input_files: list[Path] = sorted(f for f in INPUTS_PATH.iterdir() if f.is_file())
+
+    for input_file in input_files:
+        expected: str = open(OUTPUTS_PATH / input_file.name, 'r').read().strip()
+
+        mlfq.main(['--input', str(input_file)])
+        out, err = capfd.readouterr()
+        assert out.strip() == expected
+        assert err == ''
+
+
+def test_read_process_stream(tmp_path: Path) -> None:
+    lines: list[str] = [
+        f'P{i % 7}{i};{(i * 37) % 11};{i % 5 + 1};2;1' for i in range(50)
+    ]
+    workload: Path = tmp_path / 'workload.txt'
+    workload.write_text('\n'.join([str(len(lines)), '5', '6', '1', *lines]))
+
+    expected: list[tuple[int, str]] = sorted(
+        (int(line.split(';')[1]), line.split(';')[0]) for line in lines
+    )
+
+    # unsorted input is sorted in memory, or externally once it spans several runs
+    for sort_run_size in (100, 8):
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(workload), sort_run_size=sort_run_size)
+        )
+        assert (time_allotment_q1, time_allotment_q2, context_switch_time) == (5, 6, 1)
+        assert [(p.arrival_time, p.process_name) for p in processes] == expected
+
+    # sorted input is streamed, with ties at the same arrival ordered by name
+    sorted_lines: list[str] = sorted(lines, key=lambda line: int(line.split(';')[1]))
+    workload.write_text('\n'.join([str(len(lines)), '5', '6', '1', *sorted_lines]))
+    _, _, _, processes = mlfq.read_process_stream(str(workload), table_size=4)
+    streamed: list[Process] = list(processes)
+    assert [(p.arrival_time, p.process_name) for p in streamed] == expected
+    bursts: dict[str, list[int]] = {
+        line.split(';')[0]: [int(b) for b in line.split(';')[2:]] for line in lines
+    }
+    assert all(list(p.burst_times) == bursts[p.process_name] for p in streamed)
+
+    # processes are only pulled from the stream as their arrival nears
+    _, _, _, processes = mlfq.read_process_stream(str(workload))
+    pulled: list[Process] = []
+    scheduler: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+        (pulled.append(p) or p for p in processes),
+        [RRPriorityQueue(5), FCFSPriorityQueue(6), SJFPriorityQueue(None)],
+        1,
+        presorted=True,
+        trace=NullTraceSink(),
+    )
+    scheduler.push_arriving_processes()
+    assert all(p.arrival_time == 0 for p in pulled[:-1])
+    assert pulled[-1].arrival_time > 0
+
+    # sortedness is checked as the input is read, so the first processes are
+    # loaded before the rest of the file is even parsed
+    arrivals: list[int] = [0, 1, 1, 2, 3, 9, 5, 7, 6, 10]
+    late_lines: list[str] = [f'P{i};{a};1' for i, a in enumerate(arrivals)]
+    header: list[str] = [str(len(late_lines) + 1), '5', '6', '1']
+    workload.write_text('\n'.join([*header, *late_lines, 'not a process']))
+    _, _, _, processes = mlfq.read_process_stream(str(workload), sort_run_size=4)
+    assert next(processes).process_name == 'P0'
+
+    # the rest of the input is sorted externally from the first line that is
+    # out of order, as long as it does not arrive before a loaded process
+    workload.write_text('\n'.join([str(len(late_lines)), '5', '6', '1', *late_lines]))
+    expected = sorted((a, f'P{i}') for i, a in enumerate(arrivals))
+    _, _, _, processes = mlfq.read_process_stream(str(workload), sort_run_size=4)
+    assert [(p.arrival_time, p.process_name) for p in processes] == expected
+
+    late_lines.append('P10;2;1')
+    workload.write_text('\n'.join([str(len(late_lines)), '5', '6', '1', *late_lines]))
+    _, _, _, processes = mlfq.read_process_stream(str(workload), sort_run_size=4)
+    with raises(Exception, match='arrives before processes that were already loaded'):
+        list(processes)
+    _, _, _, processes = mlfq.read_process_stream(
+        str(workload), sort_run_size=4, unsorted=True
+    )
+    assert [(p.arrival_time, p.process_name) for p in processes] == sorted(
+        [*expected, (2, 'P10')]
+    )
+
+
+def test_workload_stream_seek(tmp_path: Path) -> None:
+    # ties at the same arrival, in an order other than by name
+    lines: list[str] = [f'P{9 - i % 4}{i};{i // 3};{i % 5 + 1};2' for i in range(30)]
+    text_workload: Path = tmp_path / 'workload.txt'
+    text_workload.write_text('\n'.join([str(len(lines)), '5', '6', '1', *lines]))
+    columnar_workload: Path = tmp_path / 'workload.col'
+    mlfq.write_columnar_workload(
+        str(columnar_workload), *mlfq.read_process_stream(str(text_workload))
+    )
+    expected: list[tuple[int, str]] = sorted(
+        (int(line.split(';')[1]), line.split(';')[0]) for line in lines
+    )
+
+    for workload in (text_workload, columnar_workload):
+        for num_pulled in range(1, len(lines) + 1):
+            stream: mlfq.WorkloadStream = mlfq.open_workload(str(workload))[3]
+            for _ in range(num_pulled):
+                next(stream)
+            position = stream.position
+            assert position is not None
+
+            # a new stream continues from the position, without reading the
+            # processes before it again
+            data: bytes = workload.read_bytes()
+            if workload == text_workload:
+                offset: int = position[0]
+                workload.write_bytes(data[:offset].replace(b';', b'x') + data[offset:])
+            resumed: mlfq.WorkloadStream = mlfq.open_workload(str(workload))[3]
+            resumed.seek(position)
+            assert [(p.arrival_time, p.process_name) for p in resumed] == expected[
+                num_pulled:
+            ]
+            workload.write_bytes(data)
+
+    # the position is unknown once the input is sorted externally
+    text_workload.write_text(
+        '\n'.join([str(len(lines)), '5', '6', '1', lines[3], *lines[:3], *lines[4:]])
+    )
+    stream = mlfq.read_process_stream(str(text_workload), sort_run_size=4)[3]
+    assert [(p.arrival_time, p.process_name) for p in stream] == expected
+    assert stream.position is None
+
+    # unless it is given a sorted copy to write, from the start or from the
+    # first line out of order on
+    sorted_path: str = str(tmp_path / 'workload.sorted')
+    late_lines: list[str] = [*lines[:20], *lines[21:24], lines[20], *lines[24:]]
+    for workload_lines in ([lines[3], *lines[:3], *lines[4:]], late_lines):
+        text_workload.write_text(
+            '\n'.join([str(len(lines)), '5', '6', '1', *workload_lines])
+        )
+        for num_pulled in range(len(lines) + 1):
+            stream = mlfq.read_process_stream(
+                str(text_workload), sort_run_size=4, sorted_path=sorted_path
+            )[3]
+            pulled: list[Process] = [next(stream) for _ in range(num_pulled)]
+            position = stream.position
+            assert position is not None or not pulled
+
+            resumed = mlfq.read_process_stream(
+                str(text_workload), sort_run_size=4, sorted_path=sorted_path
+            )[3]
+            if position is not None:
+                resumed.seek(position)
+            assert [
+                (p.arrival_time, p.process_name) for p in [*pulled, *resumed]
+            ] == expected
+
+
+def test_latency_metrics(monkeypatch: MonkeyPatch) -> None:
+    for input_file in sorted(f for f in INPUTS_PATH.iterdir() if f.is_file()):
+        summaries: list[dict] = []
+        for event_driven in (False, True):
+            monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+            time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+                mlfq.get_user_input()
+            )
+
+            scheduler: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+                processes,
+                [
+                    RRPriorityQueue(time_allotment_q1),
+                    FCFSPriorityQueue(time_allotment_q2),
+                    SJFPriorityQueue(None),
+                ],
+                context_switch_time,
+                trace=NullTraceSink(),
+            )
+            scheduler.run(event_driven)
+            summaries.append(scheduler.metrics.summary())
+
+        # both modes accumulate the same metrics
+        assert summaries[0] == summaries[1]
+        summary: dict = summaries[0]
+
+        turnaround_times: list[int] = sorted(p.turnaround_time for p in processes)
+        assert summary['processes'] == len(processes)
+        assert summary['turnaround_time']['mean'] == round(
+            sum(turnaround_times) / len(processes), 3
+        )
+        # small values are exact, so p50 is the nearest-rank median
+        assert (
+            summary['turnaround_time']['p50']
+            == turnaround_times[(len(processes) + 1) // 2 - 1]
+        )
+        assert summary['turnaround_time']['p99'] == turnaround_times[-1]
+        assert summary['response_time']['max'] == max(
+            p.response_time for p in processes
+        )
+        assert summary['demotions'] == sum(p.queue_level for p in processes)
+
+        # processes are in the queues whenever they are not doing IO
+        assert sum(queue['total_time'] for queue in summary['queues']) == sum(
+            p.turnaround_time - sum(list(p.burst_times)[1::2]) for p in processes
+        )
+
+
+def test_quantile_sketch() -> None:
+    sketch: mlfq.QuantileSketch = mlfq.QuantileSketch(relative_accuracy=0.01)
+    values: list[int] = [(i * 7919) % 100_003 for i in range(100_003)]
+    for value in values:
+        sketch.add(value)
+
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        expected: int = values[math.ceil(q * len(values)) - 1]
+        assert abs(sketch.quantile(q) - expected) <= 0.01 * expected
+    assert (sketch.min, sketch.max, sketch.count) == (0, 100_002, 100_003)
+    assert len(sketch._buckets) < 1_000
+
+
+def test_profiler(capfd: CaptureFixture[str]) -> None:
+    input_file: Path = INPUTS_PATH / 'set1.txt'
+    expected: str = open(OUTPUTS_PATH / 'set1.txt', 'r').read().strip()
+
+    for event_driven in (False, True):
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        profiler: mlfq.Profiler = mlfq.Profiler()
+        scheduler: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+            processes,
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ],
+            context_switch_time,
+            presorted=True,
+            trace=TextTraceSink(),
+            profiler=profiler,
+        )
+        scheduler.run(event_driven, print_collapsed_ticks=True)
+
+        # instrumentation does not change the simulation
+        out, _ = capfd.readouterr()
+        assert out.strip() == expected
+
+        summary: dict = profiler.summary()
+        phases: dict = summary['phases']
+        loop_iterations: int = phases['push_arriving_processes']['calls']
+        assert phases['context_switch']['calls'] == loop_iterations
+        assert phases['output_tick']['calls'] == loop_iterations
+        assert phases['final_stats']['calls'] == 1
+        assert phases['ticks_until_next_event']['calls'] == (
+            loop_iterations if event_driven else 0
+        )
+
+        metrics: dict = scheduler.metrics.summary()
+        for queue, queue_metrics in zip(summary['queues'], metrics['queues']):
+            assert queue['pushes'] == queue['pops']
+            assert queue['demotions'] == queue_metrics['demotions']
+        assert summary['io']['pushes'] == summary['io']['pops']
+        assert summary['context_switches'] > 0
+
+
+def test_multicore_single_core() -> None:
+    input_files: list[Path] = sorted(f for f in INPUTS_PATH.iterdir() if f.is_file())
+
+    for input_file in input_files:
+        expected: str = open(OUTPUTS_PATH / input_file.name, 'r').read().strip()
+        time_allotment_q1, time_allotment_q2, context_switch_time, _ = (
+            mlfq.read_process_stream(str(input_file))
+        )
+
+        def make_priority_queues(
+            time_allotment_q1: int = time_allotment_q1,
+            time_allotment_q2: int = time_allotment_q2,
+        ) -> list[mlfq.PriorityQueue]:
+            return [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ]
+
+        # a single core is the same as MultiLevelFeedbackQueue, in both variants
+        for shared_queues in (False, True):
+            stream: StringIO = StringIO()
+            mlfq.MultiCoreMultiLevelFeedbackQueue(
+                mlfq.read_process_stream(str(input_file))[3],
+                make_priority_queues,
+                1,
+                shared_queues,
+                context_switch_time,
+                presorted=True,
+                trace=TextTraceSink(stream),
+            ).run()
+            assert stream.getvalue().strip() == expected
+
+
+def test_multicore(monkeypatch: MonkeyPatch, capfd: CaptureFixture[str]) -> None:
+    test_input: str = open(INPUTS_PATH / 'set2.txt', 'r').read()
+    single_core: str = open(OUTPUTS_PATH / 'set2.txt', 'r').read()
+
+    for shared_queues in ([], ['--shared-queues']):
+        monkeypatch.setattr('sys.stdin', StringIO(test_input))
+        mlfq.main(['--cores', '2', *shared_queues])
+        out, err = capfd.readouterr()
+        assert err == ''
+        assert 'CPU 1 : ' in out
+        assert 'CPU 1 : utilization = ' in out
+
+        # skipping ticks gives the same schedule on several cores too
+        monkeypatch.setattr('sys.stdin', StringIO(test_input))
+        mlfq.main(
+            [
+                '--cores',
+                '2',
+                *shared_queues,
+                '--event-driven',
+                '--print-collapsed-ticks',
+            ]
+        )
+        assert capfd.readouterr()[0] == out
+
+        def average_turnaround_time(output: str) -> float:
+            line = next(
+                line for line in output.splitlines() if 'Average Turn-around' in line
+            )
+            return float(line.split('= ')[1].split(' ')[0])
+
+        assert average_turnaround_time(out) < average_turnaround_time(single_core)
+
+    # every CPU burst runs on exactly one core
+    time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+        mlfq.read_process_stream(str(INPUTS_PATH / 'set2.txt'))
+    )
+    processes = list(processes)
+    scheduler = mlfq.MultiCoreMultiLevelFeedbackQueue(
+        processes,
+        lambda: [
+            RRPriorityQueue(time_allotment_q1),
+            FCFSPriorityQueue(time_allotment_q2),
+            SJFPriorityQueue(None),
+        ],
+        3,
+        context_switch_time=context_switch_time,
+        trace=NullTraceSink(),
+    )
+    scheduler.run(event_driven=True)
+    core_stats: list[dict] = scheduler.core_stats()
+    assert len(core_stats) == 3
+    assert sum(stats['busy_ticks'] for stats in core_stats) == sum(
+        sum(p.burst_times[::2]) for p in processes
+    )
+    assert sum(stats['completed'] for stats in core_stats) == len(processes)
+    for stats in core_stats:
+        assert 0 <= stats['utilization'] <= 1
+        assert stats['idle_ticks'] >= 0
+
+
+def test_check_options(capfd: CaptureFixture[str]) -> None:
+    option_args: dict[str, list[str]] = {
+        'checkpoint': ['--checkpoint', 'checkpoint'],
+        'retire_completed': ['--retire-completed'],
+        'digest': ['--digest', 'digest'],
+        'trace_window': ['--trace-window', '0:10'],
+        'resume': ['--resume'],
+        'cache': ['--cache', 'cache'],
+        'profile': ['--profile', 'profile'],
+        'timeseries': ['--timeseries', 'timeseries'],
+        'index': ['--index', 'index'],
+    }
+
+    def check(argv: list[str], error: str | None) -> None:
+        if error is None:
+            assert mlfq.check_options(mlfq.parse_args(argv)) is None
+            return
+        with raises(SystemExit):
+            mlfq.parse_args(argv)
+        assert capfd.readouterr().err.endswith(f'error: {error}\n')
+
+    check([], None)
+    for option, minimum in mlfq.OPTION_MINIMUMS.items():
+        flag: str = '--' + option.replace('_', '-')
+        check([flag, str(minimum)], None)
+        check([flag, str(minimum - 1)], f'{flag} must be at least {minimum}')
+
+    # every option is supported on its own, and on a single core
+    for args in option_args.values():
+        check([*args, '--cores', '1'], None)
+    for option, unsupported in mlfq.UNSUPPORTED_OPTIONS.items():
+        for other in unsupported:
+            flag, other_flag = option_args[option][0], option_args[other][0]
+            check(
+                [*option_args[option], *option_args[other]],
+                f'{flag} does not support {other_flag}',
+            )
+    for option in mlfq.SINGLE_CORE_OPTIONS:
+        check(
+            [*option_args[option], '--cores', '2'],
+            f'{option_args[option][0]} only supports a single core',
+        )
+    # caching and trace windows are not limited to a single core
+    check(['--cores', '2', '--cache', 'cache'], None)
+    check(['--cores', '2', '--shared-queues', '--trace-window', '0:10'], None)
+
+
+def test_multicore_shared_queue_order() -> None:
+    def run(processes: list[Process], time_allotment: int | None) -> list[str]:
+        stream: StringIO = StringIO()
+        mlfq.MultiCoreMultiLevelFeedbackQueue(
+            processes,
+            lambda: [
+                RRPriorityQueue(time_allotment),
+                FCFSPriorityQueue(time_allotment),
+                SJFPriorityQueue(None),
+            ],
+            2,
+            True,
+            0,
+            trace=TextTraceSink(stream),
+        ).run()
+        return stream.getvalue().splitlines()
+
+    # a core that frees up takes the head of the global FIFO queue, so C
+    # which arrived before D runs first even though D is pushed later
+    lines: list[str] = run(
+        [
+            Process('A', 0, [20]),
+            Process('B', 0, [1]),
+            Process('C', 0, [3]),
+            Process('D', 1, [3]),
+        ],
+        8,
+    )
+    at_tick_1: list[str] = lines[lines.index('At Time = 1') :]
+    assert 'CPU 1 : C' in at_tick_1[: at_tick_1.index('')]
+    assert 'Turn-around time for Process C : 4 - 0 = 4 ms' in lines
+    assert 'Turn-around time for Process D : 7 - 1 = 6 ms' in lines
+
+    # once demoted to SJF, either core takes the shortest remaining burst
+    lines = run(
+        [Process(name, 0, [burst]) for name, burst in zip('XYZW', (30, 10, 5, 8))], 1
+    )
+    assert 'Turn-around time for Process Z : 7 - 0 = 7 ms' in lines
+    assert 'Turn-around time for Process W : 10 - 0 = 10 ms' in lines
+    assert 'Turn-around time for Process Y : 15 - 0 = 15 ms' in lines
+    assert 'Turn-around time for Process X : 38 - 0 = 38 ms' in lines
+
+    # a process demoted to SJF makes the processes chosen for their burst
+    # compete again, as on a single core: B, which A preempted at tick 8, has
+    # a shorter burst left than C, so C makes way for it when A is demoted
+    lines = run(
+        [Process('A', 8, [13]), Process('B', 2, [18]), Process('C', 3, [28])], 2
+    )
+    at_tick_12: list[str] = lines[lines.index('At Time = 12') :]
+    assert at_tick_12[1:4] == ['Queues : [];[];[C]', 'CPU 0 : A', 'CPU 1 : B']
+    assert 'Turn-around time for Process A : 21 - 8 = 13 ms' in lines
+    assert 'Turn-around time for Process C : 40 - 3 = 37 ms' in lines
+
+
+def test_steal_process() -> None:
+    processes: list[Process] = [Process(name, 0, [5]) for name in 'ABC']
+
+    for queue_class in (RRPriorityQueue, FCFSPriorityQueue, SJFPriorityQueue):
+        queue = queue_class(None)
+        queue.push_process(processes[0])
+        queue.select_new_process()
+
+        # the front of the queue is only taken if it is not kept
+        assert queue.steal_process(keep_front=True) is None
+        assert queue.steal_process(keep_front=False) == processes[0]
+        assert queue.is_empty
+
+        for process in processes:
+            queue.push_process(process)
+        queue.select_new_process()
+        assert queue.steal_process(keep_front=True) in processes[1:]
+        assert queue.steal_process(keep_front=True) in processes[1:]
+        assert queue.steal_process(keep_front=True) is None
+        assert queue.processes == [processes[0]]
+
+
+class LiveCounterChecker:
+    """
+    Compares the live counters and the occupancy bitmap against the queues
+    before every iteration of the simulation loop
+    """
+
+    def on_iteration(self, scheduler: MultiLevelFeedbackQueue) -> None:
+        queues = scheduler._priority_queues
+        assert scheduler.num_queued_processes == sum(q.num_processes for q in queues)
+        assert scheduler.num_blocked_processes == len(scheduler._io.processes)
+        assert scheduler.num_future_processes == len(scheduler.future_processes)
+        assert scheduler._occupancy == sum(
+            1 << level for level, queue in enumerate(queues) if not queue.is_empty
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def test_many_levels() -> None:
+    num_levels: int = 100
+    processes: list[Process] = [
+        Process('A', 0, [150]),
+        Process('B', 3, [2, 5, 30]),
+        Process('C', 40, [1, 1, 1]),
+    ]
+    scheduler: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+        processes,
+        [RRPriorityQueue(1, 1) for _ in range(num_levels - 1)]
+        + [SJFPriorityQueue(None)],
+        trace=NullTraceSink(),
+    )
+    scheduler.run(checkpointer=LiveCounterChecker())  # type: ignore[arg-type]
+
+    assert scheduler.is_empty
+    assert scheduler.num_queued_processes == 0
+    assert scheduler.num_blocked_processes == 0
+    assert scheduler.num_future_processes == 0
+    assert max(p.completion_time for p in processes) == 150 + 2 + 30 + 1 + 1
+    # A runs through every level before finishing in the SJF queue
+    assert processes[0].queue_level == num_levels - 1
+    queue_summaries: list[dict] = scheduler.metrics.summary()['queues']
+    assert all(queue['demotions'] >= 1 for queue in queue_summaries[:-1])
+
+
+def test_trace_window(monkeypatch: MonkeyPatch, capfd: CaptureFixture[str]) -> None:
+    def position(output: str, tick: int) -> int:
+        # The block of the tick, or the final stats if the run ended before it
+        for line in (f'At Time = {tick}\n', 'SIMULATION DONE'):
+            if line in output:
+                return output.index(line)
+        return len(output)
+
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        expected: str = open(OUTPUTS_PATH / input_file.name, 'r').read()
+
+        for window, start, end in (
+            ('10:20', position(expected, 10), position(expected, 20)),
+            ('25:', position(expected, 25), len(expected)),
+        ):
+            monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+            mlfq.main(['--trace-window', window])
+            out, _ = capfd.readouterr()
+            assert out.strip() == expected[start:end].strip()
+
+
+class RenderChecker:
+    """
+    Compares the cached 'Queues' line against the queues before every iteration
+    of the simulation loop, and checks that it is reused while nothing changed
+    """
+
+    versions: tuple | None = None
+    line: str | None = None
+    num_reused: int = 0
+
+    def on_iteration(self, scheduler: MultiLevelFeedbackQueue) -> None:
+        current_process = scheduler._current_process
+        line = scheduler._queue_renderer.render(current_process)
+        assert line == ';'.join(
+            str([p for p in queue.processes if p != current_process])
+            for queue in scheduler._priority_queues
+        )
+
+        versions = (
+            tuple(queue.version for queue in scheduler._priority_queues),
+            current_process,
+        )
+        if versions == self.versions:
+            assert line is self.line
+            self.num_reused += 1
+        self.versions, self.line = versions, line
+
+    def close(self) -> None:
+        pass
+
+
+def test_queue_renderer() -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        checker: RenderChecker = RenderChecker()
+        generate_mlfq(
+            time_allotment_q1,
+            time_allotment_q2,
+            context_switch_time,
+            list(processes),
+        ).run(checkpointer=checker)  # type: ignore[arg-type]
+        assert checker.num_reused > 0
+
+
+def test_completed_process_store() -> None:
+    store: mlfq.CompletedProcessStore = mlfq.CompletedProcessStore(run_size=2)
+    processes: list[Process] = [
+        Process('B', 0, [3]),
+        Process('A', 1, [2]),
+        Process('C', 2, [1]),
+        Process('A', 3, [1]),
+        Process('D', 4, [4]),
+    ]
+    for order, process in reversed(list(enumerate(processes))):
+        process.end_process(process.arrival_time + 10)
+        store.add(process, order)
+
+    assert len(store) == 5
+    assert store.num_runs == 2
+    # Records can be read more than once, in order of name then order
+    for _ in range(2):
+        assert list(store.records()) == [
+            ('A', 1, 1, 11, 8),
+            ('A', 3, 3, 13, 9),
+            ('B', 0, 0, 10, 7),
+            ('C', 2, 2, 12, 9),
+            ('D', 4, 4, 14, 6),
+        ]
+    store.close()
+
+
+def test_retire_completed(capfd: CaptureFixture[str]) -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        expected: str = open(OUTPUTS_PATH / input_file.name, 'r').read()
+
+        for streamed in (False, True):
+            time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+                mlfq.read_process_stream(str(input_file), table_size=2)
+            )
+            store: mlfq.CompletedProcessStore = mlfq.CompletedProcessStore(run_size=3)
+            scheduler: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+                processes if streamed else list(processes),
+                [
+                    RRPriorityQueue(time_allotment_q1),
+                    FCFSPriorityQueue(time_allotment_q2),
+                    SJFPriorityQueue(None),
+                ],
+                context_switch_time,
+                presorted=True,
+                completed_store=store,
+            )
+            scheduler.run()
+            assert store.num_runs == len(store) // 3
+            store.close()
+
+            out, _ = capfd.readouterr()
+            assert out.strip() == expected.strip()
+            # Nothing is held on to after completion
+            assert scheduler._all_processes == []
+            assert scheduler._process_orders == {}
+
+            with raises(Exception, match='^Error: Cannot checkpoint'):
+                CheckpointCodec().checkpoint(scheduler)
+
+
+class EagerBoostMultiLevelFeedbackQueue(MultiLevelFeedbackQueue):
+    """
+    Boosts by walking every process and pushing each waiting one to the top
+    queue in turn, which the lazy boost must not be told apart from
+    """
+
+    def _boost_queues(self) -> None:
+        queues = self._priority_queues
+        for process in [*queues[0].processes, *self._io.processes]:
+            process.reconcile_boost(self._boost_epoch)
+
+        for level in range(1, len(queues)):
+            processes = queues[level].processes
+            queues[level].detach_processes()
+            self._metrics.on_boost(level, len(processes), self._tick)
+            for process in processes:
+                process.reconcile_boost(self._boost_epoch)
+                queues[0].push_process(process)
+        self._occupancy = int(not queues[0].is_empty)
+
+
+def test_priority_boost() -> None:
+    def run(boost_interval: int | None) -> tuple[list[str], list[Process]]:
+        # A is CPU bound, while B keeps coming back from IO to Q1
+        processes: list[Process] = [
+            Process('A', 0, [60]),
+            Process('B', 0, [2, 1] * 150 + [2]),
+        ]
+        stream: StringIO = StringIO()
+        MultiLevelFeedbackQueue(
+            processes,
+            [RRPriorityQueue(4), FCFSPriorityQueue(4), SJFPriorityQueue(None)],
+            1,
+            trace=TextTraceSink(stream),
+            boost_interval=boost_interval,
+        ).run()
+        return stream.getvalue().splitlines(), processes
+
+    lines, processes = run(None)
+    assert 'PRIORITY BOOST' not in lines
+    starved_completion_time: int = processes[0].completion_time
+
+    lines, processes = run(20)
+    # A no longer waits for B to complete in the SJF queue
+    assert processes[0].completion_time < starved_completion_time
+    assert processes[0].completion_time < processes[1].completion_time
+
+    ticks: list[int] = [int(line.split('= ')[1]) for line in lines if 'At Time' in line]
+    boosted_ticks: list[int] = [
+        int(lines[i - 1].split('= ')[1])
+        for i, line in enumerate(lines)
+        if line == 'PRIORITY BOOST'
+    ]
+    assert boosted_ticks == list(range(20, ticks[-1] + 1, 20))
+
+    with raises(Exception, match='^Error: The boost interval must be at least 1'):
+        MultiLevelFeedbackQueue([], [RRPriorityQueue(4)], boost_interval=0)
+
+
+def test_lazy_priority_boost() -> None:
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        rows = [
+            (p.process_name, p.arrival_time, list(p.burst_times)) for p in processes
+        ]
+
+        for boost_interval in (3, 7, 20):
+            outputs: list[tuple[str, dict]] = []
+            for mlfq_class in (
+                MultiLevelFeedbackQueue,
+                EagerBoostMultiLevelFeedbackQueue,
+            ):
+                for event_driven in (False, True):
+                    stream: StringIO = StringIO()
+                    scheduler: MultiLevelFeedbackQueue = mlfq_class(
+                        [Process(*row) for row in rows],
+                        [
+                            RRPriorityQueue(time_allotment_q1),
+                            FCFSPriorityQueue(time_allotment_q2),
+                            SJFPriorityQueue(None),
+                        ],
+                        context_switch_time,
+                        trace=TextTraceSink(stream),
+                        boost_interval=boost_interval,
+                    )
+                    scheduler.run(
+                        event_driven,
+                        print_collapsed_ticks=True,
+                        checkpointer=LiveCounterChecker(),  # type: ignore[arg-type]
+                    )
+                    outputs.append((stream.getvalue(), scheduler.metrics.summary()))
+
+            assert 'PRIORITY BOOST' in outputs[0][0]
+            assert all(output == outputs[0] for output in outputs)
+
+
+def test_timeseries(tmp_path: Path) -> None:
+    def run(input_file: Path, event_driven: bool, budget: int) -> mlfq.TimeSeries:
+        time_allotment_q1, time_allotment_q2, context_switch_time, processes = (
+            mlfq.read_process_stream(str(input_file))
+        )
+        simulation: MultiLevelFeedbackQueue = MultiLevelFeedbackQueue(
+            list(processes),
+            [
+                RRPriorityQueue(time_allotment_q1),
+                FCFSPriorityQueue(time_allotment_q2),
+                SJFPriorityQueue(None),
+            ],
+            context_switch_time,
+            trace=NullTraceSink(),
+            timeseries_budget=budget,
+        )
+        simulation.run(event_driven)
+        assert simulation.timeseries is not None
+        return simulation.timeseries
+
+    for input_file in sorted(f for f in INPUTS_PATH.iterdir() if f.is_file()):
+        series: mlfq.TimeSeries = run(input_file, False, 1 << 20)
+        assert series.channels == (
+            'q1', 'q2', 'q3', 'busy', 'switching', 'idle', 'io'
+        )  # fmt: skip
+        buckets = list(series.buckets())
+        assert series.bucket_ticks == 1
+        assert [tick for tick, _, _ in buckets] == list(range(len(buckets)))
+
+        # Every CPU tick of the input is busy, and the CPU is in one state per tick
+        cpu_ticks: int = sum(
+            sum(int(burst) for burst in line.split(';')[2::2])
+            for line in input_file.read_text().splitlines()[4:]
+            if line
+        )
+        assert sum(stats[3][0] for _, _, stats in buckets) == cpu_ticks
+        assert all(sum(s[0] for s in stats[3:6]) == 1 for _, _, stats in buckets)
+
+        # Collapsed ticks are recorded as the same values for each tick
+        assert list(run(input_file, True, 1 << 20).buckets()) == buckets
+
+        # Downsampled buckets keep the min, max and total of each channel
+        downsampled: mlfq.TimeSeries = run(input_file, True, 10 * 24 * 7)
+        assert downsampled.num_buckets <= 10
+        assert downsampled.bucket_ticks > 1
+        downsampled_buckets = list(downsampled.buckets())
+        assert sum(ticks for _, ticks, _ in downsampled_buckets) == len(buckets)
+        for channel in range(len(series.channels)):
+            assert min(b[2][channel][0] for b in downsampled_buckets) == min(
+                b[2][channel][0] for b in buckets
+            )
+            assert max(b[2][channel][1] for b in downsampled_buckets) == max(
+                b[2][channel][1] for b in buckets
+            )
+            assert math.isclose(
+                sum(b[1] * b[2][channel][2] for b in downsampled_buckets),
+                sum(b[2][channel][2] for b in buckets),
+            )
+
+        path: Path = tmp_path / 'run.timeseries'
+        downsampled.write(str(path))
+        read: mlfq.TimeSeries = mlfq.TimeSeries.read(str(path))
+        assert read.channels == downsampled.channels
+        assert list(read.buckets()) == downsampled_buckets
+
+
+def test_main_timeseries(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    test_input: str = open(INPUTS_PATH / 'set2.txt', 'r').read()
+    csv_path: Path = tmp_path / 'run.csv'
+
+    monkeypatch.setattr('sys.stdin', StringIO(test_input))
+    mlfq.main(['--timeseries', str(csv_path), '--output', str(tmp_path / 'out.txt')])
+    lines: list[str] = csv_path.read_text().splitlines()
+    assert lines[0].startswith('tick,ticks,q1_min,q1_max,q1_mean,')
+    assert lines[1].startswith('0,1,')
+
+    # Every core is in one state per tick
+    monkeypatch.setattr('sys.stdin', StringIO(test_input))
+    binary_path: Path = tmp_path / 'run.timeseries'
+    mlfq.main(
+        ['--timeseries', str(binary_path), '--cores', '2', '--output', '/dev/null']
+    )
+    series: mlfq.TimeSeries = mlfq.TimeSeries.read(str(binary_path))
+    busy: int = series.channels.index('busy')
+    assert series.channels[busy : busy + 3] == ('busy', 'switching', 'idle')
+    assert all(
+        sum(s[0] for s in stats[busy : busy + 3]) == 2
+        for _, _, stats in series.buckets()
+    )
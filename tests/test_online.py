@@ -0,0 +1,174 @@
+import asyncio
+from io import StringIO
+from pathlib import Path
+
+from pytest import raises
+
+from src.mlfq import (
+    FCFSPriorityQueue,
+    RRPriorityQueue,
+    SJFPriorityQueue,
+    TextTraceSink,
+)
+from src.online import OnlineDispatcher, PublishingTraceSink, _serve, parse_submission
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+
+def read_submissions(input_file: Path) -> tuple[list[int], bytes]:
+    """
+    Settings of a workload file, and its processes as submissions in arrival order
+    """
+    lines: list[str] = input_file.read_text().splitlines()
+    num_processes: int = int(lines[0])
+    settings: list[int] = [int(line) for line in lines[1:4]]
+    processes: list[str] = sorted(
+        lines[4 : 4 + num_processes],
+        key=lambda line: (int(line.split(';')[1]), line.split(';')[0]),
+    )
+    return settings, ''.join(line + '\n' for line in processes).encode()
+
+
+def make_dispatcher(
+    settings: list[int], stream: StringIO, **kwargs
+) -> OnlineDispatcher:
+    time_allotment_q1, time_allotment_q2, context_switch_time = settings
+    return OnlineDispatcher(
+        [
+            RRPriorityQueue(time_allotment_q1),
+            FCFSPriorityQueue(time_allotment_q2),
+            SJFPriorityQueue(None),
+        ],
+        context_switch_time,
+        PublishingTraceSink(TextTraceSink(stream)),
+        **kwargs,
+    )
+
+
+async def submit(dispatcher: OnlineDispatcher, data: bytes) -> None:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    await dispatcher.read_submissions(reader.read)
+    await dispatcher.close()
+
+
+def test_parse_submission() -> None:
+    assert parse_submission(b'A;3;5;2;4') == ('A', 3, [5, 2, 4])
+    for line in (b'A;3', b'A;x;4', b';3;4'):
+        with raises(ValueError, match='^Error: Invalid submission'):
+            parse_submission(line)
+
+
+def test_online_matches_offline() -> None:
+    for input_file in sorted(f for f in INPUTS_PATH.iterdir() if f.is_file()):
+        expected: str = (OUTPUTS_PATH / input_file.name).read_text().strip()
+        settings, data = read_submissions(input_file)
+
+        for event_driven in (False, True):
+            stream: StringIO = StringIO()
+            # submissions trickle in, a few at a time
+            dispatcher = make_dispatcher(
+                settings,
+                stream,
+                max_pending=2,
+                batch_size=1,
+                event_driven=event_driven,
+                print_collapsed_ticks=True,
+            )
+
+            async def run(
+                dispatcher: OnlineDispatcher = dispatcher, data: bytes = data
+            ) -> None:
+                await asyncio.gather(submit(dispatcher, data), dispatcher.run())
+
+            asyncio.run(run())
+            assert stream.getvalue().strip() == expected
+
+
+def test_online_backpressure() -> None:
+    data: bytes = b''.join(b'P%d;%d;2\n' % (i, i) for i in range(10))
+
+    async def run() -> None:
+        dispatcher = make_dispatcher([4, 4, 0], StringIO(), max_pending=3, batch_size=1)
+        reader = asyncio.create_task(submit(dispatcher, data))
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        # reading stops while the queue is full
+        assert dispatcher._submissions.full()
+        assert not reader.done()
+        assert dispatcher.num_admitted == 0
+
+        await asyncio.gather(reader, dispatcher.run())
+        assert dispatcher.num_admitted == 10
+        assert dispatcher.mlfq.num_future_processes == 0
+
+    asyncio.run(run())
+
+
+def test_online_wall_clock() -> None:
+    async def run() -> None:
+        dispatcher = make_dispatcher(
+            [4, 4, 1], StringIO(), tick_duration=0.001, event_driven=True
+        )
+        task = asyncio.create_task(dispatcher.run())
+
+        await submit_lines(dispatcher, b'A;0;3\nB;0;2;3;1\n')
+        await asyncio.sleep(0.02)
+        # a submission arrives when it is submitted, or later if asked to
+        await submit_lines(dispatcher, b'C;0;1\nD;1000;1\n')
+        await dispatcher.close()
+        await task
+
+        # (arrival time, completion time) of each process
+        times = {
+            name: (arrival_time, completion_time)
+            for name, _, arrival_time, completion_time, _ in (
+                dispatcher.completed_store.records()
+            )
+        }
+        assert times['A'][0] == 0
+        assert times['C'][0] >= 10
+        assert times['D'][0] == 1000
+        assert all(completion > arrival for arrival, completion in times.values())
+
+    async def submit_lines(dispatcher: OnlineDispatcher, data: bytes) -> None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        await dispatcher.read_submissions(reader.read)
+
+    asyncio.run(run())
+
+
+def test_online_socket(tmp_path: Path) -> None:
+    socket_path: str = str(tmp_path / 'mlfq.sock')
+
+    async def run() -> None:
+        dispatcher = OnlineDispatcher(
+            [RRPriorityQueue(4), FCFSPriorityQueue(4), SJFPriorityQueue(None)],
+            trace=PublishingTraceSink(TextTraceSink(StringIO())),
+        )
+        server = asyncio.create_task(_serve(dispatcher, socket_path))
+        while not Path(socket_path).exists():
+            await asyncio.sleep(0.001)
+
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(b'A;0;2\nB;1;1;1;1\n')
+        await writer.drain()
+        writer.write_eof()
+        while dispatcher.num_admitted < 2:
+            await asyncio.sleep(0.001)
+        await dispatcher.close()
+
+        # the client receives the trace, then the connection is closed
+        trace: str = (await reader.read()).decode()
+        await server
+        assert 'At Time = 0' in trace
+        assert 'Turn-around time for Process B' in trace
+        assert not Path(socket_path).exists()
+
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from src.sweep import parse_values, read_workload, simulate, sweep
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+
+
+def test_parse_values() -> None:
+    assert parse_values('4') == [4]
+    assert parse_values('1:3,8') == [1, 2, 3, 8]
+    assert parse_values('0:10:5') == [0, 5, 10]
+
+
+def test_sweep_matches_sequential_runs() -> None:
+    workload: Path = INPUTS_PATH / 'set1.txt'
+    configurations: list[tuple[int, int, int, int]] = [
+        (q1, q2, quantum, context_switch_time)
+        for q1 in (2, 5)
+        for q2 in (3, 6)
+        for quantum in (2, 4)
+        for context_switch_time in (0, 1)
+    ]
+
+    results = list(sweep(read_workload(str(workload)), configurations, 2, 3))
+
+    assert [configuration for configuration, _, _ in results] == configurations
+    for configuration, avg_ta_time, avg_waiting_time in results:
+        assert (avg_ta_time, avg_waiting_time) == simulate(
+            read_workload(str(workload)), *configuration
+        )
+
+    # q1=5, q2=6 and context switch time 1 is the configuration of set1.txt
+    assert (5, 6, 4, 1, 58.556) in [
+        (*configuration, avg_ta_time) for configuration, avg_ta_time, _ in results
+    ]
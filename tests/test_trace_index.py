@@ -0,0 +1,98 @@
+import itertools
+from io import StringIO
+from pathlib import Path
+
+from pytest import CaptureFixture, MonkeyPatch, raises
+
+from src import mlfq
+from src.digest import WindowTraceSink
+from src.trace_index import TraceIndex, TraceIndexer, read_window, simulate_window
+
+# note that pytest is called from the root directory, not from /tests
+INPUTS_PATH: Path = Path.cwd() / 'tests' / 'input'
+OUTPUTS_PATH: Path = Path.cwd() / 'tests' / 'output'
+
+WINDOWS: list[tuple[int, int | None]] = [
+    (0, 1),
+    (3, 17),
+    (20, 21),
+    (40, 90),
+    (50, None),
+]
+
+
+def expected_window(output: str, start: int, end: int | None) -> str:
+    stream = StringIO()
+    trace = mlfq.TextTraceSink(stream)
+    window = WindowTraceSink(trace, start, end)
+    for line in output.strip().split('\n'):
+        window.write(line)
+    trace.flush()
+    return stream.getvalue()
+
+
+def query(index: TraceIndex, start: int, end: int | None, from_trace: bool) -> str:
+    stream = StringIO()
+    (read_window if from_trace else simulate_window)(index, start, end, stream)
+    return stream.getvalue()
+
+
+def test_trace_index(
+    monkeypatch: MonkeyPatch, capfd: CaptureFixture[str], tmp_path: Path
+) -> None:
+    index_path: Path = tmp_path / 'run.index'
+    output_path: Path = tmp_path / 'run.txt'
+
+    for input_file in sorted(INPUTS_PATH.iterdir()):
+        expected: str = (OUTPUTS_PATH / input_file.name).read_text()
+
+        for mode in ([], ['--event-driven'], ['--input', str(input_file)]):
+            monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+            mlfq.main(
+                [
+                    '--index',
+                    str(index_path),
+                    '--index-every',
+                    '7',
+                    '--output',
+                    str(output_path),
+                    *mode,
+                ]
+            )
+            index: TraceIndex = TraceIndex(str(index_path))
+            assert index.ticks[0] == 0 and index.is_complete
+            # The last snapshot is taken at the end of the run
+            ticks: list[int] = list(index.ticks)
+            assert all(b // 7 > a // 7 for a, b in itertools.pairwise(ticks[:-1]))
+            assert ticks[-1] > ticks[-2]
+
+            # Windows are simulated tick by tick, even from event-driven runs
+            for start, end in WINDOWS:
+                assert query(index, start, end, False) == expected_window(
+                    expected, start, end
+                )
+                if not mode:
+                    assert query(index, start, end, True) == expected_window(
+                        expected, start, end
+                    )
+
+    # An index without its table, as the run was interrupted, is scanned up to
+    # its last whole record
+    data: bytes = index_path.read_bytes()
+    table_offset, _ = TraceIndexer.FOOTER.unpack(data[-TraceIndexer.FOOTER.size :])
+    for size in (table_offset, table_offset - 1):
+        index_path.write_bytes(data[:size])
+        index = TraceIndex(str(index_path))
+        assert list(index.ticks) == ticks[: len(ticks) - (size < table_offset)]
+        assert query(index, 3, 17, False) == expected_window(expected, 3, 17)
+    # The final stats are only known once the run is complete
+    assert not index.is_complete
+    with raises(Exception, match='^Error: The run did not finish'):
+        query(index, 50, None, False)
+
+    # Positions in the trace are only known when it is written to a file
+    monkeypatch.setattr('sys.stdin', StringIO(input_file.read_text()))
+    mlfq.main(['--index', str(index_path)])
+    capfd.readouterr()
+    with raises(Exception, match='^Error: The trace of this run was not written'):
+        query(TraceIndex(str(index_path)), 3, 17, True)